@@ -0,0 +1,104 @@
+"""
+智能体池 (AgentPool)
+
+职责:
+1.  在进程内维护一组可复用的项目协调官（及其智能体团队），避免每个会话、每次重置都重新构建智能体。
+2.  提供线程安全的借出/归还：协调官在一次分析期间独占使用（流式回调、事件订阅都挂在协调官上），
+    分析结束后归还给下一位用户。
+3.  池中所有智能体共享进程级的OpenAI/Tavily客户端与连接池，跨用户复用连接。
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import os
+import threading
+import time
+
+from .project_coordinator import ProjectCoordinator
+
+
+class AgentPool:
+    def __init__(self, factory: Callable[[], ProjectCoordinator], max_size: int = 4):
+        """
+        Args:
+            factory: 创建协调官的函数，池中实例不足时按需调用
+            max_size: 池中最多同时存在的协调官数量，即同时进行的分析数量上限
+        """
+        self.factory = factory
+        self.max_size = max_size
+        self._idle: List[ProjectCoordinator] = []
+        self._created = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> ProjectCoordinator:
+        """
+        借出一个协调官；池已满且全部在使用中时等待归还
+
+        Raises:
+            TimeoutError: 等待超时
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    coordinator = self._idle.pop()
+                    self._in_use += 1
+                    return coordinator
+                if self._created < self.max_size:
+                    # 先占位再在锁外构建，避免构建期间阻塞其他借出/归还
+                    self._created += 1
+                    self._in_use += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if (remaining is not None and remaining <= 0) or not self._condition.wait(timeout=remaining):
+                    raise TimeoutError(f"智能体池已满（{self.max_size} 个分析进行中），请稍后重试")
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, coordinator: ProjectCoordinator):
+        """归还协调官，清理本次分析挂载的回调"""
+        coordinator.set_stream_callback(None)
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append(coordinator)
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[ProjectCoordinator]:
+        """借出协调官的上下文管理器，退出时自动归还"""
+        coordinator = self.acquire(timeout=timeout)
+        try:
+            yield coordinator
+        finally:
+            self.release(coordinator)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            }
+
+
+_pools: Dict[str, AgentPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_agent_pool(openai_api_key: str, max_size: Optional[int] = None) -> AgentPool:
+    """获取进程级共享的智能体池，池大小可通过环境变量 AGENT_POOL_SIZE 配置"""
+    with _pools_lock:
+        pool = _pools.get(openai_api_key)
+        if pool is None:
+            size = max_size or int(os.getenv("AGENT_POOL_SIZE", "4"))
+            pool = AgentPool(lambda: ProjectCoordinator(openai_api_key=openai_api_key), max_size=size)
+            _pools[openai_api_key] = pool
+        return pool
@@ -0,0 +1,445 @@
+"""
+智能体基类 (BaseAgent)
+
+职责:
+1.  统一初始化分析师所需的OpenAI与Tavily客户端，并校验API Key。
+2.  提供同步与异步两套搜索/对话调用入口，所有网络I/O都经过这里，
+    具体分析师只负责构建查询、Prompt与解析结果。
+3.  设置 stream_callback 后以流式方式调用LLM，逐片段推送进度事件，完整响应仍在结束后统一解析。
+4.  遵循当前上下文中的取消令牌：调用前检查是否已取消，按剩余时间设置HTTP超时，取消时关闭流式连接。
+5.  为每次搜索、LLM调用与JSON解析记录追踪Span（耗时、Token数、缓存命中、请求/响应大小）。
+6.  为每个智能体提供独立的logger（agents.<类名>），日志采用延迟格式化，安静模式下几乎没有开销。
+7.  所有网络调用经过进程级共享的弹性接入点（重试退避、熔断、自适应并发限流），
+    流式调用只在尚未收到任何输出时重试。
+8.  每次LLM请求（含重试）在占用并发名额之前经进程级LLM调度器申请RPM/TPM配额；
+    成功的请求按实际用量结算，失败的尝试退还预留的输出部分。
+9.  按调用用途（extraction/optimization/critique/scoring）路由到不同档位的模型；
+    快速模型的输出缺少 RESPONSE_FIELDS 中声明的字段时自动升级到推理模型重试。
+10. 声明了 PROFILE_KIND 的分析师在基础分析前先查询跨会话画像库，新鲜或陈旧的画像直接复用。
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+import copy
+import json
+import os
+
+from .cancellation import OperationCancelled, current_token
+from .cache import ResponseCache, SearchCache, get_response_cache, get_search_cache
+from .streaming import (StreamEvent, STREAM_START, STREAM_REASONING, STREAM_TOKEN,
+                        STREAM_CACHED, STREAM_DONE, STREAM_ERROR)
+from .llm_scheduler import LLMScheduler, estimate_request_tokens, get_llm_scheduler
+from .logging_utils import get_logger
+from .model_routing import ModelRouter, get_model_router, validate_json_fields
+from .profile_warehouse import META_FIELD, ProfileWarehouse, get_profile_warehouse
+from .resilience import ResilientEndpoint, get_endpoint
+from .telemetry import Telemetry, estimate_tokens, get_telemetry, payload_size
+from .transport import (DEFAULT_MODEL, LLM_TIMEOUT_SECONDS, SEARCH_TIMEOUT_SECONDS,
+                        http_timeout, get_openai_client, get_tavily_client,
+                        get_async_openai_client, get_async_tavily_client)
+
+
+class BaseAgent:
+    # Prompt版本号：修改任何Prompt模板后需要递增，使旧的LLM响应缓存自动失效
+    PROMPT_VERSION = "2"
+    # 各用途的LLM输出必须包含的列表字段，用于判断快速模型的输出是否需要升级重试
+    RESPONSE_FIELDS: Dict[str, Tuple[str, ...]] = {}
+    # 画像库中的画像类型（"education"/"industry"），None表示不使用画像库
+    PROFILE_KIND: Optional[str] = None
+
+    def __init__(self, openai_api_key: str, use_search: bool = True):
+        # 每个智能体使用独立的logger：agents.<类名>，可单独调整级别
+        self.logger = get_logger(type(self).__name__)
+        # 初始化Tavily客户端
+        self.tavily_api_key: Optional[str] = None
+        self.tavily_client = None
+        self.search_cache: Optional[SearchCache] = None
+        if use_search:
+            self.tavily_api_key = os.getenv("TAVILY_API_KEY")
+            if not self.tavily_api_key:
+                raise ValueError("TAVILY_API_KEY not found in environment variables.")
+            # 进程级共享的客户端，同一API Key只创建一次
+            self.tavily_client = get_tavily_client(self.tavily_api_key)
+            # 进程级共享的磁盘搜索缓存，相同查询不再重复访问Tavily
+            self.search_cache = get_search_cache()
+
+        # 初始化OpenAI客户端
+        if not openai_api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables.")
+        self.openai_api_key = openai_api_key
+        self.openai_client = get_openai_client(openai_api_key)
+        self.model = DEFAULT_MODEL
+        # 进程级共享的LLM响应缓存，相同请求直接返回之前的结果
+        self.response_cache: Optional[ResponseCache] = get_response_cache()
+        # 流式输出回调，None表示使用非流式调用
+        self.stream_callback: Optional[Callable[[StreamEvent], None]] = None
+        # 进程级共享的链路追踪与指标
+        self.telemetry: Telemetry = get_telemetry()
+        # 进程级共享的弹性接入点：同一服务商的熔断状态与并发上限在所有智能体间共享
+        self.llm_endpoint: ResilientEndpoint = get_endpoint("llm")
+        self.search_endpoint: ResilientEndpoint = get_endpoint("search")
+        # 进程级共享的LLM请求调度器（RPM/TPM限速与优先级排队）
+        self.scheduler: LLMScheduler = get_llm_scheduler()
+        # 进程级共享的模型路由：按用途选择模型，self.model 为未配置路由时的默认模型
+        self.router: ModelRouter = get_model_router()
+        # 进程级共享的跨会话画像库，关闭时为None
+        self.profile_warehouse: Optional[ProfileWarehouse] = get_profile_warehouse() if self.PROFILE_KIND else None
+
+    # --- 画像库 ---
+    def _detached(self) -> "BaseAgent":
+        """不带流式回调的浅拷贝，供后台任务使用，不会向当前（或之后借用本实例的）会话推送事件"""
+        agent = copy.copy(self)
+        agent.stream_callback = None
+        return agent
+
+    def _warehouse_profile(self, name: str, refresh: Callable[["BaseAgent"], dict]) -> Optional[dict]:
+        """
+        按新鲜度策略从画像库取出画像，未命中时返回None
+
+        返回的报告附带 META_FIELD 元信息（是否收敛、轮数、更新时间、新鲜度）；
+        陈旧的未收敛画像由refresh在后台重新生成，refresh接收一个不带流式回调的智能体实例。
+        """
+        if self.profile_warehouse is None:
+            return None
+        with self.telemetry.span("profile.lookup", kind=self.PROFILE_KIND) as span:
+            record = self.profile_warehouse.get(self.PROFILE_KIND, name, lambda: refresh(self._detached()))
+            span.set_attribute("status", record["status"] if record else "miss")
+        if record is None:
+            return None
+        self.logger.info("--> 复用画像库中的%s画像（%s，%.1f 天前更新）",
+                         name, record["status"], record["age_seconds"] / 86400)
+        return {**record["report"], META_FIELD: {
+            "status": record["status"],
+            "converged": record["converged"],
+            "rounds": record["rounds"],
+            "updated_at": record["updated_at"],
+        }}
+
+    # --- 取消与超时 ---
+    def _request_timeout(self, default_seconds: float) -> float:
+        """已取消时抛出OperationCancelled，否则返回不超过令牌剩余时间的请求超时"""
+        token = current_token()
+        if token is None:
+            return default_seconds
+        token.check()
+        remaining = token.remaining()
+        if remaining is None:
+            return default_seconds
+        return max(min(default_seconds, remaining), 0.1)
+
+    @staticmethod
+    def _raise_if_cancelled():
+        token = current_token()
+        if token is not None:
+            token.check()
+
+    # --- 搜索调用 ---
+    def _cached_search(self, query: str, search_depth: str, max_results: int) -> Optional[dict]:
+        """查询搜索缓存，未命中时返回None"""
+        if self.search_cache is None:
+            return None
+        cached = self.search_cache.get_results(query, search_depth, max_results)
+        if cached is not None:
+            self.logger.debug("--> 命中搜索缓存: %s", query)
+        return cached
+
+    def _store_search(self, query: str, search_depth: str, max_results: int, response: dict):
+        if self.search_cache is not None:
+            self.search_cache.set_results(query, search_depth, max_results, response)
+
+    def _search(self, query: str, search_depth: str, max_results: int) -> dict:
+        """同步执行Tavily搜索，优先使用本地缓存"""
+        with self.telemetry.span("tavily.search", agent=type(self).__name__, search_depth=search_depth) as span:
+            span.set_attribute("payload.request_bytes", len(query.encode("utf-8")))
+            cached = self._cached_search(query, search_depth, max_results)
+            span.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                return cached
+            # 每次尝试按令牌剩余时间重新计算超时
+            response = self.search_endpoint.call(lambda: self.tavily_client.search(
+                query=query,
+                search_depth=search_depth,
+                max_results=max_results,
+                timeout=self._request_timeout(SEARCH_TIMEOUT_SECONDS)
+            ))
+            span.set_attribute("payload.response_bytes", payload_size(response))
+            self._store_search(query, search_depth, max_results, response)
+            return response
+
+    async def _asearch(self, query: str, search_depth: str, max_results: int) -> dict:
+        """异步执行Tavily搜索，优先使用本地缓存，未命中时使用进程级共享连接池"""
+        with self.telemetry.span("tavily.search", agent=type(self).__name__, search_depth=search_depth) as span:
+            span.set_attribute("payload.request_bytes", len(query.encode("utf-8")))
+            cached = self._cached_search(query, search_depth, max_results)
+            span.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                return cached
+            client = get_async_tavily_client(self.tavily_api_key)
+            response = await self.search_endpoint.acall(lambda: client.search(
+                query=query,
+                search_depth=search_depth,
+                max_results=max_results,
+                timeout=self._request_timeout(SEARCH_TIMEOUT_SECONDS)
+            ))
+            span.set_attribute("payload.response_bytes", payload_size(response))
+            self._store_search(query, search_depth, max_results, response)
+            return response
+
+    # --- LLM调用 ---
+    def _build_messages(self, system_prompt: str, user_prompt: str) -> list:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    @property
+    def prompt_version(self) -> str:
+        """缓存命名空间使用的Prompt版本，按智能体区分"""
+        return f"{type(self).__name__}:v{self.PROMPT_VERSION}"
+
+    def _cached_chat(self, cache_key: str) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        cached = self.response_cache.get(self.prompt_version, cache_key)
+        if cached is not None:
+            self.logger.debug("--> 命中LLM响应缓存，跳过模型调用")
+        return cached
+
+    def _store_chat(self, cache_key: str, content: str):
+        """仅缓存可解析为JSON对象的响应，避免把失败结果固化下来"""
+        if self.response_cache is None or not content:
+            return
+        try:
+            if not isinstance(json.loads(content), dict):
+                return
+        except json.JSONDecodeError:
+            return
+        self.response_cache.set(self.prompt_version, cache_key, content)
+
+    # --- 流式输出 ---
+    def _emit(self, kind: str, text: str = ""):
+        """向流式回调推送事件，回调出错不影响分析流程"""
+        if self.stream_callback is None:
+            return
+        try:
+            self.stream_callback(StreamEvent(type(self).__name__, kind, text))
+        except Exception as e:
+            self.logger.warning("--> 流式回调出错: %s", e)
+
+    def _consume_chunk(self, chunk, parts: list):
+        """处理一个流式片段：收集正式输出，并推送推理/输出事件"""
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta
+        reasoning = getattr(delta, "reasoning_content", None)
+        if reasoning:
+            self._emit(STREAM_REASONING, reasoning)
+        if delta.content:
+            parts.append(delta.content)
+            self._emit(STREAM_TOKEN, delta.content)
+
+    def _loads_json(self, content: str, purpose: str = ""):
+        """解析LLM返回的JSON文本，解析失败时照常抛出json.JSONDecodeError"""
+        with self.telemetry.span("json.parse", agent=type(self).__name__, purpose=purpose) as span:
+            span.set_attribute("payload.response_bytes", len(content.encode("utf-8")) if content else 0)
+            return json.loads(content)
+
+    @staticmethod
+    def _record_usage(span, usage, messages: list, content: str) -> int:
+        """记录Token用量并返回总数；接口未返回usage时（如流式响应）按文本长度估算"""
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:
+            prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+            completion_tokens = estimate_tokens(content or "")
+            span.set_attribute("tokens.estimated", True)
+        span.set_attribute("tokens.prompt", prompt_tokens)
+        span.set_attribute("tokens.completion", completion_tokens)
+        return prompt_tokens + completion_tokens
+
+    # --- LLM配额 ---
+    def _admission(self, messages: list, reservations: list) -> Callable[[], None]:
+        """返回每次尝试前向调度器申请配额的回调，预留的Token数追加到reservations"""
+        tokens = estimate_request_tokens(messages)
+        return lambda: reservations.append(self.scheduler.acquire(tokens))
+
+    def _aadmission(self, messages: list, reservations: list) -> Callable[[], Any]:
+        """_admission 的协程版本"""
+        tokens = estimate_request_tokens(messages)
+
+        async def admit():
+            reservations.append(await self.scheduler.aacquire(tokens))
+        return admit
+
+    def _settle(self, messages: list, reservations: list, actual: Optional[int]):
+        """结算所有尝试：最后一次成功的尝试按实际用量，其余尝试只计Prompt部分"""
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        for index, reserved in enumerate(reservations):
+            succeeded = actual is not None and index == len(reservations) - 1
+            self.scheduler.settle(reserved, actual if succeeded else prompt_tokens)
+
+    def _create_completion(self, client, model: str, messages: list, response_format: dict, stream: bool = False):
+        """发起一次同步请求（配额已由 _admission 在调用前申请）"""
+        return client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format=response_format,
+            timeout=http_timeout(self._request_timeout(LLM_TIMEOUT_SECONDS)),
+            **({"stream": True} if stream else {})
+        )
+
+    async def _acreate_completion(self, client, model: str, messages: list, response_format: dict, stream: bool = False):
+        """_create_completion 的异步版本"""
+        return await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format=response_format,
+            timeout=http_timeout(self._request_timeout(LLM_TIMEOUT_SECONDS)),
+            **({"stream": True} if stream else {})
+        )
+
+    def _stream_chat(self, model: str, messages: list, response_format: dict, parts: list):
+        """执行一次同步流式请求，把输出片段收集到parts中，返回接口给出的usage（可能为None）"""
+        token = current_token()
+        usage = None
+        stream = self._create_completion(self.openai_client, model, messages, response_format, stream=True)
+        # 取消时立即关闭流式连接，释放HTTP连接并停止计费
+        if token is not None:
+            token.add_callback(stream.close)
+        try:
+            for chunk in stream:
+                self._raise_if_cancelled()
+                usage = getattr(chunk, "usage", None) or usage
+                self._consume_chunk(chunk, parts)
+        finally:
+            if token is not None:
+                token.remove_callback(stream.close)
+        return usage
+
+    async def _astream_chat(self, client, model: str, messages: list, response_format: dict, parts: list):
+        """_stream_chat 的异步版本"""
+        usage = None
+        stream = await self._acreate_completion(client, model, messages, response_format, stream=True)
+        async with stream:
+            async for chunk in stream:
+                self._raise_if_cancelled()
+                usage = getattr(chunk, "usage", None) or usage
+                self._consume_chunk(chunk, parts)
+        return usage
+
+    def _needs_escalation(self, purpose: str, model: str, content: str) -> Optional[str]:
+        """快速模型的输出未通过校验时返回应升级到的模型，否则返回None"""
+        fields = self.RESPONSE_FIELDS.get(purpose)
+        escalation = self.router.escalation_for(model)
+        if fields is None or escalation is None or validate_json_fields(content, fields):
+            return None
+        self.router.record_escalation(purpose, model, escalation)
+        return escalation
+
+    def _chat(self, system_prompt: str, user_prompt: str, purpose: str = "") -> str:
+        """同步调用LLM并返回JSON格式的响应文本；按用途选择模型，必要时升级到推理模型重试"""
+        messages = self._build_messages(system_prompt, user_prompt)
+        model = self.router.model_for(purpose, self.model)
+        content = self._complete(messages, model, purpose)
+        escalation = self._needs_escalation(purpose, model, content)
+        if escalation is not None:
+            content = self._complete(messages, escalation, purpose, escalated=True)
+        return content
+
+    async def _achat(self, system_prompt: str, user_prompt: str, purpose: str = "") -> str:
+        """_chat() 的协程版本，未命中缓存时使用进程级共享连接池"""
+        messages = self._build_messages(system_prompt, user_prompt)
+        model = self.router.model_for(purpose, self.model)
+        content = await self._acomplete(messages, model, purpose)
+        escalation = self._needs_escalation(purpose, model, content)
+        if escalation is not None:
+            content = await self._acomplete(messages, escalation, purpose, escalated=True)
+        return content
+
+    def _complete(self, messages: list, model: str, purpose: str, escalated: bool = False) -> str:
+        """用指定模型完成一次同步调用，优先使用响应缓存"""
+        response_format = {"type": "json_object"}
+        self.router.record_call(purpose, model)
+        with self.telemetry.span("llm.chat", agent=type(self).__name__, model=model, purpose=purpose) as span:
+            span.set_attribute("escalated", escalated)
+            span.set_attribute("payload.request_bytes", payload_size(messages))
+            cache_key = ResponseCache.make_key(model, messages, response_format)
+            cached = self._cached_chat(cache_key)
+            span.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                self._emit(STREAM_CACHED)
+                return cached
+
+            span.set_attribute("stream", self.stream_callback is not None)
+            reservations = []
+            actual = None
+            admit = self._admission(messages, reservations)
+            try:
+                if self.stream_callback is None:
+                    response = self.llm_endpoint.call(self._create_completion, self.openai_client, model, messages,
+                                                      response_format, before_attempt=admit)
+                    content = response.choices[0].message.content
+                    usage = getattr(response, "usage", None)
+                else:
+                    self._emit(STREAM_START)
+                    parts = []
+                    token = current_token()
+                    try:
+                        # 已推送过片段后不再重试，避免界面上出现重复输出
+                        usage = self.llm_endpoint.call(self._stream_chat, model, messages, response_format, parts,
+                                                       retryable=lambda error: not parts, before_attempt=admit)
+                    except Exception as e:
+                        self._emit(STREAM_ERROR, str(e))
+                        if token is not None and token.cancelled and not isinstance(e, OperationCancelled):
+                            raise OperationCancelled(token.reason or "操作已取消") from e
+                        raise
+                    content = "".join(parts)
+                    self._emit(STREAM_DONE)
+                span.set_attribute("payload.response_bytes", len(content.encode("utf-8")) if content else 0)
+                actual = self._record_usage(span, usage, messages, content)
+            finally:
+                self._settle(messages, reservations, actual)
+            self._store_chat(cache_key, content)
+            return content
+
+    async def _acomplete(self, messages: list, model: str, purpose: str, escalated: bool = False) -> str:
+        """_complete() 的协程版本"""
+        response_format = {"type": "json_object"}
+        self.router.record_call(purpose, model)
+        with self.telemetry.span("llm.chat", agent=type(self).__name__, model=model, purpose=purpose) as span:
+            span.set_attribute("escalated", escalated)
+            span.set_attribute("payload.request_bytes", payload_size(messages))
+            cache_key = ResponseCache.make_key(model, messages, response_format)
+            cached = self._cached_chat(cache_key)
+            span.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                self._emit(STREAM_CACHED)
+                return cached
+
+            client = get_async_openai_client(self.openai_api_key)
+            span.set_attribute("stream", self.stream_callback is not None)
+            reservations = []
+            actual = None
+            admit = self._aadmission(messages, reservations)
+            try:
+                if self.stream_callback is None:
+                    response = await self.llm_endpoint.acall(self._acreate_completion, client, model, messages,
+                                                             response_format, before_attempt=admit)
+                    content = response.choices[0].message.content
+                    usage = getattr(response, "usage", None)
+                else:
+                    self._emit(STREAM_START)
+                    parts = []
+                    try:
+                        usage = await self.llm_endpoint.acall(self._astream_chat, client, model, messages,
+                                                              response_format, parts, retryable=lambda error: not parts,
+                                                              before_attempt=admit)
+                    except Exception as e:
+                        self._emit(STREAM_ERROR, str(e))
+                        raise
+                    content = "".join(parts)
+                    self._emit(STREAM_DONE)
+                span.set_attribute("payload.response_bytes", len(content.encode("utf-8")) if content else 0)
+                actual = self._record_usage(span, usage, messages, content)
+            finally:
+                self._settle(messages, reservations, actual)
+            self._store_chat(cache_key, content)
+            return content
@@ -0,0 +1,353 @@
+"""
+本地持久化缓存 (Cache)
+
+职责:
+1.  提供基于SQLite的磁盘缓存(DiskCache)，支持TTL过期、按条目数上限的LRU淘汰以及命中/未命中统计。
+2.  在此基础上提供Tavily搜索结果缓存(SearchCache)，以规范化后的查询、search_depth和max_results
+    作为内容寻址的缓存键，重复的热门查询无需再次访问网络或消耗API额度。
+3.  提供LLM响应缓存(ResponseCache)：内存LRU层 + SQLite持久层，以完整请求的哈希作为键，
+    并按Prompt版本划分命名空间，Prompt修改后可整体失效。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# --- 默认配置（可通过环境变量覆盖） ---
+DEFAULT_CACHE_PATH = os.path.join(".cache", "agents_cache.sqlite")
+DEFAULT_SEARCH_TTL = 24 * 3600
+DEFAULT_SEARCH_MAX_ENTRIES = 5000
+DEFAULT_LLM_TTL = 7 * 24 * 3600
+DEFAULT_LLM_MAX_ENTRIES = 2000
+DEFAULT_LLM_MEMORY_SIZE = 256
+
+
+class DiskCache:
+    """基于SQLite的键值缓存，值以JSON形式存储"""
+
+    def __init__(self, path: str, namespace: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_entries (namespace, accessed_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，过期或不存在时返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                # 已过期，直接删除
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                )
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        """写入缓存，超过条目上限时淘汰最久未访问的条目"""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, payload, now, now)
+            )
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def _evict_if_needed(self):
+        """按LRU策略淘汰超出上限的条目（调用方需持有锁）"""
+        count = self._conn.execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                """
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (self.namespace, self.namespace, overflow)
+            )
+            self.evictions += overflow
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """清空当前命名空间下的所有条目"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中等统计信息"""
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询：统一全角/半角、大小写并压缩空白"""
+    normalized = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(normalized.split())
+
+
+class SearchCache(DiskCache):
+    """Tavily搜索结果缓存，键由规范化查询、search_depth和max_results共同决定"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_SEARCH_TTL,
+                 max_entries: int = DEFAULT_SEARCH_MAX_ENTRIES):
+        super().__init__(path, namespace="tavily_search", ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    @staticmethod
+    def make_key(query: str, search_depth: str, max_results: int) -> str:
+        raw = json.dumps([normalize_query(query), search_depth, max_results], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_results(self, query: str, search_depth: str, max_results: int) -> Optional[dict]:
+        return self.get(self.make_key(query, search_depth, max_results))
+
+    def set_results(self, query: str, search_depth: str, max_results: int, response: dict):
+        self.set(self.make_key(query, search_depth, max_results), response)
+
+
+_search_cache: Optional[SearchCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    获取进程级共享的搜索缓存
+
+    通过环境变量配置：SEARCH_CACHE_ENABLED(默认开启)、SEARCH_CACHE_PATH、
+    SEARCH_CACHE_TTL(秒)、SEARCH_CACHE_MAX_ENTRIES。关闭时返回None。
+    """
+    global _search_cache
+    if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache(
+                path=os.getenv("SEARCH_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL", DEFAULT_SEARCH_TTL)),
+                max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", DEFAULT_SEARCH_MAX_ENTRIES)),
+            )
+        return _search_cache
+
+
+class MemoryCache:
+    """进程内LRU缓存层，带TTL过期"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            created_at, value = entry
+            if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class ResponseCache:
+    """
+    LLM响应缓存
+
+    每个Prompt版本对应一组独立的缓存层（默认内存层 + 磁盘层），查询时按顺序逐层查找，
+    低层命中后回填到上层。可通过 tier_factory 替换为自定义的缓存层实现。
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = DEFAULT_LLM_TTL,
+                 max_entries: int = DEFAULT_LLM_MAX_ENTRIES, memory_size: int = DEFAULT_LLM_MEMORY_SIZE,
+                 tier_factory=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_size = memory_size
+        self.tier_factory = tier_factory or self._default_tiers
+        self._tiers: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def _default_tiers(self, prompt_version: str) -> List[Any]:
+        return [
+            MemoryCache(max_entries=self.memory_size, ttl_seconds=self.ttl_seconds),
+            DiskCache(self.path, namespace=f"llm_response:{prompt_version}",
+                      ttl_seconds=self.ttl_seconds, max_entries=self.max_entries),
+        ]
+
+    def _tiers_for(self, prompt_version: str) -> List[Any]:
+        with self._lock:
+            tiers = self._tiers.get(prompt_version)
+            if tiers is None:
+                tiers = self.tier_factory(prompt_version)
+                self._tiers[prompt_version] = tiers
+            return tiers
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], response_format: Optional[dict]) -> str:
+        """以完整请求内容的哈希作为缓存键"""
+        raw = json.dumps(
+            {"model": model, "messages": messages, "response_format": response_format},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, prompt_version: str, key: str) -> Optional[str]:
+        tiers = self._tiers_for(prompt_version)
+        for index, tier in enumerate(tiers):
+            value = tier.get(key)
+            if value is not None:
+                # 回填到更快的上层
+                for upper in tiers[:index]:
+                    upper.set(key, value)
+                return value
+        return None
+
+    def set(self, prompt_version: str, key: str, value: str):
+        for tier in self._tiers_for(prompt_version):
+            tier.set(key, value)
+
+    def invalidate(self, prompt_version: str):
+        """使某个Prompt版本下的全部缓存失效"""
+        for tier in self._tiers_for(prompt_version):
+            tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            versions = dict(self._tiers)
+        return {
+            version: [tier.stats() for tier in tiers]
+            for version, tiers in versions.items()
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    获取进程级共享的LLM响应缓存
+
+    通过环境变量配置：LLM_CACHE_ENABLED(默认开启)、LLM_CACHE_PATH、LLM_CACHE_TTL(秒)、
+    LLM_CACHE_MAX_ENTRIES、LLM_CACHE_MEMORY_SIZE。关闭时返回None。
+    """
+    global _response_cache
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL", DEFAULT_LLM_TTL)),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_LLM_MAX_ENTRIES)),
+                memory_size=int(os.getenv("LLM_CACHE_MEMORY_SIZE", DEFAULT_LLM_MEMORY_SIZE)),
+            )
+        return _response_cache
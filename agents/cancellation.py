@@ -0,0 +1,219 @@
+"""
+可取消的任务执行层 (CancellationToken / CancellableExecutor)
+
+职责:
+1.  提供协作式取消令牌：超时或调用方放弃时标记取消，智能体在每次网络调用前后检查令牌并尽快退出。
+2.  令牌通过上下文变量传递给智能体，BaseAgent据此缩短HTTP超时、关闭进行中的流式连接，
+    调用方放弃后不再继续占用连接和消耗token。
+3.  提供有界的共享线程池，替代"每次调用新建一个线程"的做法，并统计进行中的调用数量。
+"""
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import contextvars
+import os
+import threading
+import time
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class OperationCancelled(Exception):
+    """操作已被取消（超时或调用方放弃）"""
+
+
+class CancellationToken:
+    def __init__(self, timeout: Optional[float] = None, deferred: bool = False):
+        """
+        Args:
+            timeout: 最长执行时间（秒），None表示不设截止时间
+            deferred: 为True时截止时间从 start() 开始计算（如任务真正开始执行时），而不是从创建时
+        """
+        self.timeout = timeout
+        self.deadline = None if timeout is None or deferred else time.monotonic() + timeout
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("操作超时")
+            return True
+        return False
+
+    def cancel(self, reason: str = "操作已取消"):
+        """标记取消并执行已注册的回调（如关闭流式连接）"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("--> 取消回调出错: %s", e)
+
+    def start(self):
+        """开始计时；截止时间已确定时不做任何事"""
+        if self.deadline is None and self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+
+    def remaining(self) -> Optional[float]:
+        """距离截止时间的剩余秒数，未设置截止时间时返回None"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def check(self):
+        """已取消时抛出OperationCancelled"""
+        if self.cancelled:
+            raise OperationCancelled(self.reason or "操作已取消")
+
+    def add_callback(self, callback: Callable[[], None]):
+        """注册取消时执行的回调；令牌已取消时立即执行"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+_current_token: "contextvars.ContextVar[Optional[CancellationToken]]" = contextvars.ContextVar(
+    "cancellation_token", default=None
+)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """获取当前执行上下文中的取消令牌"""
+    return _current_token.get()
+
+
+@contextmanager
+def use_token(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    """在当前执行上下文中设置取消令牌"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+class CancellableExecutor:
+    def __init__(self, max_workers: int = 8, name: str = "agent"):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "in_flight": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def _count(self, name: str, delta: int = 1):
+        with self._lock:
+            self._counters[name] += delta
+
+    def submit(self, func: Callable[..., Any], *args, token: Optional[CancellationToken] = None,
+               **kwargs) -> Tuple[Future, CancellationToken]:
+        """提交任务，任务在令牌与提交方上下文（如当前追踪Span）中执行；返回 (Future, 令牌)"""
+        token = token or CancellationToken()
+        context = contextvars.copy_context()
+
+        def run():
+            # 排队期间已被取消的任务不再执行
+            if token.cancelled:
+                self._count("cancelled")
+                raise OperationCancelled(token.reason or "操作已取消")
+            # 排队等待不计入任务自身的执行时间
+            token.start()
+            self._count("in_flight")
+            try:
+                with use_token(token):
+                    result = func(*args, **kwargs)
+                self._count("completed")
+                return result
+            except OperationCancelled:
+                self._count("cancelled")
+                raise
+            except Exception:
+                self._count("failed")
+                raise
+            finally:
+                self._count("in_flight", -1)
+
+        self._count("submitted")
+        return self._pool.submit(context.run, run), token
+
+    def wait_all(self, futures: Dict[Future, Any], timeout: Optional[float] = None,
+                 poll: Optional[Callable[[], None]] = None, poll_interval: float = 0.5):
+        """等待任务完成或超时；poll为等待期间定期执行的回调。返回 (已完成, 未完成)"""
+        if poll is None:
+            return wait(futures, timeout=timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        not_done = set(futures)
+        while not_done:
+            wait_time = poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait_time = min(poll_interval, remaining)
+            _, not_done = wait(not_done, timeout=wait_time, return_when=FIRST_COMPLETED)
+            poll()
+        return set(futures) - not_done, not_done
+
+    def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None,
+            poll: Optional[Callable[[], None]] = None, **kwargs) -> Tuple[Any, Optional[str]]:
+        """
+        执行任务并等待结果，超时后取消任务并立即返回
+
+        Returns:
+            tuple: (结果, 错误信息)，成功时错误信息为None
+        """
+        future, token = self.submit(func, *args, token=CancellationToken(timeout, deferred=True), **kwargs)
+        done, _ = self.wait_all({future: None}, timeout=timeout, poll=poll)
+        if not done:
+            self.cancel(future, token)
+            return None, f"操作超时 ({timeout}秒)"
+        error = future.exception()
+        if error is not None:
+            return None, f"执行出错: {str(error)}"
+        return future.result(), None
+
+    def cancel(self, future: Future, token: CancellationToken, reason: str = "操作超时"):
+        """取消任务：排队中的任务直接移除，执行中的任务通过令牌协作退出"""
+        token.cancel(reason)
+        if future.cancel():
+            self._count("cancelled")
+
+    def stats(self) -> Dict[str, int]:
+        """任务统计：in_flight为正在执行的调用数，queued为排队中的调用数"""
+        with self._lock:
+            counters = dict(self._counters)
+        finished = counters["completed"] + counters["failed"] + counters["cancelled"]
+        counters["queued"] = max(counters["submitted"] - finished - counters["in_flight"], 0)
+        counters["max_workers"] = self.max_workers
+        return counters
+
+
+_shared_executor: Optional[CancellableExecutor] = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_shared_executor() -> CancellableExecutor:
+    """获取进程级共享的有界执行器，线程数可通过环境变量 AGENT_EXECUTOR_MAX_WORKERS 配置"""
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            max_workers = int(os.getenv("AGENT_EXECUTOR_MAX_WORKERS", "8"))
+            _shared_executor = CancellableExecutor(max_workers=max_workers, name="agent-call")
+        return _shared_executor
@@ -1,23 +1,123 @@
-from openai import OpenAI
 import json
-from typing import Dict, Any
+import logging
+from typing import Dict, Any, List, Optional, Tuple
 
-class DataInsightAnalyst:
-    def __init__(self, openai_api_key: str):
-        if not openai_api_key:
-            raise ValueError("API key not found in environment variables.")
-        # 注意：使用您指定的SiliconFlow接入点
-        self.openai_client = OpenAI(base_url='https://api.siliconflow.cn/v1', api_key=openai_api_key)
-        print("数据洞察师已初始化，并被赋予'批判者'角色。")
+from .base_agent import BaseAgent
+from .cancellation import OperationCancelled
+from .skill_matcher import SkillMatcher, normalize_skill
+from .skill_vocabulary import AhoCorasick, get_skill_vocabulary
+from .report_diff import format_delta, summarize_critique
+from .prompt_builder import PromptBuilder, format_items
+
+class DataInsightAnalyst(BaseAgent):
+    RESPONSE_FIELDS = {
+        "critique": ("education_questions", "industry_questions"),
+        "scoring": ("core_skills_matched", "related_skills_matched", "skill_gaps"),
+    }
+
+    def __init__(self, openai_api_key: str, skill_matcher: SkillMatcher = None, use_llm_for_borderline: bool = True):
+        """
+        Args:
+            openai_api_key: OpenAI兼容接口的API Key
+            skill_matcher: 本地技能匹配器，可调整核心/相关阈值
+            use_llm_for_borderline: 是否对临界技能调用LLM复核，关闭后量化分析完全离线
+        """
+        # 注意：使用您指定的SiliconFlow接入点，批判者不需要搜索工具
+        super().__init__(openai_api_key=openai_api_key, use_search=False)
+        self.skill_matcher = skill_matcher or SkillMatcher()
+        self.use_llm_for_borderline = use_llm_for_borderline
+        self.logger.info("数据洞察师已初始化，并被赋予'批判者'角色。")
 
     def run_critique(self, education_report: dict, industry_report: dict) -> Dict[str, Any]:
         """
         以"批判者"的身份，对教育和行业分析师的报告提出质疑和问题。
         新版本：生成分类问题，分别针对教育和行业进行定向质疑
         """
+        insufficient_result = self._check_critique_inputs(education_report, industry_report)
+        if insufficient_result is not None:
+            return insufficient_result
+
+        try:
+            system_prompt, user_prompt = self._build_critique_prompts(education_report, industry_report)
+            self.logger.debug("--> 正在连接DeepSeek API进行分类批判性分析...")
+            self.logger.debug("--> 预计需要30-45秒，正在生成定向质疑问题...")
+            response_content = self._chat(system_prompt, user_prompt, "critique")
+            return self._parse_critique_response(response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._critique_error_result(e)
+
+    async def arun_critique(self, education_report: dict, industry_report: dict) -> Dict[str, Any]:
+        """
+        run_critique() 的协程版本，使用进程级共享的异步连接池
+        """
+        insufficient_result = self._check_critique_inputs(education_report, industry_report)
+        if insufficient_result is not None:
+            return insufficient_result
+
+        try:
+            system_prompt, user_prompt = self._build_critique_prompts(education_report, industry_report)
+            self.logger.debug("--> 正在连接DeepSeek API进行分类批判性分析...")
+            self.logger.debug("--> 预计需要30-45秒，正在生成定向质疑问题...")
+            response_content = await self._achat(system_prompt, user_prompt, "critique")
+            return self._parse_critique_response(response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._critique_error_result(e)
+
+    def run_incremental_critique(self, education_report: dict, industry_report: dict,
+                                 report_deltas: Dict[str, Dict[str, Any]], previous_critique: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        增量批判：只把本轮报告的变化和上一轮批判摘要发送给模型，输出格式与 run_critique() 一致
+
+        Args:
+            report_deltas: diff_critiqued_reports() 的结果
+            previous_critique: 上一轮的批判结果
+        """
+        insufficient_result = self._check_critique_inputs(education_report, industry_report)
+        if insufficient_result is not None:
+            return insufficient_result
+
+        try:
+            system_prompt, user_prompt = self._build_incremental_critique_prompts(
+                education_report, industry_report, report_deltas, previous_critique
+            )
+            self.logger.debug("--> 正在连接DeepSeek API进行增量批判分析（仅审查本轮变化）...")
+            response_content = self._chat(system_prompt, user_prompt, "critique")
+            return self._parse_critique_response(response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._critique_error_result(e)
+
+    async def arun_incremental_critique(self, education_report: dict, industry_report: dict,
+                                        report_deltas: Dict[str, Dict[str, Any]], previous_critique: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        run_incremental_critique() 的协程版本，使用进程级共享的异步连接池
+        """
+        insufficient_result = self._check_critique_inputs(education_report, industry_report)
+        if insufficient_result is not None:
+            return insufficient_result
+
+        try:
+            system_prompt, user_prompt = self._build_incremental_critique_prompts(
+                education_report, industry_report, report_deltas, previous_critique
+            )
+            self.logger.debug("--> 正在连接DeepSeek API进行增量批判分析（仅审查本轮变化）...")
+            response_content = await self._achat(system_prompt, user_prompt, "critique")
+            return self._parse_critique_response(response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._critique_error_result(e)
+
+    def _check_critique_inputs(self, education_report: dict, industry_report: dict) -> Optional[Dict[str, Any]]:
+        """检查上游报告是否足以进行批判，不足时返回默认结果"""
         major_name = education_report.get("major_name", "N/A")
         job_title = industry_report.get("job_title", "N/A")
-        print(f"批判者开始审查 {major_name} 和 {job_title} 的分析报告...")
+        self.logger.info("批判者开始审查 %s 和 %s 的分析报告...", major_name, job_title)
 
         education_skills = education_report.get("required_skills", [])
         industry_skills = industry_report.get("required_skills", [])
@@ -28,192 +128,345 @@ class DataInsightAnalyst:
                 "critique_summary": "上游报告信息不足，无法进行有效批判。", 
                 "education_questions": [],
                 "industry_questions": [],
-                "questions_for_next_round": []  # 保持向后兼容
+                "questions_for_next_round": [],  # 保持向后兼容
+                "insufficient": True
             }
+        return None
+
+    def _build_critique_prompts(self, education_report: dict, industry_report: dict) -> Tuple[str, str]:
+        """构建批判分析的Prompt"""
+        major_name = education_report.get("major_name", "N/A")
+        job_title = industry_report.get("job_title", "N/A")
+        fields = (PromptBuilder()
+                  .add_report(education_report, "critique_education", prefix="education.")
+                  .add_report(industry_report, "critique_industry", prefix="industry.")
+                  .build())
+
+        system_prompt = """
+        You are a sharp, critical, and detail-oriented data scientist. Your role is to challenge assumptions and identify weaknesses in analysis provided by education and industry experts.
+
+        You are given two analysis reports: one on a university major (`education_report`) and one on a job role (`industry_report`). Your task is to:
 
+        1. **Identify Discrepancies and Gaps**: Scrutinize both skill lists for mismatches and gaps.
+
+        2. **Generate Targeted Questions**: Create specific questions for each expert:
+           - **Education Questions**: Focus on curriculum, course depth, practical training, skill development
+           - **Industry Questions**: Focus on market trends, salary ranges, career paths, emerging requirements
+
+        3. **Balance the Critique**: Don't just find problems - suggest areas for improvement.
+
+        **CRITICAL**: You must generate separate question lists for each expert domain.
+
+        Respond ONLY with a valid JSON object in the following format:
+        {
+            "critique_summary": "Brief summary of main gaps and issues found",
+            "education_questions": [
+                "Specific question about curriculum depth?",
+                "Question about practical vs theoretical balance?",
+                "Question about specific technical skills training?"
+            ],
+            "industry_questions": [
+                "Question about market demand trends?",
+                "Question about salary expectations?",
+                "Question about career progression paths?"
+            ]
+        }
+
+        **Guidelines for Questions:**
+        - Education questions should focus on: curriculum gaps, practical training, skill depth, emerging technologies in education
+        - Industry questions should focus on: market trends, compensation, career growth, industry-specific requirements
+        - Each list should have 2-4 specific, actionable questions
+        - Questions should be designed to improve the respective analysis
+        """
+
+        user_prompt = f"""
+        Here are the reports for your targeted critique:
+
+        **Education Report Analysis:**
+        - Major: {major_name}
+        - Skills Taught: {fields['education.required_skills']}
+        - Core Courses: {fields['education.core_courses']}
+
+        **Industry Report Analysis:**
+        - Job Title: {job_title}
+        - Required Skills: {fields['industry.required_skills']}
+        - Responsibilities: {fields['industry.responsibilities']}
+        - Market Trends: {fields['industry.market_trends']}
+        - Career Growth: {fields['industry.career_growth']}
+
+        Please provide targeted critique with separate question lists for education and industry experts.
+        """
+        return system_prompt, user_prompt
+
+    def _build_incremental_critique_prompts(self, education_report: dict, industry_report: dict,
+                                            report_deltas: Dict[str, Dict[str, Any]],
+                                            previous_critique: Dict[str, Any]) -> Tuple[str, str]:
+        """构建增量批判的Prompt：只包含上一轮批判摘要与两份报告的变化"""
+        major_name = education_report.get("major_name", "N/A")
+        job_title = industry_report.get("job_title", "N/A")
+        prior = summarize_critique(previous_critique or {})
+        education_changes = format_delta(report_deltas.get("education_report", {})) or ["- (unchanged)"]
+        industry_changes = format_delta(report_deltas.get("industry_report", {})) or ["- (unchanged)"]
+        education_changes = "\n        ".join(education_changes)
+        industry_changes = "\n        ".join(industry_changes)
+
+        system_prompt = """
+        You are a sharp, critical, and detail-oriented data scientist reviewing a follow-up round of analysis.
+
+        In the previous round you critiqued an education report and an industry report and asked targeted questions.
+        The experts have revised their reports. You are given ONLY your previous critique and the fields that changed.
+
+        Your task is to:
+        1. Judge whether the changes address your previous questions.
+        2. Ask new questions only about issues that remain unresolved or that the changes introduced.
+        3. Do not repeat questions about a report that is unchanged.
+
+        Respond ONLY with a valid JSON object in the following format:
+        {
+            "critique_summary": "Brief summary of what the changes resolved and what remains",
+            "education_questions": ["Question for the education expert?"],
+            "industry_questions": ["Question for the industry expert?"]
+        }
+
+        Each list should have 0-3 specific, actionable questions. Return empty lists when the revisions are sufficient.
+        """
+
+        user_prompt = f"""
+        **Your Previous Critique:**
+        - Summary: {prior['critique_summary']}
+        - Education Questions: {format_items(prior['education_questions'])}
+        - Industry Questions: {format_items(prior['industry_questions'])}
+
+        **Education Report Changes (Major: {major_name}):**
+        {education_changes}
+
+        **Industry Report Changes (Job Title: {job_title}):**
+        {industry_changes}
+
+        Please provide your follow-up critique with separate question lists for education and industry experts.
+        """
+        return system_prompt, user_prompt
+
+    def _parse_critique_response(self, response_content: str) -> Dict[str, Any]:
+        """解析批判分析的LLM响应"""
+        self.logger.debug("--> 正在解析分类批判分析结果...")
+        # 安全的JSON解析
+        self.logger.debug("--> 收到批判响应内容: %.200s...", response_content)
+        
         try:
-            system_prompt = """
-            You are a sharp, critical, and detail-oriented data scientist. Your role is to challenge assumptions and identify weaknesses in analysis provided by education and industry experts.
-
-            You are given two analysis reports: one on a university major (`education_report`) and one on a job role (`industry_report`). Your task is to:
-            
-            1. **Identify Discrepancies and Gaps**: Scrutinize both skill lists for mismatches and gaps.
-            
-            2. **Generate Targeted Questions**: Create specific questions for each expert:
-               - **Education Questions**: Focus on curriculum, course depth, practical training, skill development
-               - **Industry Questions**: Focus on market trends, salary ranges, career paths, emerging requirements
-            
-            3. **Balance the Critique**: Don't just find problems - suggest areas for improvement.
-
-            **CRITICAL**: You must generate separate question lists for each expert domain.
-
-            Respond ONLY with a valid JSON object in the following format:
-            {
-                "critique_summary": "Brief summary of main gaps and issues found",
-                "education_questions": [
-                    "Specific question about curriculum depth?",
-                    "Question about practical vs theoretical balance?",
-                    "Question about specific technical skills training?"
-                ],
-                "industry_questions": [
-                    "Question about market demand trends?",
-                    "Question about salary expectations?",
-                    "Question about career progression paths?"
-                ]
-            }
-            
-            **Guidelines for Questions:**
-            - Education questions should focus on: curriculum gaps, practical training, skill depth, emerging technologies in education
-            - Industry questions should focus on: market trends, compensation, career growth, industry-specific requirements
-            - Each list should have 2-4 specific, actionable questions
-            - Questions should be designed to improve the respective analysis
-            """
-            
-            user_prompt = f"""
-            Here are the reports for your targeted critique:
-            
-            **Education Report Analysis:**
-            - Major: {major_name}
-            - Skills Taught: {education_skills}
-            - Core Courses: {education_report.get('core_courses', [])}
-            
-            **Industry Report Analysis:**
-            - Job Title: {job_title}
-            - Required Skills: {industry_skills}
-            - Responsibilities: {industry_report.get('responsibilities', [])}
-            - Market Trends: {industry_report.get('market_trends', [])}
-            - Career Growth: {industry_report.get('career_growth', [])}
-            
-            Please provide targeted critique with separate question lists for education and industry experts.
-            """
-
-            print("--> 正在连接DeepSeek API进行分类批判性分析...")
-            print("--> 预计需要30-45秒，正在生成定向质疑问题...")
-            response = self.openai_client.chat.completions.create(
-                model="deepseek-ai/DeepSeek-R1",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            print("--> 正在解析分类批判分析结果...")
-            # 安全的JSON解析
-            response_content = response.choices[0].message.content
-            print(f"--> 收到批判响应内容: {response_content[:200]}...")  # 打印前200字符用于调试
-            
-            try:
-                critique_result = json.loads(response_content)
-                
-                # 验证返回的数据结构
-                if not isinstance(critique_result, dict):
-                    raise ValueError(f"期望字典格式，但收到: {type(critique_result)}")
-                
-                # 确保必要字段存在
-                if "critique_summary" not in critique_result:
-                    critique_result["critique_summary"] = "批判分析出现问题"
-                
-                if "education_questions" not in critique_result:
-                    critique_result["education_questions"] = []
-                elif not isinstance(critique_result["education_questions"], list):
-                    critique_result["education_questions"] = []
-                
-                if "industry_questions" not in critique_result:
-                    critique_result["industry_questions"] = []
-                elif not isinstance(critique_result["industry_questions"], list):
-                    critique_result["industry_questions"] = []
-                
-                # 为了保持向后兼容，合并所有问题到旧字段
-                all_questions = critique_result["education_questions"] + critique_result["industry_questions"]
-                critique_result["questions_for_next_round"] = all_questions
-                
-                print(f"--> 批判性分析完成: {len(critique_result['education_questions'])} 个教育问题, {len(critique_result['industry_questions'])} 个行业问题")
-                
-            except json.JSONDecodeError as e:
-                print(f"--> 批判JSON解析失败: {e}")
-                # 返回默认结构
-                critique_result = {
-                    "critique_summary": "JSON解析失败，无法进行有效批判",
-                    "education_questions": [],
-                    "industry_questions": [],
-                    "questions_for_next_round": []
-                }
-            
-            return critique_result
+            critique_result = self._loads_json(response_content, "critique")
 
-        except Exception as e:
-            print(f"--> 批判者在执行中出错: {e}")
-            return { 
-                "error": "Failed during critique analysis.", 
-                "details": str(e),
-                "critique_summary": "批判分析失败",
+            # 验证返回的数据结构
+            if not isinstance(critique_result, dict):
+                raise ValueError(f"期望字典格式，但收到: {type(critique_result)}")
+
+            # 确保必要字段存在
+            if "critique_summary" not in critique_result:
+                critique_result["critique_summary"] = "批判分析出现问题"
+
+            if "education_questions" not in critique_result:
+                critique_result["education_questions"] = []
+            elif not isinstance(critique_result["education_questions"], list):
+                critique_result["education_questions"] = []
+
+            if "industry_questions" not in critique_result:
+                critique_result["industry_questions"] = []
+            elif not isinstance(critique_result["industry_questions"], list):
+                critique_result["industry_questions"] = []
+
+            # 为了保持向后兼容，合并所有问题到旧字段
+            all_questions = critique_result["education_questions"] + critique_result["industry_questions"]
+            critique_result["questions_for_next_round"] = all_questions
+
+            self.logger.info("--> 批判性分析完成: %s 个教育问题, %s 个行业问题", len(critique_result['education_questions']), len(critique_result['industry_questions']))
+
+        except json.JSONDecodeError as e:
+            self.logger.warning("--> 批判JSON解析失败: %s", e)
+            # 返回默认结构
+            critique_result = {
+                "critique_summary": "JSON解析失败，无法进行有效批判",
                 "education_questions": [],
                 "industry_questions": [],
                 "questions_for_next_round": []
             }
+        
+        return critique_result
+
+    def _critique_error_result(self, error: Exception) -> Dict[str, Any]:
+        """批判执行出错时的默认结果"""
+        self.logger.warning("--> 批判者在执行中出错: %s", error)
+        return { 
+            "error": "Failed during critique analysis.", 
+            "details": str(error),
+            "critique_summary": "批判分析失败",
+            "education_questions": [],
+            "industry_questions": [],
+            "questions_for_next_round": []
+        }
 
     def run(self, education_report: dict, industry_report: dict) -> dict:
         """
         使用DeepSeek模型对专业和行业的技能进行语义匹配分析
         现在具有更强的错误处理能力
         """
-        print("数据洞察师开始进行最终量化分析...")
+        self.logger.info("数据洞察师开始进行最终量化分析...")
         
         # 使用改进的量化分析方法，具有更好的错误处理能力
         try:
             analysis_result = self.final_quantitative_analysis(education_report, industry_report)
-            
-            # 转换为兼容的输出格式
-            return {
-                "match_score_percent": analysis_result.get("matching_score", 0),
-                "matching_level": analysis_result.get("matching_level", "需要提升"),
-                "common_skills_semantic": {
-                    "core_matches": analysis_result["analysis_summary"].get("core_skills_matched", []),
-                    "related_matches": analysis_result["analysis_summary"].get("related_skills_matched", [])
-                },
-                "skill_gaps": analysis_result["analysis_summary"].get("skill_gaps", []),
-                "education_highlights": education_report.get("core_courses", []),
-                "industry_highlights": industry_report.get("responsibilities", []),
-                "summary": f"匹配度分析完成：{analysis_result.get('matching_score', 0):.1f}分 ({analysis_result.get('matching_level', '需要提升')})"
-            }
-            
+            return self._format_final_result(analysis_result, education_report, industry_report)
+        except OperationCancelled:
+            raise
         except Exception as e:
-            print(f"--> 量化分析过程出错: {e}")
-            
-            # 即使出错也返回基本的分析结果
-            return {
-                "match_score_percent": 45.0,  # 给一个中等分数
-                "matching_level": "基础匹配",
-                "common_skills_semantic": {
-                    "core_matches": ["基础技能匹配"],
-                    "related_matches": ["相关技能匹配"]
-                },
-                "skill_gaps": ["分析过程出现问题，建议手动评估"],
-                "education_highlights": education_report.get("core_courses", ["基础课程"]),
-                "industry_highlights": industry_report.get("responsibilities", ["基础职责"]),
-                "summary": "由于技术问题，提供基础匹配度评估：45.0分 (基础匹配)",
-                "error_note": f"分析过程遇到技术问题: {str(e)}"
-            }
+            return self._fallback_final_result(e, education_report, industry_report)
+
+    async def arun(self, education_report: dict, industry_report: dict) -> dict:
+        """
+        run() 的协程版本，使用进程级共享的异步连接池
+        """
+        self.logger.info("数据洞察师开始进行最终量化分析...")
+
+        try:
+            analysis_result = await self.afinal_quantitative_analysis(education_report, industry_report)
+            return self._format_final_result(analysis_result, education_report, industry_report)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._fallback_final_result(e, education_report, industry_report)
+
+    def _format_final_result(self, analysis_result: dict, education_report: dict, industry_report: dict) -> dict:
+        """转换为兼容的输出格式"""
+        return {
+            "match_score_percent": analysis_result.get("matching_score", 0),
+            "matching_level": analysis_result.get("matching_level", "需要提升"),
+            "common_skills_semantic": {
+                "core_matches": analysis_result["analysis_summary"].get("core_skills_matched", []),
+                "related_matches": analysis_result["analysis_summary"].get("related_skills_matched", [])
+            },
+            "skill_gaps": analysis_result["analysis_summary"].get("skill_gaps", []),
+            "education_highlights": education_report.get("core_courses", []),
+            "industry_highlights": industry_report.get("responsibilities", []),
+            "summary": f"匹配度分析完成：{analysis_result.get('matching_score', 0):.1f}分 ({analysis_result.get('matching_level', '需要提升')})"
+        }
+
+    def _fallback_final_result(self, error: Exception, education_report: dict, industry_report: dict) -> dict:
+        """量化分析出错时的基础分析结果"""
+        self.logger.warning("--> 量化分析过程出错: %s", error)
+        
+        # 即使出错也返回基本的分析结果
+        return {
+            "match_score_percent": 45.0,  # 给一个中等分数
+            "matching_level": "基础匹配",
+            "common_skills_semantic": {
+                "core_matches": ["基础技能匹配"],
+                "related_matches": ["相关技能匹配"]
+            },
+            "skill_gaps": ["分析过程出现问题，建议手动评估"],
+            "education_highlights": education_report.get("core_courses", ["基础课程"]),
+            "industry_highlights": industry_report.get("responsibilities", ["基础职责"]),
+            "summary": "由于技术问题，提供基础匹配度评估：45.0分 (基础匹配)",
+            "error_note": f"分析过程遇到技术问题: {str(error)}"
+        }
 
     def final_quantitative_analysis(self, education_report, industry_report):
-        print("正在对 {} 和 {} 进行语义技能匹配分析...".format(
-            education_report.get('major_name', '未知专业'),
-            industry_report.get('job_title', '未知岗位')
-        ))
+        education_skills, education_courses, industry_skills = self._prepare_scoring_inputs(education_report, industry_report)
+
+        # 1. 本地向量化匹配（毫秒级，无需网络）
+        analysis = self._local_skill_matching(education_skills, industry_skills)
+        borderline_skills = analysis["borderline_skills"]
+
+        # 2. 仅对临界技能调用LLM进行语义复核
+        if borderline_skills and self.use_llm_for_borderline:
+            system_prompt, user_prompt = self._build_scoring_prompts(education_skills, borderline_skills, education_courses)
+            try:
+                self.logger.debug("--> 正在连接DeepSeek API复核 %s 个临界技能...", len(borderline_skills))
+                response_content = self._chat(system_prompt, user_prompt, "scoring")
+                llm_analysis = self._parse_scoring_response(response_content, education_skills, borderline_skills)
+                analysis = self._merge_borderline_analysis(analysis, llm_analysis)
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                self.logger.warning("--> DeepSeek API调用失败: %s，保留本地匹配结果", e)
+
+        with self.telemetry.span("scoring.compute", agent=type(self).__name__):
+            return self._compute_match_score(analysis, education_skills, industry_skills)
+
+    async def afinal_quantitative_analysis(self, education_report, industry_report):
+        """final_quantitative_analysis() 的协程版本"""
+        education_skills, education_courses, industry_skills = self._prepare_scoring_inputs(education_report, industry_report)
+
+        analysis = self._local_skill_matching(education_skills, industry_skills)
+        borderline_skills = analysis["borderline_skills"]
+
+        if borderline_skills and self.use_llm_for_borderline:
+            system_prompt, user_prompt = self._build_scoring_prompts(education_skills, borderline_skills, education_courses)
+            try:
+                self.logger.debug("--> 正在连接DeepSeek API复核 %s 个临界技能...", len(borderline_skills))
+                response_content = await self._achat(system_prompt, user_prompt, "scoring")
+                llm_analysis = self._parse_scoring_response(response_content, education_skills, borderline_skills)
+                analysis = self._merge_borderline_analysis(analysis, llm_analysis)
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                self.logger.warning("--> DeepSeek API调用失败: %s，保留本地匹配结果", e)
+
+        with self.telemetry.span("scoring.compute", agent=type(self).__name__):
+            return self._compute_match_score(analysis, education_skills, industry_skills)
+
+    def _local_skill_matching(self, education_skills: List[str], industry_skills: List[str]) -> dict:
+        """使用本地哈希向量进行技能匹配"""
+        self.logger.debug("--> 正在进行本地向量化技能匹配...")
+        with self.telemetry.span("scoring.local_match", agent=type(self).__name__) as span:
+            analysis = self.skill_matcher.match(education_skills, industry_skills)
+            span.set_attribute("skills.education", len(education_skills))
+            span.set_attribute("skills.industry", len(industry_skills))
+            span.set_attribute("skills.borderline", len(analysis["borderline_skills"]))
+        self.logger.debug("--> 本地匹配完成: 核心 %s 个, 相关 %s 个, 差距 %s 个, 临界 %s 个",
+                          len(analysis["core_skills_matched"]), len(analysis["related_skills_matched"]),
+                          len(analysis["skill_gaps"]), len(analysis["borderline_skills"]))
+        return analysis
+
+    def _merge_borderline_analysis(self, local_analysis: dict, llm_analysis: dict) -> dict:
+        """用LLM对临界技能的判断替换本地匹配中对应的结果"""
+        merged = {
+            "core_skills_matched": [],
+            "related_skills_matched": [],
+            "skill_gaps": [],
+            "borderline_skills": local_analysis["borderline_skills"],
+            "details": local_analysis["details"],
+        }
+        for detail in local_analysis["details"]:
+            if detail["borderline"]:
+                continue
+            if detail["label"] == "core":
+                merged["core_skills_matched"].append(f"{detail['education_skill']} → {detail['industry_skill']}")
+            elif detail["label"] == "related":
+                merged["related_skills_matched"].append(f"{detail['education_skill']} ≈ {detail['industry_skill']}")
+            else:
+                merged["skill_gaps"].append(detail["industry_skill"])
+
+        for field in ["core_skills_matched", "related_skills_matched", "skill_gaps"]:
+            merged[field].extend(llm_analysis.get(field, []))
+        return merged
+
+    def _prepare_scoring_inputs(self, education_report: dict, industry_report: dict) -> Tuple[List[str], List[str], List[str]]:
+        """提取量化分析所需的技能与课程列表"""
+        self.logger.info("正在对 %s 和 %s 进行语义技能匹配分析...",
+                         education_report.get('major_name', '未知专业'),
+                         industry_report.get('job_title', '未知岗位'))
 
         # 获取数据，处理可能的错误情况
         if 'error' in education_report:
             education_skills = ["通用编程能力", "逻辑思维", "问题解决能力"]
             education_courses = ["基础课程", "专业核心课程"]
-            print(f"--> 教育分析有错误，使用默认技能列表")
+            self.logger.warning("--> 教育分析有错误，使用默认技能列表")
         else:
             education_skills = education_report.get('required_skills', [])
             education_courses = education_report.get('core_courses', [])
 
         if 'error' in industry_report:
             industry_skills = ["编程开发", "技术研究", "团队协作"]
-            print(f"--> 行业分析有错误，使用默认需求列表")
+            self.logger.warning("--> 行业分析有错误，使用默认需求列表")
         else:
             industry_skills = industry_report.get('required_skills', [])
 
@@ -222,7 +475,10 @@ class DataInsightAnalyst:
             education_skills = ["基础专业技能", "理论知识", "学习能力"]
         if not industry_skills:
             industry_skills = ["专业技能", "实践能力", "工作经验"]
+        return education_skills, education_courses, industry_skills
 
+    def _build_scoring_prompts(self, education_skills: List[str], industry_skills: List[str], education_courses: List[str]) -> Tuple[str, str]:
+        """构建技能匹配分析的Prompt"""
         # 构建分析Prompt
         system_prompt = """
         You are an expert career counselor performing skills matching analysis. 
@@ -247,63 +503,56 @@ class DataInsightAnalyst:
         CRITICAL: All fields must be arrays. Be optimistic in matching.
         """
 
+        fields = (PromptBuilder()
+                  .add_list("education_skills", education_skills, max_items=60)
+                  .add_list("industry_skills", industry_skills, max_items=60)
+                  .add_list("education_courses", education_courses, max_items=30)
+                  .build())
         user_prompt = f"""
-        教育技能 (来自专业培养): {education_skills}
-        行业需求 (来自岗位要求): {industry_skills}
-        核心课程参考: {education_courses}
+        教育技能 (来自专业培养): {fields['education_skills']}
+        行业需求 (来自岗位要求): {fields['industry_skills']}
+        核心课程参考: {fields['education_courses']}
         
         请基于以上信息进行技能匹配分析。注意要积极寻找可转移的技能连接。
         """
+        return system_prompt, user_prompt
 
+    def _parse_scoring_response(self, response_content: str, education_skills: List[str], industry_skills: List[str]) -> dict:
+        """解析量化分析的LLM响应，解析失败时退回关键词匹配"""
+        self.logger.debug("--> 正在解析量化分析结果...")
+        # 安全的JSON解析
+        self.logger.debug("--> 收到量化分析响应内容: %.200s...", response_content)
+        
         try:
-            print("--> 正在连接DeepSeek API进行加权语义分析...")
-            print("--> 预计需要45-60秒，正在进行技能匹配分析...")
-            response = self.openai_client.chat.completions.create(
-                model="deepseek-ai/DeepSeek-R1",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            print("--> 正在解析量化分析结果...")
-            # 安全的JSON解析
-            response_content = response.choices[0].message.content
-            print(f"--> 收到量化分析响应内容: {response_content[:200]}...")  # 打印前200字符用于调试
-            
-            try:
-                analysis = json.loads(response_content)
-                
-                # 验证返回的数据结构
-                if not isinstance(analysis, dict):
-                    raise ValueError(f"期望字典格式，但收到: {type(analysis)}")
-                
-                # 确保必要字段存在，如果不存在则设置默认值
-                required_fields = {
-                    "core_skills_matched": [],
-                    "related_skills_matched": [],
-                    "skill_gaps": []
-                }
-                
-                for field, default_value in required_fields.items():
-                    if field not in analysis:
-                        analysis[field] = default_value
-                    elif not isinstance(analysis[field], list):
-                        analysis[field] = default_value
-                
-                print("--> 加权语义分析完成。")
-                
-            except json.JSONDecodeError as e:
-                print(f"--> 量化分析JSON解析失败: {e}")
-                # 执行简单的关键词匹配作为备用
-                analysis = self._simple_keyword_matching(education_skills, industry_skills)
-                
-        except Exception as e:
-            print(f"--> DeepSeek API调用失败: {e}")
+            analysis = self._loads_json(response_content, "scoring")
+
+            # 验证返回的数据结构
+            if not isinstance(analysis, dict):
+                raise ValueError(f"期望字典格式，但收到: {type(analysis)}")
+
+            # 确保必要字段存在，如果不存在则设置默认值
+            required_fields = {
+                "core_skills_matched": [],
+                "related_skills_matched": [],
+                "skill_gaps": []
+            }
+
+            for field, default_value in required_fields.items():
+                if field not in analysis:
+                    analysis[field] = default_value
+                elif not isinstance(analysis[field], list):
+                    analysis[field] = default_value
+
+            self.logger.info("--> 加权语义分析完成。")
+
+        except json.JSONDecodeError as e:
+            self.logger.warning("--> 量化分析JSON解析失败: %s", e)
             # 执行简单的关键词匹配作为备用
             analysis = self._simple_keyword_matching(education_skills, industry_skills)
+        return analysis
 
+    def _compute_match_score(self, analysis: dict, education_skills: List[str], industry_skills: List[str]) -> dict:
+        """基于技能匹配结果计算加权匹配度得分"""
         # --- 全新的加权计分逻辑 ---
         core_matches = len(analysis.get("core_skills_matched", []))
         related_matches = len(analysis.get("related_skills_matched", []))
@@ -314,13 +563,6 @@ class DataInsightAnalyst:
         if total_industry_skills == 0:
             total_industry_skills = 1
 
-        # 调试信息
-        print(f"--> 计分详情:")
-        print(f"    核心匹配数量: {core_matches}")
-        print(f"    相关匹配数量: {related_matches}")
-        print(f"    技能差距数量: {gaps}")
-        print(f"    行业总技能数量: {total_industry_skills}")
-        print(f"    教育技能数量: {len(education_skills)}")
 
         # 优化的计分逻辑：更加公平和合理
         # 基础分数：基于实际匹配情况
@@ -349,11 +591,20 @@ class DataInsightAnalyst:
             min_score = min(30 + total_matches * 5, 70)
             final_score = max(final_score, min_score)
 
-        print(f"    覆盖率: {coverage_rate:.2f}")
-        print(f"    加权评分: {weighted_score:.2f}")
-        print(f"    基础分数: {base_score:.2f}")
-        print(f"    差距惩罚: {gap_penalty:.2f}")
-        print(f"    最终分数: {final_score:.2f}")
+        # 调试信息：计分详情作为一条结构化日志输出（JSON格式下各项为独立字段）
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "--> 计分详情: 核心 %s, 相关 %s, 差距 %s, 行业技能 %s, 教育技能 %s, "
+                "覆盖率 %.2f, 加权评分 %.2f, 基础分数 %.2f, 差距惩罚 %.2f, 最终分数 %.2f",
+                core_matches, related_matches, gaps, total_industry_skills, len(education_skills),
+                coverage_rate, weighted_score, base_score, gap_penalty, final_score,
+                extra={"scoring": {
+                    "core_matches": core_matches, "related_matches": related_matches, "gaps": gaps,
+                    "industry_skills": total_industry_skills, "education_skills": len(education_skills),
+                    "coverage_rate": coverage_rate, "weighted_score": weighted_score,
+                    "base_score": base_score, "gap_penalty": gap_penalty, "final_score": final_score,
+                }}
+            )
 
         # 匹配度等级
         if final_score >= 85:
@@ -367,7 +618,7 @@ class DataInsightAnalyst:
         else:
             match_level = "需要提升"
 
-        print(f"--> 匹配分析完成: {final_score:.1f}分 ({match_level})")
+        self.logger.info("--> 匹配分析完成: %.1f分 (%s)", final_score, match_level)
 
         return {
             "analysis_summary": analysis,
@@ -386,55 +637,65 @@ class DataInsightAnalyst:
         }
 
     def _simple_keyword_matching(self, education_skills, industry_skills):
-        """简单的关键词匹配作为备用策略"""
-        print("--> 使用简单关键词匹配作为备用策略...")
-        
+        """
+        简单的关键词匹配作为备用策略
+
+        基于预编译的技能词表（Aho–Corasick自动机）：每个技能文本只线性扫描一次，
+        直接包含或同义词命中同一概念视为核心匹配，命中相关概念视为相关匹配。
+        """
+        self.logger.info("--> 使用简单关键词匹配作为备用策略...")
+        vocabulary = get_skill_vocabulary()
+
         core_matches = []
         related_matches = []
         skill_gaps = []
-        
-        # 转换为小写进行匹配
-        edu_skills_lower = [skill.lower() for skill in education_skills]
-        
-        for industry_skill in industry_skills:
-            industry_lower = industry_skill.lower()
-            matched = False
-            
-            # 检查直接匹配
-            for edu_skill in education_skills:
-                edu_lower = edu_skill.lower()
-                if industry_lower in edu_lower or edu_lower in industry_lower:
-                    core_matches.append(f"{edu_skill} → {industry_skill}")
-                    matched = True
-                    break
-            
-            # 如果没有直接匹配，检查相关关键词
-            if not matched:
-                related_keywords = {
-                    'programming': ['编程', 'code', 'development', '开发'],
-                    'algorithm': ['算法', 'logic', '逻辑'],
-                    'database': ['数据库', 'data', '数据'],
-                    'machine learning': ['机器学习', 'ai', '人工智能'],
-                    'python': ['编程', 'programming'],
-                    'java': ['编程', 'programming'],
-                    'analysis': ['分析', 'analytical', '分析能力']
-                }
-                
-                for keyword, synonyms in related_keywords.items():
-                    if keyword in industry_lower:
-                        for synonym in synonyms:
-                            for edu_skill in education_skills:
-                                if synonym in edu_skill.lower():
-                                    related_matches.append(f"{edu_skill} ≈ {industry_skill}")
-                                    matched = True
-                                    break
-                        if matched:
-                            break
-            
+
+        # 直接包含匹配：分别以教育技能、行业技能为模式串建立自动机
+        edu_automaton = AhoCorasick(whole_words=False)
+        for index, edu_skill in enumerate(education_skills):
+            edu_automaton.add(normalize_skill(edu_skill), index)
+        industry_automaton = AhoCorasick(whole_words=False)
+        for index, industry_skill in enumerate(industry_skills):
+            industry_automaton.add(normalize_skill(industry_skill), index)
+
+        # 行业技能被教育技能包含的情况：扫描每个教育技能一次
+        contained_in_edu: Dict[int, int] = {}
+        # 教育技能 -> 概念，概念 -> 首个出现该概念的教育技能
+        concept_to_edu: Dict[str, int] = {}
+        for edu_index, edu_skill in enumerate(education_skills):
+            normalized = normalize_skill(edu_skill)
+            for _, _, industry_index in industry_automaton.iter_matches(normalized):
+                contained_in_edu.setdefault(industry_index, edu_index)
+            for concept_id in vocabulary.concepts_in(normalized):
+                concept_to_edu.setdefault(concept_id, edu_index)
+
+        for industry_index, industry_skill in enumerate(industry_skills):
+            normalized = normalize_skill(industry_skill)
+
+            # 检查直接匹配（保持与原逻辑一致：取列表中最靠前的教育技能）
+            candidates = [index for _, _, index in edu_automaton.iter_matches(normalized)]
+            if industry_index in contained_in_edu:
+                candidates.append(contained_in_edu[industry_index])
+            if candidates:
+                core_matches.append(f"{education_skills[min(candidates)]} → {industry_skill}")
+                continue
+
+            # 检查同义词：命中同一概念
+            industry_concepts = vocabulary.concepts_in(normalized)
+            shared = [concept_to_edu[c] for c in industry_concepts if c in concept_to_edu]
+            if shared:
+                core_matches.append(f"{education_skills[min(shared)]} → {industry_skill}")
+                continue
+
+            # 检查相关概念
+            related = [concept_to_edu[r] for c in industry_concepts for r in vocabulary.related(c) if r in concept_to_edu]
+            if related:
+                related_matches.append(f"{education_skills[min(related)]} ≈ {industry_skill}")
+                continue
+
             # 如果仍然没有匹配，加入技能差距
-            if not matched:
-                skill_gaps.append(industry_skill)
-        
+            skill_gaps.append(industry_skill)
+
         return {
             "core_skills_matched": core_matches,
             "related_skills_matched": related_matches,
@@ -0,0 +1,483 @@
+"""
+讨论引擎 (DiscussionEngine)
+
+职责:
+1.  实现"发言-批判-修正"循环的唯一实现，阶段图为：分析(analyze) → 批判(critique) → 优化(optimize) → ... → 量化(score)。
+2.  执行器可插拔：所有智能体调用都通过 run_round(tasks, timeout, poll) 接口执行，超时、并发度等策略集中配置。
+3.  通过事件钩子向外广播进度（轮次开始、阶段开始/结束、智能体报告、错误、停止原因），
+    命令行协调官与Streamlit界面只订阅事件，不再各自维护一套轮次循环。
+4.  记录每个阶段的耗时，并为每次讨论、每一轮的每个阶段记录追踪Span，阶段内的智能体调用自动归属到该阶段。
+5.  每次分析师返回报告后先经过技能列表规范化（规范名称、聚类近似重复、限制条目数），
+    报告规模不会随优化轮次无限增长。
+6.  每次合并报告时提交到不可变的报告版本库（ReportStore），未变化的字段在版本间共享；
+    增量批判按版本计算差异，无需深拷贝快照。
+7.  讨论日志只记录紧凑的事件与报告版本引用（DiscussionLog），内存中有上限，超出上限的长讨论才把完整内容落盘以便回放。
+8.  讨论收敛后把最终的教育、行业画像保存到跨会话画像库；两份基础画像都来自已收敛的画像时，
+    跳过批判与多轮优化，直接进入最终量化分析。
+"""
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+import time
+
+from .discussion_log import DiscussionLog
+from .profile_warehouse import META_FIELD, STATUS_FRESH, ProfileWarehouse, get_profile_warehouse
+from .report_diff import CRITIQUE_FIELDS, diff_critiqued_reports
+from .report_store import ReportStore
+from .round_executor import RoundExecutor, RoundTask
+from .skill_normalizer import SkillNormalizer
+from .logging_utils import get_logger
+from .telemetry import get_telemetry
+
+logger = get_logger(__name__)
+
+
+# --- 共享状态定义 ---
+class DiscussionState(TypedDict):
+    """
+    定义"虚拟圆桌会议"的共享讨论区状态
+    """
+    topic: str
+    discussion_log: DiscussionLog  # 紧凑事件记录，完整内容通过 replay() 还原
+    report_versions: ReportStore  # 教育、行业报告的全部版本
+    education_report: Dict[str, Any]
+    industry_report: Dict[str, Any]
+    data_insight_report: Dict[str, Any]
+    critique_and_questions: List[str]  # 保持向后兼容
+    education_questions: List[str]  # 新增：专门针对教育的问题
+    industry_questions: List[str]   # 新增：专门针对行业的问题
+    is_consensus_reached: bool
+    rounds_completed: int
+    stage_timings: List[Dict[str, Any]]  # 每个阶段的耗时记录
+    stop_reason: str
+    aborted: Optional[str]  # 流程被中止时的原因，正常完成时为None
+
+
+# 阶段名称
+STAGE_ANALYZE = "analyze"
+STAGE_CRITIQUE = "critique"
+STAGE_OPTIMIZE = "optimize"
+STAGE_SCORE = "score"
+
+
+class StopDecision:
+    """停止规则的判定结果"""
+
+    def __init__(self, reason: str, consensus: bool = True):
+        self.reason = reason
+        self.consensus = consensus
+
+
+# 停止规则：在每轮批判之后调用，返回StopDecision表示结束讨论，返回None表示继续
+StopRule = Callable[[DiscussionState, Dict[str, Any], int, int], Optional[StopDecision]]
+
+
+def no_questions_rule(state: DiscussionState, critique_result: Dict[str, Any], round_num: int, max_rounds: int) -> Optional[StopDecision]:
+    """批判者没有提出任何分类问题时达成共识"""
+    if not state["education_questions"] and not state["industry_questions"]:
+        return StopDecision("批判者未提出进一步问题，会议达成共识。")
+    return None
+
+
+class DiscussionConfig:
+    def __init__(self, max_rounds: int = 5, analyze_timeout: float = None, optimize_timeout: float = None,
+                 critique_timeout: float = None, score_timeout: float = None, max_questions: int = None,
+                 stop_rules: List[StopRule] = None, abort_on_analyze_error: bool = False,
+                 stop_on_optimize_error: tuple = (), incremental_critique: bool = True,
+                 normalize_reports: bool = True, use_profile_warehouse: bool = True):
+        """
+        Args:
+            max_rounds: 最大讨论轮数
+            analyze_timeout: 第一轮基础分析的超时时间（秒），教育与行业分析师共享，None表示不限制
+            optimize_timeout: 优化轮次的超时时间（秒），教育与行业分析师共享
+            critique_timeout: 批判阶段的超时时间（秒）
+            score_timeout: 最终量化分析的超时时间（秒）
+            max_questions: 每位分析师每轮最多处理的问题数，None表示不限制
+            stop_rules: 批判之后依次检查的停止规则，默认只在没有问题时停止
+            abort_on_analyze_error: 基础分析失败时是否直接中止整个流程
+            stop_on_optimize_error: 优化出错（非超时）时需要结束讨论的分析师，如 ("education",)
+            incremental_critique: 后续轮次是否只把报告变化发送给批判者
+            normalize_reports: 是否在每次分析后规范化报告中的列表字段
+            use_profile_warehouse: 是否复用画像库中已收敛的画像，并在讨论收敛后保存最终画像
+        """
+        self.max_rounds = max_rounds
+        self.analyze_timeout = analyze_timeout
+        self.optimize_timeout = optimize_timeout
+        self.critique_timeout = critique_timeout
+        self.score_timeout = score_timeout
+        self.max_questions = max_questions
+        self.stop_rules = stop_rules if stop_rules is not None else [no_questions_rule]
+        self.abort_on_analyze_error = abort_on_analyze_error
+        self.stop_on_optimize_error = tuple(stop_on_optimize_error)
+        self.incremental_critique = incremental_critique
+        self.normalize_reports = normalize_reports
+        self.use_profile_warehouse = use_profile_warehouse
+
+
+class DiscussionEngine:
+    # 分析师在报告中的名称字段
+    REPORT_KEYS = {
+        "education": ("education_report", "major_name"),
+        "industry": ("industry_report", "job_title"),
+    }
+
+    def __init__(self, education_analyst, industry_analyst, critic_analyst, executor=None,
+                 normalizer: Optional[SkillNormalizer] = None, warehouse: Optional[ProfileWarehouse] = None):
+        """
+        Args:
+            education_analyst / industry_analyst / critic_analyst: 参与讨论的智能体
+            executor: 提供 run_round(tasks, timeout, poll) 的执行器，默认使用RoundExecutor
+            normalizer: 报告列表字段的规范化器，默认使用SkillNormalizer()
+            warehouse: 跨会话画像库，默认使用进程级共享的画像库（关闭时为None）
+        """
+        self.education_analyst = education_analyst
+        self.industry_analyst = industry_analyst
+        self.critic_analyst = critic_analyst
+        self.executor = executor or RoundExecutor(max_workers=2)
+        self.normalizer = normalizer or SkillNormalizer()
+        self.warehouse = warehouse if warehouse is not None else get_profile_warehouse()
+        self.telemetry = get_telemetry()
+        self._handlers: List[Callable[[str, Dict[str, Any]], None]] = []
+
+    # --- 事件 ---
+    def subscribe(self, handler: Callable[[str, Dict[str, Any]], None]):
+        """订阅讨论事件，handler(事件名称, 事件数据) 在调用 run() 的线程中执行"""
+        self._handlers.append(handler)
+
+    def unsubscribe(self, handler: Callable[[str, Dict[str, Any]], None]):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    def _emit(self, event: str, **payload):
+        for handler in list(self._handlers):
+            try:
+                handler(event, payload)
+            except Exception as e:
+                logger.warning("--> 事件处理出错 (%s): %s", event, e)
+
+    def _log(self, state: DiscussionState, speaker: str, content: Any, round_num: int = 0):
+        """记录一条讨论到日志中"""
+        state["discussion_log"].record(speaker, content, round_num)
+
+    # --- 阶段执行 ---
+    def _run_stage(self, state: DiscussionState, round_num: int, stage: str, tasks: Dict[str, RoundTask],
+                   timeout: Optional[float], poll: Optional[Callable[[], None]], **detail) -> Dict[str, Any]:
+        """通过执行器运行一个阶段的全部任务，并记录阶段耗时；detail作为附加信息随stage_start事件发出"""
+        self._emit("stage_start", round=round_num, stage=stage, agents=list(tasks), **detail)
+        start_time = time.monotonic()
+        with self.telemetry.span("discussion.stage", round=round_num, stage=stage) as span:
+            results = self.executor.run_round(tasks, timeout=timeout, poll=poll) if tasks else {}
+            span.set_attribute("agents", ",".join(tasks))
+            span.set_attribute("errors", sum(1 for _, error in results.values() if error is not None))
+        seconds = time.monotonic() - start_time
+        state["stage_timings"].append({"round": round_num, "stage": stage, "seconds": round(seconds, 3)})
+        self._emit("stage_end", round=round_num, stage=stage, seconds=seconds)
+        return results
+
+    def _normalize(self, name: str, report: Dict[str, Any]) -> Dict[str, Any]:
+        """规范化分析师报告中的列表字段"""
+        with self.telemetry.span("report.normalize", agent=name) as span:
+            report, changes = self.normalizer.normalize_report(name, report)
+            span.set_attribute("items.removed", sum(before - after for before, after in changes.values()))
+        return report
+
+    def _merge_results(self, state: DiscussionState, round_num: int, stage: str, results: Dict[str, Any],
+                       major: str, job_title: str, config: DiscussionConfig) -> List[str]:
+        """将分析师结果（规范化后）合并到讨论区状态中，返回出错（非超时）的分析师名称"""
+        names = {"education": major, "industry": job_title}
+        failed = []
+        for name, (result, error) in results.items():
+            state_key, name_field = self.REPORT_KEYS[name]
+            if error is None:
+                if config.normalize_reports and isinstance(result, dict):
+                    result = self._normalize(name, result)
+                state[state_key] = result
+                version = state["report_versions"].commit(name, result)
+                self._emit("agent_report", round=round_num, stage=stage, agent=name, report=result,
+                           version=version.number, changes=sorted(version.changed))
+                continue
+
+            timed_out = "超时" in str(error)
+            self._emit("agent_error", round=round_num, stage=stage, agent=name, error=error, timed_out=timed_out)
+            if not timed_out:
+                failed.append(name)
+            if state[state_key]:
+                # 优化失败或超时，继续使用之前的报告
+                logger.info("--> %s 分析未完成（%s），保持之前的报告", name, error)
+            else:
+                state[state_key] = {name_field: names[name], "error": error}
+                state["report_versions"].commit(name, state[state_key])
+        return failed
+
+    def _report_deltas(self, state: DiscussionState, previous_reports: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """按CRITIQUE_FIELDS比较上次批判时的报告与当前报告；有版本库时按版本比较，共享字段直接跳过"""
+        store = state.get("report_versions")
+        if store is None:
+            return diff_critiqued_reports(previous_reports, state)
+        deltas = {}
+        for name, (state_key, _) in self.REPORT_KEYS.items():
+            current = store.latest(name) or state[state_key]
+            deltas[state_key] = store.diff(previous_reports.get(state_key), current, CRITIQUE_FIELDS[state_key])
+        return deltas
+
+    def critique(self, state: DiscussionState, previous_reports: Optional[Dict[str, Any]],
+                  previous_critique: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        调用批判者审查当前报告；后续轮次只发送与上次批判时相比的变化
+
+        Args:
+            previous_reports: 上次批判时的报告，{"education_report": ReportVersion或字典, "industry_report": ...}
+
+        Returns:
+            dict: 批判结果；两份报告均无变化时不调用模型，返回带 "skipped" 标记的空问题结果
+        """
+        if previous_reports is None or not previous_critique or previous_critique.get("error"):
+            return self.critic_analyst.run_critique(state["education_report"], state["industry_report"])
+
+        report_deltas = self._report_deltas(state, previous_reports)
+        if not any(report_deltas.values()):
+            logger.info("--> 两份报告与上次批判时相比均无变化，跳过批判")
+            return {
+                "critique_summary": "两份报告与上一轮相比均无变化，批判者无新的问题。",
+                "education_questions": [],
+                "industry_questions": [],
+                "questions_for_next_round": [],
+                "skipped": True
+            }
+
+        changed = [key for key, delta in report_deltas.items() if delta]
+        logger.info("--> 增量批判：仅审查发生变化的报告 %s", changed)
+        return self.critic_analyst.run_incremental_critique(
+            state["education_report"], state["industry_report"], report_deltas, previous_critique
+        )
+
+    def _optimization_tasks(self, state: DiscussionState, round_num: int, major: str, job_title: str,
+                            config: DiscussionConfig) -> Dict[str, RoundTask]:
+        """根据上一轮的分类问题构建优化任务，没有问题的分析师保持当前报告"""
+        tasks = {}
+        plans = {
+            "education": (self.education_analyst, major, "education_questions"),
+            "industry": (self.industry_analyst, job_title, "industry_questions"),
+        }
+        for name, (agent, subject, question_key) in plans.items():
+            questions = state[question_key]
+            if config.max_questions is not None:
+                questions = questions[:config.max_questions]
+            if not questions:
+                self._emit("agent_skipped", round=round_num, agent=name)
+                continue
+            logger.info("%s 分析师正基于 %s 个专项问题优化报告", name, len(questions))
+            tasks[name] = RoundTask(
+                agent.run, subject,
+                questions=questions,
+                previous_report=state[self.REPORT_KEYS[name][0]]
+            )
+        return tasks
+
+    # --- 主流程 ---
+    def run(self, major: str, job_title: str, config: DiscussionConfig = None,
+            poll: Optional[Callable[[], None]] = None) -> DiscussionState:
+        """
+        执行一次完整的讨论
+
+        Args:
+            major: 专业名称
+            job_title: 岗位名称
+            config: 讨论配置，默认使用 DiscussionConfig()
+            poll: 等待智能体执行期间定期调用的回调（如刷新界面）
+
+        Returns:
+            DiscussionState: 最终讨论状态；aborted不为None时表示流程被中止
+        """
+        with self.telemetry.span("discussion.run", major=major, job_title=job_title) as span:
+            state = self._run(major, job_title, config or DiscussionConfig(), poll)
+            state["discussion_log"].close()
+            span.set_attribute("rounds", state["rounds_completed"])
+            span.set_attribute("aborted", state["aborted"])
+            return state
+
+    def _run(self, major: str, job_title: str, config: DiscussionConfig,
+             poll: Optional[Callable[[], None]]) -> DiscussionState:
+        state: DiscussionState = {
+            "topic": f"专业[{major}] vs 岗位[{job_title}]",
+            "discussion_log": DiscussionLog(),
+            "report_versions": ReportStore(),
+            "education_report": {},
+            "industry_report": {},
+            "data_insight_report": {},
+            "critique_and_questions": [],
+            "education_questions": [],
+            "industry_questions": [],
+            "is_consensus_reached": False,
+            "rounds_completed": 0,
+            "stage_timings": [],
+            "stop_reason": "",
+            "aborted": None
+        }
+        self._log(state, "Coordinator", f"会议开始，议题: {state['topic']}")
+        self._emit("discussion_start", topic=state["topic"], max_rounds=config.max_rounds)
+
+        # 上次批判时的报告快照与批判结果，用于后续轮次的增量批判
+        critiqued_reports = None
+        critique_result = None
+
+        for round_num in range(1, config.max_rounds + 1):
+            logger.info("--- 开始第 %s/%s 轮讨论 ---", round_num, config.max_rounds)
+            self._log(state, "Coordinator", f"第 {round_num} 轮讨论开始", round_num)
+            self._emit("round_start", round=round_num, max_rounds=config.max_rounds, state=state)
+
+            # 1. 开场陈述 (或根据上一轮问题进行深化分析)，两位分析师并发执行
+            if round_num == 1:
+                logger.info("第一轮：并发进行基础专业和岗位分析")
+                tasks = {
+                    "education": RoundTask(self.education_analyst.run, major),
+                    "industry": RoundTask(self.industry_analyst.run, job_title),
+                }
+                results = self._run_stage(state, round_num, STAGE_ANALYZE, tasks, config.analyze_timeout, poll)
+                failed = self._merge_results(state, round_num, STAGE_ANALYZE, results, major, job_title, config)
+                errors = [f"{name}: {error}" for name, (_, error) in results.items() if error is not None]
+                if config.abort_on_analyze_error and errors:
+                    state["aborted"] = f"基础分析失败: {'; '.join(errors)}"
+                    self._emit("discussion_end", state=state)
+                    return state
+            else:
+                logger.info("第 %s 轮：基于分类批判问题优化分析报告", round_num)
+                tasks = self._optimization_tasks(state, round_num, major, job_title, config)
+                question_counts = {name: len(task.kwargs["questions"]) for name, task in tasks.items()}
+                results = self._run_stage(state, round_num, STAGE_OPTIMIZE, tasks, config.optimize_timeout, poll,
+                                          question_counts=question_counts)
+                failed = self._merge_results(state, round_num, STAGE_OPTIMIZE, results, major, job_title, config)
+                if any(name in config.stop_on_optimize_error for name in failed):
+                    self._stop(state, round_num, StopDecision(f"{', '.join(failed)} 分析优化失败，结束讨论", consensus=False))
+                    break
+
+            self._log(state, "EducationAnalyst", state["education_report"], round_num)
+            self._log(state, "IndustryAnalyst", state["industry_report"], round_num)
+
+            if round_num == 1 and config.use_profile_warehouse and self._from_converged_profiles(state):
+                state["rounds_completed"] = round_num
+                self._stop(state, round_num, StopDecision("教育与行业画像均来自已收敛的画像库，跳过多轮优化。"))
+                break
+
+            # 2. 自由辩论 (调用批判者提出问题，后续轮次只审查变化部分)
+            use_previous = config.incremental_critique and critiqued_reports is not None
+            tasks = {"critic": RoundTask(
+                self.critique, state,
+                critiqued_reports if use_previous else None,
+                critique_result if use_previous else None
+            )}
+            results = self._run_stage(state, round_num, STAGE_CRITIQUE, tasks, config.critique_timeout, poll)
+            critique_result, error = results["critic"]
+            state["rounds_completed"] = round_num
+            if error:
+                self._emit("agent_error", round=round_num, stage=STAGE_CRITIQUE, agent="critic", error=error,
+                           timed_out="超时" in str(error))
+                self._stop(state, round_num, StopDecision(f"批判分析失败: {error}", consensus=False))
+                break
+            versions = state["report_versions"].snapshot()
+            critiqued_reports = {state_key: versions.get(name) for name, (state_key, _) in self.REPORT_KEYS.items()}
+            self._log(state, "CriticAnalyst", critique_result, round_num)
+            self._emit("agent_report", round=round_num, stage=STAGE_CRITIQUE, agent="critic", report=critique_result)
+
+            # 提取分类的问题
+            state["education_questions"] = critique_result.get("education_questions", [])
+            state["industry_questions"] = critique_result.get("industry_questions", [])
+            state["critique_and_questions"] = critique_result.get("questions_for_next_round", [])  # 保持向后兼容
+
+            # 3. 判断是否结束讨论
+            decision = None
+            for rule in config.stop_rules:
+                decision = rule(state, critique_result, round_num, config.max_rounds)
+                if decision is not None:
+                    break
+            if decision is not None:
+                self._stop(state, round_num, decision)
+                break
+
+            education_count = len(state["education_questions"])
+            industry_count = len(state["industry_questions"])
+            logger.info("批判者提出分类问题 - 教育: %s个, 行业: %s个", education_count, industry_count)
+            self._log(state, "Coordinator",
+                f"发现分类问题 - 教育: {education_count}个, 行业: {industry_count}个。准备下一轮讨论。", round_num)
+            self._emit("round_end", round=round_num, education_questions=education_count, industry_questions=industry_count)
+        else:
+            logger.info("会议达到最大轮次，结束讨论。")
+            state["stop_reason"] = "达到最大讨论轮次，结束。"
+            self._log(state, "Coordinator", state["stop_reason"], state["rounds_completed"])
+
+        # 4. 最终总结陈词：无论如何，都在最后进行一次量化分析
+        logger.info("正在进行最终的量化匹配分析...")
+        tasks = {"score": RoundTask(self.critic_analyst.run, state["education_report"], state["industry_report"])}
+        results = self._run_stage(state, state["rounds_completed"], STAGE_SCORE, tasks, config.score_timeout, poll)
+        final_analysis, error = results["score"]
+        if error:
+            self._emit("agent_error", round=state["rounds_completed"], stage=STAGE_SCORE, agent="score", error=error,
+                       timed_out="超时" in str(error))
+            state["aborted"] = f"最终分析失败: {error}"
+        else:
+            state["data_insight_report"] = final_analysis
+            self._log(state, "Coordinator", {"consensus_summary": final_analysis}, state["rounds_completed"])
+            self._emit("agent_report", round=state["rounds_completed"], stage=STAGE_SCORE, agent="score", report=final_analysis)
+
+        if (config.use_profile_warehouse and state["is_consensus_reached"] and not state["aborted"]
+                and self._critique_succeeded(critique_result)):
+            self._save_profiles(state, {"education": major, "industry": job_title})
+
+        self._emit("discussion_end", state=state)
+        return state
+
+    # --- 画像库 ---
+    def _from_converged_profiles(self, state: DiscussionState) -> bool:
+        """两份报告是否都是画像库中新鲜且已收敛的画像；陈旧的画像仍需完整讨论"""
+        return all(
+            self._is_fresh_converged(state[state_key])
+            for state_key, _ in self.REPORT_KEYS.values()
+        )
+
+    @staticmethod
+    def _is_fresh_converged(report: Dict[str, Any]) -> bool:
+        meta = report.get(META_FIELD) or {}
+        return bool(meta.get("converged")) and meta.get("status") == STATUS_FRESH
+
+    @staticmethod
+    def _critique_succeeded(critique_result: Optional[Dict[str, Any]]) -> bool:
+        """最后一次批判是否真正完成：出错、跳过或因输入不足而返回的空问题结果不算"""
+        if not critique_result:
+            return False
+        return not any(critique_result.get(marker) for marker in ("error", "skipped", "insufficient"))
+
+    def _save_profiles(self, state: DiscussionState, names: Dict[str, str]):
+        """
+        保存收敛后的最终画像
+
+        原样来自画像库的新鲜收敛画像不重复保存，避免刷新其更新时间；
+        讨论中任一版本带 degraded 标记（占位或错误恢复内容）的报告不保存。
+        """
+        if self.warehouse is None:
+            return
+        for name, (state_key, _) in self.REPORT_KEYS.items():
+            report = state[state_key]
+            if self._is_fresh_converged(report) or report.get("error"):
+                continue
+            if any(version.get("degraded") for version in state["report_versions"].history(name)):
+                logger.info("--> %s报告在讨论中使用过占位内容，不保存到画像库", name)
+                continue
+            try:
+                self.warehouse.put(name, names[name], report, converged=True, rounds=state["rounds_completed"])
+            except Exception as e:
+                logger.warning("--> 保存%s画像失败: %s", name, e)
+
+    def _stop(self, state: DiscussionState, round_num: int, decision: StopDecision):
+        logger.info("%s", decision.reason)
+        state["stop_reason"] = decision.reason
+        state["is_consensus_reached"] = decision.consensus
+        self._log(state, "Coordinator", decision.reason, round_num)
+        self._emit("stopped", round=round_num, reason=decision.reason, consensus=decision.consensus)
+
+    def stage_summary(self, state: DiscussionState) -> Dict[str, Dict[str, float]]:
+        """按阶段汇总耗时：调用次数、总耗时与最长耗时"""
+        summary: Dict[str, Dict[str, float]] = {}
+        for timing in state.get("stage_timings", []):
+            item = summary.setdefault(timing["stage"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            item["count"] += 1
+            item["total_seconds"] = round(item["total_seconds"] + timing["seconds"], 3)
+            item["max_seconds"] = max(item["max_seconds"], timing["seconds"])
+        return summary
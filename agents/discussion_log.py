@@ -0,0 +1,237 @@
+"""
+讨论日志 (DiscussionLog)
+
+职责:
+1.  以紧凑事件记录代替整份报告：每条记录只包含序号、时间、轮次、发言者，
+    以及文本摘要或对报告版本的引用（名称、版本号、内容摘要哈希）和各列表字段的条目数。
+2.  内存中只保留最近的若干条记录（环形缓冲），单次讨论占用的内存不随轮次增长。
+3.  环形缓冲未溢出前，完整发言与报告正文只暂存在内存中，replay() 直接从内存还原，不写任何文件；
+    只有长时间的讨论在缓冲首次溢出时才落盘：先写入暂存的全部内容，之后的报告正文按版本
+    （内容未变化时不重复写入）与事件记录一起缓冲追加到本地JSONL文件，不逐条 fsync。
+4.  首次落盘时清理落盘目录中超过保留天数或超出数量上限的旧日志。
+5.  继承自list，讨论状态仍可直接用于 st.json 与JSONL结果输出。
+
+环境变量:
+    DISCUSSION_LOG_DIR (落盘目录，默认 .cache/discussion_logs；设为空字符串则只保留内存中的记录)、
+    DISCUSSION_LOG_MAX_RECORDS (内存中保留的记录条数，默认200)、
+    DISCUSSION_LOG_RETENTION_DAYS / DISCUSSION_LOG_MAX_FILES (旧日志保留天数与文件数上限，默认7天 / 100个)
+"""
+from typing import Any, Dict, Iterator, List, Optional
+import glob
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from .jsonl_sink import JsonlSink
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_LOG_DIR = os.path.join(".cache", "discussion_logs")
+DEFAULT_MAX_RECORDS = 200
+DEFAULT_RETENTION_DAYS = 7
+DEFAULT_MAX_FILES = 100
+
+# 文本发言在记录中保留的最大字符数（完整文本同时落盘）
+_TEXT_PREVIEW_CHARS = 200
+
+
+def content_digest(content: Any) -> str:
+    """报告内容的摘要哈希，键顺序无关"""
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def summarize_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """报告概要：列表字段记录条目数，数值字段记录原值"""
+    summary = {}
+    for key, value in report.items():
+        if isinstance(value, list):
+            summary[key] = len(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            summary[key] = value
+    return summary
+
+
+def prune_logs(log_dir: str, retention_days: float, max_files: int) -> int:
+    """删除超过保留天数的日志，并只保留最近的 max_files 个；返回删除的文件数"""
+    entries = []
+    for path in glob.glob(os.path.join(log_dir, "*.jsonl")):
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+    cutoff = time.time() - retention_days * 24 * 3600
+    removed = 0
+    for index, (mtime, path) in enumerate(entries):
+        if index < max_files and mtime >= cutoff:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError as e:
+            logger.debug("--> 旧讨论日志删除失败 %s: %s", path, e)
+    if removed:
+        logger.info("--> 已清理 %s 个旧讨论日志", removed)
+    return removed
+
+
+class DiscussionLog(list):
+    def __init__(self, session_id: Optional[str] = None, log_dir: Optional[str] = None,
+                 max_records: Optional[int] = None):
+        """
+        Args:
+            session_id: 会话标识，用作落盘文件名，默认按时间与随机后缀生成
+            log_dir: 落盘目录，默认读取 DISCUSSION_LOG_DIR；为空字符串时不落盘
+            max_records: 内存中保留的记录条数，默认读取 DISCUSSION_LOG_MAX_RECORDS
+        """
+        super().__init__()
+        self.session_id = session_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.max_records = max_records or int(os.getenv("DISCUSSION_LOG_MAX_RECORDS", str(DEFAULT_MAX_RECORDS)))
+        self.log_dir = os.getenv("DISCUSSION_LOG_DIR", DEFAULT_LOG_DIR) if log_dir is None else log_dir
+        # 落盘文件路径，缓冲溢出并开始落盘后才设置
+        self.path: Optional[str] = None
+        self._sink: Optional[JsonlSink] = None
+        # 落盘前暂存的完整记录；溢出后写入文件（或在不落盘时丢弃）并置为None
+        self._pending: Optional[List[Dict[str, Any]]] = []
+        self._sequence = 0
+        self.dropped = 0
+        # 报告名称 -> (版本号, 摘要哈希, 正文)；正文与讨论状态中的报告是同一对象，不额外复制
+        self._versions: Dict[str, tuple] = {}
+
+    def _spill(self, record: Dict[str, Any]):
+        if self._pending is not None:
+            self._pending.append(record)
+            return
+        if self._sink is None:
+            return
+        try:
+            self._sink.append(record)
+        except OSError as e:
+            logger.warning("--> 讨论日志写入失败，后续只保留内存记录: %s", e)
+            self._sink = None
+
+    def _start_spilling(self):
+        """环形缓冲首次溢出：把暂存的完整记录写入文件，之后直接追加"""
+        pending, self._pending = self._pending, None
+        if not self.log_dir:
+            return
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            prune_logs(
+                self.log_dir,
+                float(os.getenv("DISCUSSION_LOG_RETENTION_DAYS", str(DEFAULT_RETENTION_DAYS))),
+                int(os.getenv("DISCUSSION_LOG_MAX_FILES", str(DEFAULT_MAX_FILES))),
+            )
+            self.path = os.path.join(self.log_dir, f"{self.session_id}.jsonl")
+            self._sink = JsonlSink(self.path, durable=False)
+        except OSError as e:
+            logger.warning("--> 讨论日志目录不可用，只保留内存记录: %s", e)
+            return
+        for record in pending:
+            self._spill(record)
+
+    def flush(self):
+        """把已落盘部分的缓冲写入文件"""
+        if self._sink is not None:
+            try:
+                self._sink.flush()
+            except OSError as e:
+                logger.warning("--> 讨论日志写入失败: %s", e)
+
+    def close(self):
+        """刷新并关闭落盘文件"""
+        if self._sink is not None:
+            try:
+                self._sink.close()
+            except OSError as e:
+                logger.warning("--> 讨论日志关闭失败: %s", e)
+
+    def _store_report(self, name: str, content: Dict[str, Any]) -> Dict[str, Any]:
+        """登记一个报告版本，内容与上一版本相同时复用版本号；返回引用"""
+        digest = content_digest(content)
+        version, last_digest, _ = self._versions.get(name, (0, None, None))
+        if digest != last_digest:
+            version += 1
+            self._spill({"type": "report", "name": name, "version": version, "digest": digest, "content": content})
+        self._versions[name] = (version, digest, content)
+        return {"name": name, "version": version, "digest": digest}
+
+    def record(self, speaker: str, content: Any, round_num: int = 0) -> Dict[str, Any]:
+        """追加一条发言：字典内容按报告版本引用记录，其余内容记录为文本"""
+        self._sequence += 1
+        record: Dict[str, Any] = {"seq": self._sequence, "ts": round(time.time(), 3), "round": round_num,
+                                  "speaker": speaker}
+        if isinstance(content, dict):
+            record["ref"] = self._store_report(speaker, content)
+            record["summary"] = summarize_report(content)
+            self._spill({"type": "event", **record})
+        else:
+            text = str(content)
+            self._spill({"type": "event", **record, "text": text})
+            record["text"] = text if len(text) <= _TEXT_PREVIEW_CHARS else text[:_TEXT_PREVIEW_CHARS] + "…"
+        self.append(record)
+        if len(self) > self.max_records:
+            if self._pending is not None:
+                self._start_spilling()
+            overflow = len(self) - self.max_records
+            del self[:overflow]
+            self.dropped += overflow
+        return record
+
+    def report(self, name: str) -> Optional[Dict[str, Any]]:
+        """某位发言者的最新报告正文"""
+        entry = self._versions.get(name)
+        return entry[2] if entry else None
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """
+        按原顺序还原完整发言 {"seq", "round", "speaker", "content"}
+
+        未溢出时从暂存的完整记录还原；已落盘时从文件读取全部记录；
+        溢出但未落盘时只能还原内存中的记录，其中引用旧版本报告的记录无法还原正文，content为None。
+        """
+        if self._pending is not None:
+            yield from replay_records(list(self._pending))
+            return
+        if self.path:
+            self.flush()
+            yield from replay_file(self.path)
+            return
+        for record in list(self):
+            if "ref" in record:
+                ref = record["ref"]
+                version, _, content = self._versions.get(ref["name"], (None, None, None))
+                content = content if version == ref["version"] else None
+            else:
+                content = record["text"]
+            yield {"seq": record["seq"], "round": record["round"], "speaker": record["speaker"], "content": content}
+
+
+def replay_file(path: str) -> Iterator[Dict[str, Any]]:
+    """从落盘文件按原顺序还原完整发言"""
+    yield from replay_records(JsonlSink(path).read_records())
+
+
+def replay_records(entries) -> Iterator[Dict[str, Any]]:
+    """
+    从完整记录序列（报告正文与事件）按原顺序还原发言
+
+    报告正文总是写在引用它的事件之前，且版本号单调递增，
+    因此只需保留每位发言者最近一个版本的正文，回放时内存占用同样有上界。
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        if entry.get("type") == "report":
+            latest[entry["name"]] = entry
+        elif entry.get("type") == "event":
+            ref = entry.get("ref")
+            if ref is None:
+                content = entry.get("text")
+            else:
+                body = latest.get(ref["name"])
+                content = body["content"] if body and body["version"] == ref["version"] else None
+            yield {"seq": entry["seq"], "round": entry["round"], "speaker": entry["speaker"], "content": content}
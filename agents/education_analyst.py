@@ -1,25 +1,22 @@
-from tavily import TavilyClient
-import os
 import json
-from openai import OpenAI
-from typing import List
+from typing import List, Tuple
 
-class EducationAnalyst:
-    def __init__(self, openai_api_key: str, composio_api_key: str):
-        self.composio_api_key = composio_api_key
+from .base_agent import BaseAgent
+from .cancellation import OperationCancelled
+from .prompt_builder import PromptBuilder
 
-        # 初始化Tavily客户端
-        tavily_api_key = os.getenv("TAVILY_API_KEY")
-        if not tavily_api_key:
-            raise ValueError("TAVILY_API_KEY not found in environment variables.")
-        self.tavily_client = TavilyClient(api_key=tavily_api_key)
+class EducationAnalyst(BaseAgent):
+    PROFILE_KIND = "education"
+    RESPONSE_FIELDS = {
+        "extraction": ("core_courses", "required_skills"),
+        "optimization": ("core_courses", "required_skills"),
+    }
 
-        # 初始化OpenAI客户端
-        if not openai_api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables.")
-        self.openai_client = OpenAI(base_url='https://api.siliconflow.cn/v1',api_key=openai_api_key)
+    def __init__(self, openai_api_key: str, composio_api_key: str):
+        self.composio_api_key = composio_api_key
+        super().__init__(openai_api_key=openai_api_key, use_search=True)
 
-        print("教育分析师已初始化，并配备Tavily搜索和OpenAI分析工具。")
+        self.logger.info("教育分析师已初始化，并配备Tavily搜索和OpenAI分析工具。")
 
     def run(self, major: str, questions: List[str] = None, previous_report: dict = None) -> dict:
         """
@@ -33,20 +30,83 @@ class EducationAnalyst:
         Returns:
             dict: 分析报告
         """
-        print(f"正在分析专业：{major}...")
+        self.logger.info("正在分析专业：%s...", major)
         
         # 判断是基础分析还是优化分析
         is_optimization_mode = previous_report is not None and questions is not None
         
         if is_optimization_mode:
-            print(f"-> 优化模式：基于 {len(questions)} 个批判问题优化现有报告")
+            self.logger.info("-> 优化模式：基于 %s 个批判问题优化现有报告", len(questions))
             return self._optimize_existing_report(major, questions, previous_report)
         else:
-            print(f"-> 基础模式：进行全新的专业分析")
+            if not questions:
+                profile = self._warehouse_profile(major, lambda agent: agent._perform_basic_analysis(major))
+                if profile is not None:
+                    return profile
+            self.logger.info("-> 基础模式：进行全新的专业分析")
             return self._perform_basic_analysis(major, questions)
+
+    async def arun(self, major: str, questions: List[str] = None, previous_report: dict = None) -> dict:
+        """
+        run() 的协程版本，使用进程级共享的异步连接池执行搜索和LLM调用
+        """
+        self.logger.info("正在分析专业：%s...", major)
+
+        is_optimization_mode = previous_report is not None and questions is not None
+
+        if is_optimization_mode:
+            self.logger.info("-> 优化模式：基于 %s 个批判问题优化现有报告", len(questions))
+            return await self._aoptimize_existing_report(major, questions, previous_report)
+        else:
+            if not questions:
+                profile = self._warehouse_profile(major, lambda agent: agent._perform_basic_analysis(major))
+                if profile is not None:
+                    return profile
+            self.logger.info("-> 基础模式：进行全新的专业分析")
+            return await self._aperform_basic_analysis(major, questions)
     
     def _perform_basic_analysis(self, major: str, questions: List[str] = None) -> dict:
         """执行基础分析（原有逻辑）"""
+        query = self._build_basic_query(major, questions)
+
+        # 步骤 1: Tavily 搜索 (带备用方案)
+        try:
+            self._print_search_start(query)
+            tavily_response = self._search(query, search_depth="advanced", max_results=5)
+            context = self._format_basic_context(tavily_response)
+            self.logger.debug("--> Tavily深度搜索完成。")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            context = self._fallback_context(major, e)
+
+        # 步骤 2: OpenAI 提取
+        system_prompt, user_prompt = self._build_basic_prompts(major, questions, context)
+        self.logger.debug("--> 发送请求到DeepSeek AI...")
+        response_content = self._chat(system_prompt, user_prompt, "extraction")
+        return self._parse_basic_response(major, response_content)
+
+    async def _aperform_basic_analysis(self, major: str, questions: List[str] = None) -> dict:
+        """_perform_basic_analysis 的协程版本"""
+        query = self._build_basic_query(major, questions)
+
+        try:
+            self._print_search_start(query)
+            tavily_response = await self._asearch(query, search_depth="advanced", max_results=5)
+            context = self._format_basic_context(tavily_response)
+            self.logger.debug("--> Tavily深度搜索完成。")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            context = self._fallback_context(major, e)
+
+        system_prompt, user_prompt = self._build_basic_prompts(major, questions, context)
+        self.logger.debug("--> 发送请求到DeepSeek AI...")
+        response_content = await self._achat(system_prompt, user_prompt, "extraction")
+        return self._parse_basic_response(major, response_content)
+
+    def _build_basic_query(self, major: str, questions: List[str] = None) -> str:
+        """构建基础分析的搜索查询"""
         # 构建基础查询  
         base_query = f"{major} 专业课程 核心课程 技能培养"
         
@@ -79,33 +139,28 @@ class EducationAnalyst:
                 query = base_query
         else:
             query = base_query
+        return query
 
-        # 步骤 1: Tavily 搜索 (带备用方案)
-        try:
-            print("--> 正在连接Tavily API进行深度搜索...")
-            print(f"--> 查询长度: {len(query)} 字符")
-            print(f"--> 查询内容: {query}")
-            
-            tavily_response = self.tavily_client.search(
-                query=query,
-                search_depth="advanced",
-                max_results=5
-            )
-            
-            # 构建上下文
-            context = ""
-            for result in tavily_response['results']:
-                context += f"来源: {result.get('url', 'Unknown')}\n"
-                context += f"内容: {result.get('content', 'No content')}\n\n"
-            
-            print("--> Tavily深度搜索完成。")
-            
-        except Exception as e:
-            print(f"--> Tavily搜索失败: {e}")
-            print("--> 使用备用分析策略...")
-            
-            # 备用方案：基于专业名称进行基本分析
-            context = f"""
+    def _print_search_start(self, query: str):
+        self.logger.debug("--> 正在连接Tavily API进行深度搜索...")
+        self.logger.debug("--> 查询长度: %s 字符", len(query))
+        self.logger.debug("--> 查询内容: %s", query)
+
+    def _format_basic_context(self, tavily_response: dict) -> str:
+        """将搜索结果拼接为LLM上下文"""
+        context = ""
+        for result in tavily_response['results']:
+            context += f"来源: {result.get('url', 'Unknown')}\n"
+            context += f"内容: {result.get('content', 'No content')}\n\n"
+        return context
+
+    def _fallback_context(self, major: str, error: Exception) -> str:
+        """搜索失败时的备用上下文"""
+        self.logger.warning("--> Tavily搜索失败: %s", error)
+        self.logger.info("--> 使用备用分析策略...")
+        
+        # 备用方案：基于专业名称进行基本分析
+        return f"""
             基于专业名称 '{major}' 的基本分析：
             
             {major}专业通常包含以下核心内容：
@@ -118,9 +173,10 @@ class EducationAnalyst:
             注意：由于网络搜索暂时不可用，以下分析基于通用教育知识。
             """
 
-        # 步骤 2: OpenAI 提取 (使用更强大的Prompt)
-        print("--> 正在连接OpenAI API进行信息提取...")
-        print("--> 预计需要30-60秒，请耐心等待...")
+    def _build_basic_prompts(self, major: str, questions: List[str], context: str) -> Tuple[str, str]:
+        """构建基础分析的Prompt (使用更强大的Prompt)"""
+        self.logger.debug("--> 正在连接OpenAI API进行信息提取...")
+        self.logger.debug("--> 预计需要30-60秒，请耐心等待...")
         system_prompt = """
         You are a helpful academic advisor and curriculum analyst. Your goal is to extract key courses and tangible skills from text about a university major.
 
@@ -134,7 +190,7 @@ class EducationAnalyst:
         # 如果有额外问题，动态地加入到Prompt中
         if questions:
             questions_str = "\n".join(f"- {q}" for q in questions)
-            print(f"--> 根据 {len(questions)} 个批判问题进行深度分析...")
+            self.logger.debug("--> 根据 %s 个批判问题进行深度分析...", len(questions))
             system_prompt += f"""
             \n**Important**: While performing the analysis, you MUST specifically address and find answers for the following questions based on the text:
             {questions_str}
@@ -150,24 +206,18 @@ class EducationAnalyst:
         
         CRITICAL: Ensure both fields are present and are arrays. Do not return nested objects or missing fields.
         """
-        
-        print("--> 发送请求到DeepSeek AI...")
-        response = self.openai_client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-R1",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Here is the context about the major '{major}':\n\n{context}"}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        print("--> 正在解析AI响应...")
+        context = PromptBuilder().add_text("context", context).build()["context"]
+        user_prompt = f"Here is the context about the major '{major}':\n\n{context}"
+        return system_prompt, user_prompt
+
+    def _parse_basic_response(self, major: str, response_content: str) -> dict:
+        """解析基础分析的LLM响应并构建报告"""
+        self.logger.debug("--> 正在解析AI响应...")
         # 安全的JSON解析
-        response_content = response.choices[0].message.content
-        print(f"--> 收到响应内容: {response_content[:200]}...")  # 打印前200字符用于调试
+        self.logger.debug("--> 收到响应内容: %.200s...", response_content)
         
         try:
-            extracted_data = json.loads(response_content)
+            extracted_data = self._loads_json(response_content, "extraction")
             
             # 验证返回的数据结构
             if not isinstance(extracted_data, dict):
@@ -186,12 +236,13 @@ class EducationAnalyst:
                     # 如果字段类型不正确，使用默认值
                     extracted_data[field] = default_value
             
-            print("--> OpenAI信息提取完成。")
+            self.logger.debug("--> OpenAI信息提取完成。")
             
         except json.JSONDecodeError as e:
-            print(f"--> JSON解析失败: {e}")
-            # 返回默认结构
+            self.logger.warning("--> JSON解析失败: %s", e)
+            # 返回默认结构，degraded标记表示内容只是占位
             extracted_data = {
+                "degraded": True,
                 "core_courses": ["信息提取失败，请重试"],
                 "required_skills": ["信息提取失败，请重试"]
             }
@@ -202,14 +253,54 @@ class EducationAnalyst:
             **extracted_data
         }
 
-        print(f"专业 {major} 分析完成。")
+        self.logger.info("专业 %s 分析完成。", major)
         return report
     
     def _optimize_existing_report(self, major: str, questions: List[str], previous_report: dict) -> dict:
         """基于批判问题优化现有报告"""
-        print("--> 执行报告优化模式...")
+        self.logger.debug("--> 执行报告优化模式...")
+        query = self._build_optimization_query(major, questions)
         
-        # 构建针对性搜索查询
+        # 尝试获取补充信息
+        try:
+            self.logger.debug("--> 搜索补充信息: %s", query)
+            tavily_response = self._search(query, search_depth="basic", max_results=3)  # 使用基础搜索节省资源
+            additional_context = self._format_additional_context(tavily_response)
+            self.logger.debug("--> 补充信息搜索完成")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            self.logger.warning("--> 补充信息搜索失败: %s", e)
+            additional_context = "无法获取补充信息，基于现有报告进行优化。"
+
+        system_prompt, user_content = self._build_optimization_prompts(major, questions, previous_report, additional_context)
+        self.logger.debug("--> 发送优化请求到DeepSeek AI...")
+        response_content = self._chat(system_prompt, user_content, "optimization")
+        return self._parse_optimization_response(major, questions, previous_report, response_content)
+
+    async def _aoptimize_existing_report(self, major: str, questions: List[str], previous_report: dict) -> dict:
+        """_optimize_existing_report 的协程版本"""
+        self.logger.debug("--> 执行报告优化模式...")
+        query = self._build_optimization_query(major, questions)
+
+        try:
+            self.logger.debug("--> 搜索补充信息: %s", query)
+            tavily_response = await self._asearch(query, search_depth="basic", max_results=3)
+            additional_context = self._format_additional_context(tavily_response)
+            self.logger.debug("--> 补充信息搜索完成")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            self.logger.warning("--> 补充信息搜索失败: %s", e)
+            additional_context = "无法获取补充信息，基于现有报告进行优化。"
+
+        system_prompt, user_content = self._build_optimization_prompts(major, questions, previous_report, additional_context)
+        self.logger.debug("--> 发送优化请求到DeepSeek AI...")
+        response_content = await self._achat(system_prompt, user_content, "optimization")
+        return self._parse_optimization_response(major, questions, previous_report, response_content)
+
+    def _build_optimization_query(self, major: str, questions: List[str]) -> str:
+        """构建针对性搜索查询"""
         query_keywords = []
         for q in questions[:3]:  # 最多处理前3个问题
             if "课程" in q or "course" in q.lower():
@@ -234,26 +325,16 @@ class EducationAnalyst:
         # 限制查询长度
         if len(query) > 350:
             query = f"{major} 专业 深度补充"
-        
-        # 尝试获取补充信息
+        return query
+
+    def _format_additional_context(self, tavily_response: dict) -> str:
         additional_context = ""
-        try:
-            print(f"--> 搜索补充信息: {query}")
-            tavily_response = self.tavily_client.search(
-                query=query,
-                search_depth="basic",  # 使用基础搜索节省资源
-                max_results=3
-            )
-            
-            for result in tavily_response['results']:
-                additional_context += f"补充信息: {result.get('content', '')}\n"
-            
-            print("--> 补充信息搜索完成")
-            
-        except Exception as e:
-            print(f"--> 补充信息搜索失败: {e}")
-            additional_context = "无法获取补充信息，基于现有报告进行优化。"
-        
+        for result in tavily_response['results']:
+            additional_context += f"补充信息: {result.get('content', '')}\n"
+        return additional_context
+
+    def _build_optimization_prompts(self, major: str, questions: List[str], previous_report: dict, additional_context: str) -> Tuple[str, str]:
+        """构建优化模式的Prompt"""
         # 构建优化提示词
         system_prompt = """
         You are an expert education analyst performing report optimization. Your task is to improve and enhance an existing educational analysis report based on specific critical questions.
@@ -290,35 +371,31 @@ class EducationAnalyst:
         CRITICAL: Ensure both fields are present and are arrays. Focus on ENHANCING, not replacing.
         """
         
-        # 构建用户输入
+        # 构建用户输入：只带入优化需要的字段，去重并压缩到Token预算以内
+        fields = (PromptBuilder()
+                  .add_report(previous_report, "education_optimization")
+                  .add_text("additional_context", additional_context)
+                  .build())
         user_content = f"""
         **Existing Report to Optimize:**
         Major: {previous_report.get('major_name', major)}
-        Core Courses: {previous_report.get('core_courses', [])}
-        Required Skills: {previous_report.get('required_skills', [])}
+        Core Courses: {fields['core_courses']}
+        Required Skills: {fields['required_skills']}
         
         **Additional Context for Optimization:**
-        {additional_context}
+        {fields['additional_context']}
         
         Please optimize this report by addressing the critical questions while maintaining the valuable existing information.
         """
-        
-        print("--> 发送优化请求到DeepSeek AI...")
-        response = self.openai_client.chat.completions.create(
-            model="deepseek-ai/DeepSeek-R1",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content}
-            ],
-            response_format={"type": "json_object"}
-        )
-        
-        print("--> 正在解析优化结果...")
-        response_content = response.choices[0].message.content
-        print(f"--> 收到优化结果: {response_content[:200]}...")
+        return system_prompt, user_content
+
+    def _parse_optimization_response(self, major: str, questions: List[str], previous_report: dict, response_content: str) -> dict:
+        """解析优化结果并构建优化后的报告"""
+        self.logger.debug("--> 正在解析优化结果...")
+        self.logger.debug("--> 收到优化结果: %.200s...", response_content)
         
         try:
-            optimized_data = json.loads(response_content)
+            optimized_data = self._loads_json(response_content, "optimization")
             
             # 验证数据结构
             if not isinstance(optimized_data, dict):
@@ -330,10 +407,10 @@ class EducationAnalyst:
                     # 如果优化失败，使用原报告的数据
                     optimized_data[field] = previous_report.get(field, [])
             
-            print("--> 报告优化完成")
+            self.logger.info("--> 报告优化完成")
             
         except json.JSONDecodeError as e:
-            print(f"--> 优化结果解析失败: {e}")
+            self.logger.warning("--> 优化结果解析失败: %s", e)
             # 如果解析失败，使用原报告
             optimized_data = {
                 "core_courses": previous_report.get("core_courses", []),
@@ -348,5 +425,5 @@ class EducationAnalyst:
             **optimized_data
         }
         
-        print(f"专业 {major} 报告优化完成")
+        self.logger.info("专业 %s 报告优化完成", major)
         return optimized_report
@@ -1,25 +1,22 @@
-from tavily import TavilyClient
-import os
 import json
-from openai import OpenAI
-from typing import List
+from typing import List, Tuple
+
+from .base_agent import BaseAgent
+from .cancellation import OperationCancelled
+from .prompt_builder import PromptBuilder
+
+class IndustryAnalyst(BaseAgent):
+    PROFILE_KIND = "industry"
+    RESPONSE_FIELDS = {
+        "extraction": ("required_skills", "responsibilities"),
+        "optimization": ("required_skills", "responsibilities"),
+    }
 
-class IndustryAnalyst:
     def __init__(self, openai_api_key: str, composio_api_key: str):
         self.composio_api_key = composio_api_key
+        super().__init__(openai_api_key=openai_api_key, use_search=True)
         
-        # 初始化Tavily客户端
-        tavily_api_key = os.getenv("TAVILY_API_KEY")
-        if not tavily_api_key:
-            raise ValueError("TAVILY_API_KEY not found in environment variables.")
-        self.tavily_client = TavilyClient(api_key=tavily_api_key)
-
-        # 初始化OpenAI客户端
-        if not openai_api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment variables.")
-        self.openai_client = OpenAI(base_url='https://api.siliconflow.cn/v1',api_key=openai_api_key)
-        
-        print("行业分析师已初始化，并配备Tavily搜索和OpenAI分析工具。")
+        self.logger.info("行业分析师已初始化，并配备Tavily搜索和OpenAI分析工具。")
 
     def run(self, job: str, questions: List[str] = None, previous_report: dict = None) -> dict:
         """
@@ -33,20 +30,99 @@ class IndustryAnalyst:
         Returns:
             dict: 分析报告
         """
-        print(f"正在分析岗位：{job}...")
+        self.logger.info("正在分析岗位：%s...", job)
         
         # 判断是基础分析还是优化分析
         is_optimization_mode = previous_report is not None and questions is not None
         
         if is_optimization_mode:
-            print(f"-> 优化模式：基于 {len(questions)} 个批判问题优化现有报告")
+            self.logger.info("-> 优化模式：基于 %s 个批判问题优化现有报告", len(questions))
             return self._optimize_existing_report(job, questions, previous_report)
         else:
-            print(f"-> 基础模式：进行全新的岗位分析")
+            if not questions:
+                profile = self._warehouse_profile(job, lambda agent: agent._perform_basic_analysis(job))
+                if profile is not None:
+                    return profile
+            self.logger.info("-> 基础模式：进行全新的岗位分析")
             return self._perform_basic_analysis(job, questions)
+
+    async def arun(self, job: str, questions: List[str] = None, previous_report: dict = None) -> dict:
+        """
+        run() 的协程版本，使用进程级共享的异步连接池执行搜索和LLM调用
+        """
+        self.logger.info("正在分析岗位：%s...", job)
+
+        is_optimization_mode = previous_report is not None and questions is not None
+
+        if is_optimization_mode:
+            self.logger.info("-> 优化模式：基于 %s 个批判问题优化现有报告", len(questions))
+            return await self._aoptimize_existing_report(job, questions, previous_report)
+        else:
+            if not questions:
+                profile = self._warehouse_profile(job, lambda agent: agent._perform_basic_analysis(job))
+                if profile is not None:
+                    return profile
+            self.logger.info("-> 基础模式：进行全新的岗位分析")
+            return await self._aperform_basic_analysis(job, questions)
     
     def _perform_basic_analysis(self, job: str, questions: List[str] = None) -> dict:
         """执行基础分析（原有逻辑）"""
+        query = self._build_basic_query(job, questions)
+
+        # 步骤 1: Tavily 搜索 (带备用方案)
+        try:
+            self._print_search_start(query)
+            tavily_response = self._search(query, search_depth="advanced", max_results=5)
+            context = self._format_basic_context(tavily_response)
+            self.logger.debug("--> Tavily搜索完成。")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            context = self._fallback_context(job, e)
+
+        # 步骤 2: OpenAI 提取
+        try:
+            system_prompt, user_prompt = self._build_basic_prompts(job, questions, context)
+            self.logger.debug("--> 发送请求到DeepSeek AI...")
+            response_content = self._chat(system_prompt, user_prompt, "extraction")
+            report = self._parse_basic_response(job, response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._error_recovery_report(job, e)
+
+        self.logger.info("岗位 %s 分析完成。", job)
+        return report
+
+    async def _aperform_basic_analysis(self, job: str, questions: List[str] = None) -> dict:
+        """_perform_basic_analysis 的协程版本"""
+        query = self._build_basic_query(job, questions)
+
+        try:
+            self._print_search_start(query)
+            tavily_response = await self._asearch(query, search_depth="advanced", max_results=5)
+            context = self._format_basic_context(tavily_response)
+            self.logger.debug("--> Tavily搜索完成。")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            context = self._fallback_context(job, e)
+
+        try:
+            system_prompt, user_prompt = self._build_basic_prompts(job, questions, context)
+            self.logger.debug("--> 发送请求到DeepSeek AI...")
+            response_content = await self._achat(system_prompt, user_prompt, "extraction")
+            report = self._parse_basic_response(job, response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._error_recovery_report(job, e)
+
+        self.logger.info("岗位 %s 分析完成。", job)
+        return report
+
+    def _build_basic_query(self, job: str, questions: List[str] = None) -> str:
+        """构建基础分析的搜索查询"""
         # 构建基础查询
         base_query = f"{job} 岗位要求 技能需求 薪资 职责"
         
@@ -79,33 +155,28 @@ class IndustryAnalyst:
                 query = base_query
         else:
             query = base_query
+        return query
 
-        # 步骤 1: Tavily 搜索 (带备用方案)
-        try:
-            print("--> 正在连接Tavily API...")
-            print(f"--> 查询长度: {len(query)} 字符")
-            print(f"--> 查询内容: {query}")
-            
-            tavily_response = self.tavily_client.search(
-                query=query,
-                search_depth="advanced",
-                max_results=5
-            )
-            
-            # 构建上下文
-            context = ""
-            for result in tavily_response['results']:
-                context += f"来源: {result.get('url', 'Unknown')}\n"
-                context += f"内容: {result.get('content', 'No content')}\n\n"
-            
-            print("--> Tavily搜索完成。")
-            
-        except Exception as e:
-            print(f"--> Tavily搜索失败: {e}")
-            print("--> 使用备用分析策略...")
-            
-            # 备用方案：基于岗位名称进行基本分析
-            context = f"""
+    def _print_search_start(self, query: str):
+        self.logger.debug("--> 正在连接Tavily API...")
+        self.logger.debug("--> 查询长度: %s 字符", len(query))
+        self.logger.debug("--> 查询内容: %s", query)
+
+    def _format_basic_context(self, tavily_response: dict) -> str:
+        """将搜索结果拼接为LLM上下文"""
+        context = ""
+        for result in tavily_response['results']:
+            context += f"来源: {result.get('url', 'Unknown')}\n"
+            context += f"内容: {result.get('content', 'No content')}\n\n"
+        return context
+
+    def _fallback_context(self, job: str, error: Exception) -> str:
+        """搜索失败时的备用上下文"""
+        self.logger.warning("--> Tavily搜索失败: %s", error)
+        self.logger.info("--> 使用备用分析策略...")
+        
+        # 备用方案：基于岗位名称进行基本分析
+        return f"""
             基于岗位名称 '{job}' 的基本分析：
             
             这是一个{job}职位，通常需要以下技能和要求：
@@ -118,122 +189,167 @@ class IndustryAnalyst:
             注意：由于网络搜索暂时不可用，以下分析基于通用行业知识。
             """
 
-        # 步骤 2: OpenAI 提取 (增强版Prompt)
-        try:
-            print("--> 正在连接OpenAI API进行信息提取...")
-            print("--> 预计需要30-60秒，请耐心等待...")
-            system_prompt = """
-            You are an expert recruitment analyst and market researcher. Your task is to extract comprehensive 
-            structured information from the provided text about a specific job role.
-            
-            From the provided context, please extract the following:
-            1. **Required Skills**: Technical and soft skills needed for this role
-            2. **Main Responsibilities**: Key job duties and expectations
-            3. **Salary Range**: Compensation information if available
-            4. **Market Trends**: Current industry demands and future outlook for this role
-            5. **Career Growth**: Typical progression paths and opportunities
-            """
+    def _build_basic_prompts(self, job: str, questions: List[str], context: str) -> Tuple[str, str]:
+        """构建基础分析的Prompt (增强版Prompt)"""
+        self.logger.debug("--> 正在连接OpenAI API进行信息提取...")
+        self.logger.debug("--> 预计需要30-60秒，请耐心等待...")
+        system_prompt = """
+        You are an expert recruitment analyst and market researcher. Your task is to extract comprehensive 
+        structured information from the provided text about a specific job role.
 
-            # 如果有额外问题，动态地加入到Prompt中
-            if questions:
-                questions_str = "\n".join(f"- {q}" for q in questions)
-                print(f"--> 根据 {len(questions)} 个批判问题进行深度分析...")
-                system_prompt += f"""
-                \n**Important**: While performing the analysis, you MUST specifically address and find answers for the following questions based on the industry context:
-                {questions_str}
-                Your extracted information should reflect updated insights based on these questions.
-                """
-
-            system_prompt += """
-            \nRespond ONLY with a valid JSON object in the following format:
-            {
-                "required_skills": ["skill1", "skill2", ...],
-                "responsibilities": ["responsibility1", "responsibility2", ...],
-                "salary_range": "e.g., 15k-30k USD or Not Mentioned",
-                "market_trends": ["trend1", "trend2", ...],
-                "career_growth": ["path1", "path2", ...]
-            }
-            
-            CRITICAL: Ensure ALL fields are present and are arrays/strings as specified. Do not return nested objects or missing fields.
+        From the provided context, please extract the following:
+        1. **Required Skills**: Technical and soft skills needed for this role
+        2. **Main Responsibilities**: Key job duties and expectations
+        3. **Salary Range**: Compensation information if available
+        4. **Market Trends**: Current industry demands and future outlook for this role
+        5. **Career Growth**: Typical progression paths and opportunities
+        """
+
+        # 如果有额外问题，动态地加入到Prompt中
+        if questions:
+            questions_str = "\n".join(f"- {q}" for q in questions)
+            self.logger.debug("--> 根据 %s 个批判问题进行深度分析...", len(questions))
+            system_prompt += f"""
+            \n**Important**: While performing the analysis, you MUST specifically address and find answers for the following questions based on the industry context:
+            {questions_str}
+            Your extracted information should reflect updated insights based on these questions.
             """
-            
-            print("--> 发送请求到DeepSeek AI...")
-            response = self.openai_client.chat.completions.create(
-                model="deepseek-ai/DeepSeek-R1",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Here is the context about the job '{job}':\n\n{context}"}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            print("--> 正在解析AI响应...")
-            # 安全的JSON解析
-            response_content = response.choices[0].message.content
-            print(f"--> 收到响应内容: {response_content[:200]}...")  # 打印前200字符用于调试
-            
-            try:
-                extracted_data = json.loads(response_content)
-                
-                # 验证返回的数据结构
-                if not isinstance(extracted_data, dict):
-                    raise ValueError(f"期望字典格式，但收到: {type(extracted_data)}")
-                
-                # 确保必要字段存在，如果不存在则设置默认值
-                required_fields = {
-                    "required_skills": [],
-                    "responsibilities": [],
-                    "salary_range": "Not Mentioned",
-                    "market_trends": [],
-                    "career_growth": []
-                }
-                
-                for field, default_value in required_fields.items():
-                    if field not in extracted_data:
-                        extracted_data[field] = default_value
-                    elif not isinstance(extracted_data[field], (list, str)):
-                        # 如果字段类型不正确，使用默认值
-                        extracted_data[field] = default_value
-                
-                print("--> OpenAI信息提取完成。")
-                
-            except json.JSONDecodeError as e:
-                print(f"--> JSON解析失败: {e}")
-                # 返回默认结构
-                extracted_data = {
-                    "required_skills": ["信息提取失败，请重试"],
-                    "responsibilities": ["信息提取失败，请重试"],
-                    "salary_range": "Not Mentioned",
-                    "market_trends": ["信息提取失败，请重试"],
-                    "career_growth": ["信息提取失败，请重试"]
-                }
-            
-            report = {
-                "job_title": job,
-                "analysis_source": "Tavily Search + OpenAI GPT-4o (Enhanced)",
-                **extracted_data
+
+        system_prompt += """
+        \nRespond ONLY with a valid JSON object in the following format:
+        {
+            "required_skills": ["skill1", "skill2", ...],
+            "responsibilities": ["responsibility1", "responsibility2", ...],
+            "salary_range": "e.g., 15k-30k USD or Not Mentioned",
+            "market_trends": ["trend1", "trend2", ...],
+            "career_growth": ["path1", "path2", ...]
+        }
+
+        CRITICAL: Ensure ALL fields are present and are arrays/strings as specified. Do not return nested objects or missing fields.
+        """
+        context = PromptBuilder().add_text("context", context).build()["context"]
+        user_prompt = f"Here is the context about the job '{job}':\n\n{context}"
+        return system_prompt, user_prompt
+
+    def _parse_basic_response(self, job: str, response_content: str) -> dict:
+        """解析基础分析的LLM响应并构建报告"""
+        self.logger.debug("--> 正在解析AI响应...")
+        # 安全的JSON解析
+        self.logger.debug("--> 收到响应内容: %.200s...", response_content)
+        
+        try:
+            extracted_data = self._loads_json(response_content, "extraction")
+
+            # 验证返回的数据结构
+            if not isinstance(extracted_data, dict):
+                raise ValueError(f"期望字典格式，但收到: {type(extracted_data)}")
+
+            # 确保必要字段存在，如果不存在则设置默认值
+            required_fields = {
+                "required_skills": [],
+                "responsibilities": [],
+                "salary_range": "Not Mentioned",
+                "market_trends": [],
+                "career_growth": []
             }
 
-        except Exception as e:
-            print(f"--> OpenAI信息提取失败: {e}")
-            return {
-                "job_title": job,
-                "analysis_source": "Error Recovery Mode",
-                "required_skills": ["Error: Unable to extract skills"],
-                "responsibilities": ["Error: Unable to extract responsibilities"],
-                "salary_range": "Error: Unable to extract salary",
-                "market_trends": ["Error: Unable to extract trends"],
-                "career_growth": ["Error: Unable to extract career paths"]
+            for field, default_value in required_fields.items():
+                if field not in extracted_data:
+                    extracted_data[field] = default_value
+                elif not isinstance(extracted_data[field], (list, str)):
+                    # 如果字段类型不正确，使用默认值
+                    extracted_data[field] = default_value
+
+            self.logger.debug("--> OpenAI信息提取完成。")
+
+        except json.JSONDecodeError as e:
+            self.logger.warning("--> JSON解析失败: %s", e)
+            # 返回默认结构，degraded标记表示内容只是占位
+            extracted_data = {
+                "degraded": True,
+                "required_skills": ["信息提取失败，请重试"],
+                "responsibilities": ["信息提取失败，请重试"],
+                "salary_range": "Not Mentioned",
+                "market_trends": ["信息提取失败，请重试"],
+                "career_growth": ["信息提取失败，请重试"]
             }
 
-        print(f"岗位 {job} 分析完成。")
+        report = {
+            "job_title": job,
+            "analysis_source": "Tavily Search + OpenAI GPT-4o (Enhanced)",
+            **extracted_data
+        }
         return report
+
+    def _error_recovery_report(self, job: str, error: Exception) -> dict:
+        """LLM提取失败（含熔断打开）时返回的降级报告，degraded标记表示内容只是占位"""
+        self.logger.warning("--> OpenAI信息提取失败: %s", error)
+        return {
+            "job_title": job,
+            "analysis_source": "Error Recovery Mode",
+            "degraded": True,
+            "required_skills": ["Error: Unable to extract skills"],
+            "responsibilities": ["Error: Unable to extract responsibilities"],
+            "salary_range": "Error: Unable to extract salary",
+            "market_trends": ["Error: Unable to extract trends"],
+            "career_growth": ["Error: Unable to extract career paths"]
+        }
     
     def _optimize_existing_report(self, job: str, questions: List[str], previous_report: dict) -> dict:
         """基于批判问题优化现有报告"""
-        print("--> 执行行业报告优化模式...")
+        self.logger.debug("--> 执行行业报告优化模式...")
+        query = self._build_optimization_query(job, questions)
         
-        # 构建针对性搜索查询
+        # 尝试获取补充信息
+        try:
+            self.logger.debug("--> 搜索补充信息: %s", query)
+            tavily_response = self._search(query, search_depth="basic", max_results=3)  # 使用基础搜索节省资源
+            additional_context = self._format_additional_context(tavily_response)
+            self.logger.debug("--> 补充信息搜索完成")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            self.logger.warning("--> 补充信息搜索失败: %s", e)
+            additional_context = "无法获取补充信息，基于现有报告进行优化。"
+
+        system_prompt, user_content = self._build_optimization_prompts(job, questions, previous_report, additional_context)
+        try:
+            self.logger.debug("--> 发送优化请求到DeepSeek AI...")
+            response_content = self._chat(system_prompt, user_content, "optimization")
+            return self._parse_optimization_response(job, questions, previous_report, response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._optimization_failed_report(job, questions, previous_report, e)
+
+    async def _aoptimize_existing_report(self, job: str, questions: List[str], previous_report: dict) -> dict:
+        """_optimize_existing_report 的协程版本"""
+        self.logger.debug("--> 执行行业报告优化模式...")
+        query = self._build_optimization_query(job, questions)
+
+        try:
+            self.logger.debug("--> 搜索补充信息: %s", query)
+            tavily_response = await self._asearch(query, search_depth="basic", max_results=3)
+            additional_context = self._format_additional_context(tavily_response)
+            self.logger.debug("--> 补充信息搜索完成")
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            self.logger.warning("--> 补充信息搜索失败: %s", e)
+            additional_context = "无法获取补充信息，基于现有报告进行优化。"
+
+        system_prompt, user_content = self._build_optimization_prompts(job, questions, previous_report, additional_context)
+        try:
+            self.logger.debug("--> 发送优化请求到DeepSeek AI...")
+            response_content = await self._achat(system_prompt, user_content, "optimization")
+            return self._parse_optimization_response(job, questions, previous_report, response_content)
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            return self._optimization_failed_report(job, questions, previous_report, e)
+
+    def _build_optimization_query(self, job: str, questions: List[str]) -> str:
+        """构建针对性搜索查询"""
         query_keywords = []
         for q in questions[:3]:  # 最多处理前3个问题
             if "技能" in q or "skill" in q.lower():
@@ -258,26 +374,16 @@ class IndustryAnalyst:
         # 限制查询长度
         if len(query) > 350:
             query = f"{job} 岗位 深度补充"
-        
-        # 尝试获取补充信息
+        return query
+
+    def _format_additional_context(self, tavily_response: dict) -> str:
         additional_context = ""
-        try:
-            print(f"--> 搜索补充信息: {query}")
-            tavily_response = self.tavily_client.search(
-                query=query,
-                search_depth="basic",  # 使用基础搜索节省资源
-                max_results=3
-            )
-            
-            for result in tavily_response['results']:
-                additional_context += f"补充信息: {result.get('content', '')}\n"
-            
-            print("--> 补充信息搜索完成")
-            
-        except Exception as e:
-            print(f"--> 补充信息搜索失败: {e}")
-            additional_context = "无法获取补充信息，基于现有报告进行优化。"
-        
+        for result in tavily_response['results']:
+            additional_context += f"补充信息: {result.get('content', '')}\n"
+        return additional_context
+
+    def _build_optimization_prompts(self, job: str, questions: List[str], previous_report: dict, additional_context: str) -> Tuple[str, str]:
+        """构建优化模式的Prompt"""
         # 构建优化提示词
         system_prompt = """
         You are an expert industry analyst performing report optimization. Your task is to improve and enhance an existing job market analysis report based on specific critical questions.
@@ -318,91 +424,87 @@ class IndustryAnalyst:
         CRITICAL: Ensure ALL fields are present and properly formatted. Focus on ENHANCING, not replacing.
         """
         
-        # 构建用户输入
+        # 构建用户输入：只带入优化需要的字段，去重并压缩到Token预算以内
+        fields = (PromptBuilder()
+                  .add_report(previous_report, "industry_optimization")
+                  .add_text("additional_context", additional_context)
+                  .build())
         user_content = f"""
         **Existing Report to Optimize:**
         Job Title: {previous_report.get('job_title', job)}
-        Required Skills: {previous_report.get('required_skills', [])}
-        Responsibilities: {previous_report.get('responsibilities', [])}
+        Required Skills: {fields['required_skills']}
+        Responsibilities: {fields['responsibilities']}
         Salary Range: {previous_report.get('salary_range', 'Not Mentioned')}
-        Market Trends: {previous_report.get('market_trends', [])}
-        Career Growth: {previous_report.get('career_growth', [])}
+        Market Trends: {fields['market_trends']}
+        Career Growth: {fields['career_growth']}
         
         **Additional Context for Optimization:**
-        {additional_context}
+        {fields['additional_context']}
         
         Please optimize this report by addressing the critical questions while maintaining the valuable existing information.
         """
+        return system_prompt, user_content
+
+    def _parse_optimization_response(self, job: str, questions: List[str], previous_report: dict, response_content: str) -> dict:
+        """解析优化结果并构建优化后的报告"""
+        self.logger.debug("--> 正在解析优化结果...")
+        self.logger.debug("--> 收到优化结果: %.200s...", response_content)
         
         try:
-            print("--> 发送优化请求到DeepSeek AI...")
-            response = self.openai_client.chat.completions.create(
-                model="deepseek-ai/DeepSeek-R1",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                response_format={"type": "json_object"}
-            )
-            
-            print("--> 正在解析优化结果...")
-            response_content = response.choices[0].message.content
-            print(f"--> 收到优化结果: {response_content[:200]}...")
-            
-            try:
-                optimized_data = json.loads(response_content)
-                
-                # 验证数据结构
-                if not isinstance(optimized_data, dict):
-                    raise ValueError(f"期望字典格式，但收到: {type(optimized_data)}")
-                
-                # 确保字段存在并且格式正确
-                required_fields = {
-                    "required_skills": [],
-                    "responsibilities": [],
-                    "salary_range": "Not Mentioned",
-                    "market_trends": [],
-                    "career_growth": []
-                }
-                
-                for field, default_value in required_fields.items():
-                    if field not in optimized_data:
-                        # 如果字段不存在，使用原报告的数据
-                        optimized_data[field] = previous_report.get(field, default_value)
-                    elif not isinstance(optimized_data[field], (list, str)):
-                        # 如果字段类型不正确，使用原报告的数据
-                        optimized_data[field] = previous_report.get(field, default_value)
-                
-                print("--> 行业报告优化完成")
-                
-            except json.JSONDecodeError as e:
-                print(f"--> 优化结果解析失败: {e}")
-                # 如果解析失败，使用原报告
-                optimized_data = {
-                    "required_skills": previous_report.get("required_skills", []),
-                    "responsibilities": previous_report.get("responsibilities", []),
-                    "salary_range": previous_report.get("salary_range", "Not Mentioned"),
-                    "market_trends": previous_report.get("market_trends", []),
-                    "career_growth": previous_report.get("career_growth", [])
-                }
-            
-            # 构建优化后的报告
-            optimized_report = {
-                "job_title": job,
-                "analysis_source": "Optimized Report (Tavily + OpenAI Enhanced)",
-                "optimization_questions": questions,
-                **optimized_data
+            optimized_data = self._loads_json(response_content, "optimization")
+
+            # 验证数据结构
+            if not isinstance(optimized_data, dict):
+                raise ValueError(f"期望字典格式，但收到: {type(optimized_data)}")
+
+            # 确保字段存在并且格式正确
+            required_fields = {
+                "required_skills": [],
+                "responsibilities": [],
+                "salary_range": "Not Mentioned",
+                "market_trends": [],
+                "career_growth": []
             }
-            
-            print(f"岗位 {job} 报告优化完成")
-            return optimized_report
 
-        except Exception as e:
-            print(f"--> 行业报告优化失败: {e}")
-            # 如果优化失败，返回原报告
-            return {
-                "job_title": job,
-                "analysis_source": "Optimization Failed - Using Previous Report",
-                "optimization_questions": questions,
-                **previous_report
+            for field, default_value in required_fields.items():
+                if field not in optimized_data:
+                    # 如果字段不存在，使用原报告的数据
+                    optimized_data[field] = previous_report.get(field, default_value)
+                elif not isinstance(optimized_data[field], (list, str)):
+                    # 如果字段类型不正确，使用原报告的数据
+                    optimized_data[field] = previous_report.get(field, default_value)
+
+            self.logger.info("--> 行业报告优化完成")
+
+        except json.JSONDecodeError as e:
+            self.logger.warning("--> 优化结果解析失败: %s", e)
+            # 如果解析失败，使用原报告
+            optimized_data = {
+                "required_skills": previous_report.get("required_skills", []),
+                "responsibilities": previous_report.get("responsibilities", []),
+                "salary_range": previous_report.get("salary_range", "Not Mentioned"),
+                "market_trends": previous_report.get("market_trends", []),
+                "career_growth": previous_report.get("career_growth", [])
             }
+
+        # 构建优化后的报告
+        optimized_report = {
+            "job_title": job,
+            "analysis_source": "Optimized Report (Tavily + OpenAI Enhanced)",
+            "optimization_questions": questions,
+            **optimized_data
+        }
+
+        self.logger.info("岗位 %s 报告优化完成", job)
+        return optimized_report
+
+    def _optimization_failed_report(self, job: str, questions: List[str], previous_report: dict, error: Exception) -> dict:
+        """优化失败时返回原报告"""
+        self.logger.warning("--> 行业报告优化失败: %s", error)
+        # 如果优化失败，返回原报告
+        return {
+            "job_title": job,
+            "analysis_source": "Optimization Failed - Using Previous Report",
+            "optimization_questions": questions,
+            **previous_report
+        }
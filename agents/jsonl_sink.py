@@ -0,0 +1,74 @@
+"""
+JSONL结果输出 (JsonlSink)
+
+职责:
+1.  以追加方式将分析结果逐条写入JSONL文件，每条结果完成后立即落盘（durable=True，默认）。
+2.  durable=False 时保持文件句柄并使用缓冲写入，不逐条 fsync，由调用方在合适时机 flush()/close()，
+    适用于讨论日志这类高频、可丢失尾部的记录。
+3.  支持多线程并发写入，并提供读取已有记录的能力，便于断点续跑。
+"""
+from typing import Any, Dict, Iterator
+import json
+import os
+import threading
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class JsonlSink:
+    def __init__(self, path: str, durable: bool = True):
+        """
+        Args:
+            path: JSONL文件路径
+            durable: 为True时每条记录写入后立即 fsync；为False时缓冲写入
+        """
+        self.path = path
+        self.durable = durable
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录；durable模式下立即刷新到磁盘"""
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if not self.durable:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line + "\n")
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def flush(self):
+        """把缓冲中的记录写入文件（不 fsync）"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        """关闭缓冲模式下保持的文件句柄，之后的写入会重新打开文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def read_records(self) -> Iterator[Dict[str, Any]]:
+        """读取已写入的记录，跳过因中断而写坏的行"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("--> 跳过无法解析的记录: %s...", line[:80])
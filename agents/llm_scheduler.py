@@ -0,0 +1,279 @@
+"""
+LLM请求调度器 (LLMScheduler)
+
+职责:
+1.  所有 chat.completions.create 调用在发出前向调度器申请配额，按每分钟请求数（RPM）与
+    每分钟Token数（TPM）两个令牌桶限速，使并发用户能用满服务商配额而不触发成片的429。
+2.  按优先级排队：界面上的交互式分析优先于批处理任务；同一优先级内先到先得。
+    优先级通过contextvars传递，在批处理入口用 use_priority(PRIORITY_BATCH) 包裹即可。
+3.  请求前按Prompt长度与预期输出预估Token并预留，响应返回实际用量后多退少补。
+4.  提供队列深度、已放行数量与排队等待时间统计（stats()），队列深度同时作为Prometheus指标导出，
+    排队等待在链路中记录为 llm.schedule Span。
+
+环境变量:
+    LLM_REQUESTS_PER_MINUTE (默认0，不限制)、LLM_TOKENS_PER_MINUTE (默认0，不限制)、
+    LLM_COMPLETION_TOKENS_ESTIMATE (单次调用预估的输出Token数，默认2000)
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from .cancellation import current_token
+from .logging_utils import get_logger
+from .telemetry import estimate_tokens, get_telemetry
+
+logger = get_logger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# 单次调用预估的输出Token数（DeepSeek-R1的推理内容也计入输出），请求前按此预留TPM配额
+COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "2000"))
+
+# 同步等待时的最长单次睡眠，保证能及时响应取消
+_POLL_SECONDS = 0.5
+_ASYNC_POLL_SECONDS = 0.05
+
+_current_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def current_priority() -> int:
+    """当前执行上下文中的LLM请求优先级，默认为交互式"""
+    return _current_priority.get()
+
+
+@contextmanager
+def use_priority(priority: int) -> Iterator[int]:
+    """在当前执行上下文中设置LLM请求优先级"""
+    reset = _current_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _current_priority.reset(reset)
+
+
+def estimate_request_tokens(messages: List[Dict[str, str]]) -> int:
+    """预估一次请求消耗的Token数：Prompt长度估算 + 预期输出"""
+    return sum(estimate_tokens(message["content"]) for message in messages) + COMPLETION_TOKENS_ESTIMATE
+
+
+class TokenBucket:
+    """按分钟速率匀速补充的令牌桶，容量默认为一分钟的配额；不加锁，由调度器统一加锁"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or float(rate_per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """取出amount个令牌还需等待的秒数；超过容量的请求只需等桶满即可放行"""
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float):
+        """取出令牌，允许透支，透支部分由后续补充抵扣"""
+        self._refill()
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        """归还（amount为负时追加扣除）令牌"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class LLMScheduler:
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        """
+        Args:
+            requests_per_minute: 每分钟请求数上限，0表示不限制
+            tokens_per_minute: 每分钟Token数上限（输入+输出），0表示不限制
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._condition = threading.Condition()
+        # 等待队列：(优先级, 到达序号) 的小顶堆
+        self._queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._granted: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waits: Dict[int, Deque[float]] = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self.telemetry = get_telemetry()
+
+    @property
+    def enabled(self) -> bool:
+        return self._request_bucket is not None or self._token_bucket is not None
+
+    # --- 排队与放行（调用方持有锁） ---
+    def _enqueue(self, priority: int) -> Tuple[int, int]:
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._queue, entry)
+        return entry
+
+    def _dequeue(self, entry: Tuple[int, int]):
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+        # 队首变化，唤醒其余等待者重新检查
+        self._condition.notify_all()
+
+    def _try_grant(self, entry: Tuple[int, int], tokens: int) -> Optional[float]:
+        """轮到entry且配额足够时放行并返回0；否则返回需等待的秒数（未轮到时返回None）"""
+        if self._queue[0] != entry:
+            return None
+        wait = max(
+            self._request_bucket.wait_time(1) if self._request_bucket else 0.0,
+            self._token_bucket.wait_time(tokens) if self._token_bucket else 0.0,
+        )
+        if wait > 0:
+            return wait
+        if self._request_bucket:
+            self._request_bucket.take(1)
+        if self._token_bucket:
+            self._token_bucket.take(tokens)
+        self._granted[entry[0]] += 1
+        return 0.0
+
+    def _finish_wait(self, priority: int, start_time: float, span):
+        waited = time.monotonic() - start_time
+        self._waits[priority].append(waited)
+        span.set_attribute("queue.wait_seconds", round(waited, 4))
+        if waited >= 1:
+            logger.debug("--> LLM请求排队 %.2f 秒（%s）", waited, PRIORITY_NAMES[priority])
+
+    # --- 申请配额 ---
+    def acquire(self, tokens: int, priority: Optional[int] = None) -> int:
+        """
+        阻塞直到放行，返回预留的Token数（用于之后的 settle）
+
+        等待期间遵循当前取消令牌，取消时抛出OperationCancelled并退出队列。
+        """
+        priority = current_priority() if priority is None else priority
+        if not self.enabled:
+            with self._condition:
+                self._granted[priority] += 1
+            return tokens
+        token = current_token()
+        start_time = time.monotonic()
+        with self.telemetry.span("llm.schedule", priority=PRIORITY_NAMES[priority]) as span:
+            span.set_attribute("tokens.reserved", tokens)
+            with self._condition:
+                entry = self._enqueue(priority)
+                span.set_attribute("queue.depth", len(self._queue))
+                try:
+                    while True:
+                        wait = self._try_grant(entry, tokens)
+                        if wait == 0:
+                            break
+                        if token is not None:
+                            token.check()
+                        self._condition.wait(_POLL_SECONDS if wait is None else min(wait, _POLL_SECONDS))
+                finally:
+                    self._dequeue(entry)
+            self._finish_wait(priority, start_time, span)
+        return tokens
+
+    async def aacquire(self, tokens: int, priority: Optional[int] = None) -> int:
+        """acquire() 的协程版本，以短间隔轮询，不阻塞事件循环"""
+        priority = current_priority() if priority is None else priority
+        if not self.enabled:
+            with self._condition:
+                self._granted[priority] += 1
+            return tokens
+        token = current_token()
+        start_time = time.monotonic()
+        with self.telemetry.span("llm.schedule", priority=PRIORITY_NAMES[priority]) as span:
+            span.set_attribute("tokens.reserved", tokens)
+            with self._condition:
+                entry = self._enqueue(priority)
+                span.set_attribute("queue.depth", len(self._queue))
+            try:
+                while True:
+                    with self._condition:
+                        wait = self._try_grant(entry, tokens)
+                    if wait == 0:
+                        break
+                    if token is not None:
+                        token.check()
+                    await asyncio.sleep(_ASYNC_POLL_SECONDS if wait is None else min(wait, _ASYNC_POLL_SECONDS))
+            finally:
+                with self._condition:
+                    self._dequeue(entry)
+            self._finish_wait(priority, start_time, span)
+        return tokens
+
+    def settle(self, reserved: int, actual: int):
+        """响应返回后按实际Token用量修正TPM令牌桶"""
+        if self._token_bucket is None or actual == reserved:
+            return
+        with self._condition:
+            self._token_bucket.give_back(reserved - actual)
+            self._condition.notify_all()
+
+    # --- 统计 ---
+    def queue_depth(self) -> Dict[str, int]:
+        with self._condition:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._queue:
+                depth[PRIORITY_NAMES[priority]] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度、已放行数量与各优先级的排队等待时间（最近1000次）"""
+        with self._condition:
+            waits = {priority: sorted(values) for priority, values in self._waits.items()}
+            granted = dict(self._granted)
+        wait_stats = {}
+        for priority, values in waits.items():
+            wait_stats[PRIORITY_NAMES[priority]] = {
+                "mean": round(sum(values) / len(values), 4) if values else 0.0,
+                "p95": round(values[int((len(values) - 1) * 0.95)], 4) if values else 0.0,
+                "max": round(values[-1], 4) if values else 0.0,
+            }
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "queue_depth": self.queue_depth(),
+            "granted": {PRIORITY_NAMES[priority]: count for priority, count in granted.items()},
+            "wait_seconds": wait_stats,
+        }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """获取进程级共享的LLM调度器，配额从环境变量读取"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+                tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+            )
+            _scheduler.telemetry.register_gauge(
+                "agent_llm_queue_depth", "LLM requests waiting for rate-limit quota.",
+                lambda: {(("priority", name),): depth for name, depth in _scheduler.queue_depth().items()},
+            )
+            if _scheduler.enabled:
+                logger.info("--> LLM调度器已启用: %s 次/分钟, %s Token/分钟",
+                            _scheduler.requests_per_minute or "不限", _scheduler.tokens_per_minute or "不限")
+        return _scheduler
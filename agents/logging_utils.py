@@ -0,0 +1,136 @@
+"""
+结构化日志 (logging_utils)
+
+职责:
+1.  为每个智能体与模块提供独立的logger（agents.<名称>），可按名称单独调整级别。
+2.  日志消息使用 %-风格的延迟格式化：级别未启用时不会拼接字符串，安静模式下几乎没有开销。
+3.  支持文本与JSON两种输出格式；JSON格式附带当前追踪Span的trace_id/span_id以及轮次、阶段，
+    便于与 /traces 导出的链路关联。
+4.  通过QueueHandler + QueueListener把实际的I/O移到后台线程，高并发下工作线程不会阻塞在stdout上。
+
+环境变量:
+    AGENT_LOG_LEVEL (默认INFO)、AGENT_LOG_FORMAT (text 或 json，默认text)
+"""
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, TextIO
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT_LOGGER_NAME = "agents"
+
+# LogRecord自带的属性，其余属性视为通过 extra= 传入的结构化字段
+_RESERVED_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """获取 agents 命名空间下的logger，如 get_logger("EducationAnalyst") -> agents.EducationAnalyst"""
+    if name == ROOT_LOGGER_NAME or name.startswith(ROOT_LOGGER_NAME + "."):
+        return logging.getLogger(name)
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def _span_fields() -> Dict[str, Any]:
+    # 延迟导入，避免与telemetry互相依赖
+    from .telemetry import current_span
+    span = current_span()
+    fields = {}
+    if getattr(span, "trace_id", None):
+        fields["trace_id"] = span.trace_id
+        fields["span_id"] = span.span_id
+    for key in ("round", "stage"):
+        if key in span.attributes:
+            fields[key] = span.attributes[key]
+    return fields
+
+
+class ContextFilter(logging.Filter):
+    """在记录产生的线程中附加追踪上下文（队列处理线程中已无法获取）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _span_fields().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, json_format: Optional[bool] = None,
+                      stream: Optional[TextIO] = None, queued: bool = True) -> logging.Logger:
+    """
+    配置 agents 命名空间的日志输出，可重复调用（以最后一次为准）
+
+    Args:
+        level: 日志级别，默认读取 AGENT_LOG_LEVEL（INFO）
+        json_format: 是否输出JSON，默认读取 AGENT_LOG_FORMAT
+        stream: 输出流，默认stdout
+        queued: 是否经由队列在后台线程输出
+    """
+    global _listener
+    level = (level or os.getenv("AGENT_LOG_LEVEL", "INFO")).upper()
+    if json_format is None:
+        json_format = os.getenv("AGENT_LOG_FORMAT", "text").lower() == "json"
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter("%(message)s"))
+
+    with _configure_lock:
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        if queued:
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            # QueueHandler在工作线程中只完成消息格式化，结构化字段保留在记录上，由后台线程输出
+            handler: logging.Handler = QueueHandler(log_queue)
+            _listener = QueueListener(log_queue, output, respect_handler_level=True)
+            _listener.start()
+        else:
+            handler = output
+        if json_format:
+            handler.addFilter(ContextFilter())
+        root.addHandler(handler)
+        root.setLevel(level)
+        root.propagate = False
+    return root
+
+
+def shutdown_logging():
+    """停止后台输出线程并写出队列中剩余的日志"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
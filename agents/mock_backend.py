@@ -0,0 +1,532 @@
+"""
+离线模拟后端 (MockBackend)
+
+职责:
+1.  模拟OpenAI chat-completions与Tavily search协议，按智能体期望的字段
+    （required_skills、core_courses、education_questions、core_skills_matched等）返回预置JSON。
+2.  支持可配置的延迟分布、错误率与自定义响应，既可作为进程内的假客户端直接注入智能体，
+    也可作为本地HTTP服务，通过 LLM_BASE_URL / TAVILY_API_BASE_URL 让整条流水线在无网络环境下运行。
+3.  为压测、基准测试与回归测试提供稳定、可复现的后端。
+
+用法:
+    python -m agents.mock_backend --port 8765 --llm-latency lognormal:2:0.5 --error-rate 0.05
+    LLM_BASE_URL=http://127.0.0.1:8765/v1 TAVILY_API_BASE_URL=http://127.0.0.1:8765 python batch_runner.py ...
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import argparse
+import ast
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+
+
+class MockBackendError(Exception):
+    """模拟后端按错误率注入的错误"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LatencyModel:
+    """延迟分布：fixed / uniform / normal / lognormal / exponential"""
+
+    def __init__(self, kind: str = "fixed", mean: float = 0.0, spread: float = 0.0,
+                 minimum: float = 0.0, maximum: Optional[float] = None):
+        """
+        Args:
+            kind: 分布类型
+            mean: 平均延迟（秒）；uniform时为下限
+            spread: 分布宽度；uniform时为上限，normal时为标准差，lognormal时为对数标准差
+            minimum / maximum: 采样结果的截断范围
+        """
+        self.kind = kind
+        self.mean = mean
+        self.spread = spread
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """解析形如 "lognormal:2:0.5"、"uniform:0.2:0.8"、"fixed:1" 的延迟描述"""
+        parts = spec.split(":")
+        values = [float(value) for value in parts[1:]]
+        return cls(parts[0], *values)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.mean
+        elif self.kind == "uniform":
+            value = rng.uniform(self.mean, self.spread)
+        elif self.kind == "normal":
+            value = rng.gauss(self.mean, self.spread)
+        elif self.kind == "lognormal":
+            # 使分布的均值等于mean
+            sigma = self.spread
+            mu = math.log(max(self.mean, 1e-6)) - sigma ** 2 / 2
+            value = rng.lognormvariate(mu, sigma)
+        elif self.kind == "exponential":
+            value = rng.expovariate(1.0 / self.mean) if self.mean > 0 else 0.0
+        else:
+            raise ValueError(f"未知的延迟分布: {self.kind}")
+        value = max(value, self.minimum)
+        if self.maximum is not None:
+            value = min(value, self.maximum)
+        return value
+
+
+class MockProfile:
+    def __init__(self, llm_latency: LatencyModel = None, search_latency: LatencyModel = None,
+                 error_rate: float = 0.0, question_rate: float = 0.5, stream_chunks: int = 20,
+                 payloads: Dict[str, Any] = None, seed: Optional[int] = None):
+        """
+        Args:
+            llm_latency: 每次LLM调用的总延迟
+            search_latency: 每次搜索调用的延迟
+            error_rate: 注入错误的概率（返回500或429）
+            question_rate: 批判者为每位分析师提出问题的概率，决定讨论会进行多少轮
+            stream_chunks: 流式响应拆分的片段数
+            payloads: 按响应类型（education/industry/critique/scoring/search）覆盖默认的预置响应
+            seed: 随机种子，固定后结果可复现
+        """
+        self.llm_latency = llm_latency or LatencyModel()
+        self.search_latency = search_latency or LatencyModel()
+        self.error_rate = error_rate
+        self.question_rate = question_rate
+        self.stream_chunks = stream_chunks
+        self.payloads = payloads or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # 调用记录：[{kind, seconds, prompt_tokens, completion_tokens, error}]，供基准测试统计
+        self.calls: List[Dict[str, Any]] = []
+
+    def record_call(self, kind: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0,
+                    error: Optional[str] = None):
+        with self._lock:
+            self.calls.append({
+                "kind": kind,
+                "seconds": seconds,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "error": error,
+            })
+
+    def reset_calls(self) -> List[Dict[str, Any]]:
+        """取出并清空调用记录"""
+        with self._lock:
+            calls, self.calls = self.calls, []
+        return calls
+
+    def random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def sample_llm_latency(self) -> float:
+        with self._lock:
+            return self.llm_latency.sample(self._rng)
+
+    def sample_search_latency(self) -> float:
+        with self._lock:
+            return self.search_latency.sample(self._rng)
+
+    def maybe_fail(self):
+        """按错误率抛出MockBackendError"""
+        if self.error_rate and self.random() < self.error_rate:
+            status = 429 if self.random() < 0.5 else 500
+            raise MockBackendError(status, "模拟后端注入的错误" if status == 500 else "模拟后端限流")
+
+
+# --- 预置响应 ---
+_LIST_LINE = re.compile(r"^\s*[-*]?\s*([^:\n：]+)[:：]\s*(.+?)\s*$", re.MULTILINE)
+_OMITTED_MARK = re.compile(r"\s*\(\+\d+ more\)$")
+
+
+def _extract_lists(text: str) -> Dict[str, List[Any]]:
+    """从Prompt中提取 "字段: [..]" 或 "字段: a; b; c" 形式的列表，用于生成与输入相关的响应"""
+    lists = {}
+    for match in _LIST_LINE.finditer(text):
+        raw = match.group(2)
+        if raw.startswith("["):
+            try:
+                value = ast.literal_eval(raw)
+            except (ValueError, SyntaxError):
+                continue
+        elif raw == "(none)":
+            value = []
+        else:
+            value = [item for item in _OMITTED_MARK.sub("", raw).split("; ") if item]
+        if isinstance(value, list):
+            lists[match.group(1).strip()] = value
+    return lists
+
+
+def classify_messages(messages: List[Dict[str, str]]) -> str:
+    """根据系统Prompt判断请求来自哪个智能体的哪个环节"""
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    if "core_skills_matched" in system:
+        return "scoring"
+    if "education_questions" in system:
+        return "critique"
+    if "responsibilities" in system:
+        return "industry"
+    if "core_courses" in system:
+        return "education"
+    return "unknown"
+
+
+def canned_chat_payload(kind: str, messages: List[Dict[str, str]], profile: MockProfile) -> Dict[str, Any]:
+    """生成与智能体期望格式一致的响应"""
+    if kind in profile.payloads:
+        return profile.payloads[kind]
+
+    user = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+    if kind == "education":
+        return {
+            "core_courses": ["数据结构", "算法设计与分析", "操作系统", "数据库系统", "计算机网络", "机器学习导论"],
+            "required_skills": ["Python编程", "算法设计", "数据库", "机器学习", "软件工程", "沟通协作"],
+        }
+    if kind == "industry":
+        return {
+            "required_skills": ["Python", "机器学习", "深度学习", "SQL", "分布式系统", "英语阅读"],
+            "responsibilities": ["设计与实现算法模型", "优化线上服务性能", "与产品团队协作落地需求"],
+            "salary_range": "20k-40k CNY/月",
+            "market_trends": ["大模型应用快速普及", "对工程化能力要求提高"],
+            "career_growth": ["算法工程师 → 高级算法工程师 → 技术负责人"],
+        }
+    if kind == "critique":
+        result = {"critique_summary": "模拟批判：报告整体合理，部分细节有待补充。", "education_questions": [], "industry_questions": []}
+        if profile.random() < profile.question_rate:
+            result["education_questions"] = ["课程中实践项目的比例是多少？"]
+        if profile.random() < profile.question_rate:
+            result["industry_questions"] = ["该岗位近两年的薪资变化趋势如何？"]
+        return result
+    if kind == "scoring":
+        lists = _extract_lists(user)
+        industry_skills = next((value for key, value in lists.items() if "行业" in key), [])
+        third = max(len(industry_skills) // 3, 1)
+        return {
+            "core_skills_matched": industry_skills[:third],
+            "related_skills_matched": industry_skills[third:2 * third],
+            "skill_gaps": industry_skills[2 * third:],
+        }
+    return {}
+
+
+def canned_search_payload(query: str, max_results: int, profile: MockProfile) -> Dict[str, Any]:
+    if "search" in profile.payloads:
+        return profile.payloads["search"]
+    results = [
+        {
+            "title": f"{query} - 模拟结果 {index + 1}",
+            "url": f"https://example.com/mock/{index + 1}",
+            "content": f"关于 {query} 的模拟搜索内容：核心课程、技能要求、岗位职责与行业趋势的概述。",
+            "score": round(1.0 - index * 0.1, 2),
+        }
+        for index in range(max_results or 5)
+    ]
+    return {"query": query, "results": results, "response_time": 0.0}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+def _split_chunks(text: str, count: int) -> List[str]:
+    size = max(math.ceil(len(text) / max(count, 1)), 1)
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def build_chat_completion(model: str, messages: List[Dict[str, str]], profile: MockProfile) -> Dict[str, Any]:
+    """构建chat.completion响应体（OpenAI协议）"""
+    content = json.dumps(canned_chat_payload(classify_messages(messages), messages, profile), ensure_ascii=False)
+    prompt_tokens = sum(_estimate_tokens(m.get("content", "")) for m in messages)
+    completion_tokens = _estimate_tokens(content)
+    return {
+        "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def iter_chat_chunks(completion: Dict[str, Any], profile: MockProfile) -> Iterator[Dict[str, Any]]:
+    """把完整响应拆分为chat.completion.chunk序列（不含延迟）"""
+    content = completion["choices"][0]["message"]["content"]
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"],
+            "model": completion["model"]}
+    for piece in _split_chunks(content, profile.stream_chunks):
+        yield dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+    yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}], usage=completion["usage"])
+
+
+def _to_namespace(value: Any) -> Any:
+    """把字典转换为支持属性访问的对象，模拟openai SDK的响应类型"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _to_namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_to_namespace(item) for item in value]
+    return value
+
+
+# --- 进程内假客户端 ---
+def _record_completion(profile: MockProfile, kind: str, start_time: float, completion: Dict[str, Any]):
+    usage = completion["usage"]
+    profile.record_call(kind, time.monotonic() - start_time, usage["prompt_tokens"], usage["completion_tokens"])
+
+
+class _FakeStream:
+    def __init__(self, chunks: List[Dict[str, Any]], delay: float, on_done: Callable[[], None]):
+        self._chunks = chunks
+        self._delay = delay
+        self._on_done = on_done
+        self._closed = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if self._closed:
+                return
+            time.sleep(self._delay)
+            delta = chunk["choices"][0]["delta"]
+            delta.setdefault("content", None)
+            delta.setdefault("reasoning_content", None)
+            yield _to_namespace(chunk)
+        self._on_done()
+
+    def close(self):
+        self._closed = True
+
+
+class _FakeCompletions:
+    def __init__(self, profile: MockProfile):
+        self.profile = profile
+
+    def create(self, model: str, messages: List[Dict[str, str]], stream: bool = False, **kwargs):
+        start_time = time.monotonic()
+        kind = classify_messages(messages)
+        latency = self.profile.sample_llm_latency()
+        try:
+            self.profile.maybe_fail()
+        except MockBackendError as e:
+            self.profile.record_call(kind, time.monotonic() - start_time, error=str(e))
+            raise
+        completion = build_chat_completion(model, messages, self.profile)
+        if stream:
+            chunks = list(iter_chat_chunks(completion, self.profile))
+            return _FakeStream(chunks, latency / len(chunks),
+                               lambda: _record_completion(self.profile, kind, start_time, completion))
+        time.sleep(latency)
+        _record_completion(self.profile, kind, start_time, completion)
+        return _to_namespace(completion)
+
+
+class FakeOpenAIClient:
+    """进程内模拟的同步OpenAI客户端，支持 chat.completions.create(stream=True/False)"""
+
+    def __init__(self, profile: MockProfile = None):
+        self.profile = profile or MockProfile()
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self.profile))
+
+
+class FakeTavilyClient:
+    """进程内模拟的同步Tavily客户端"""
+
+    def __init__(self, profile: MockProfile = None):
+        self.profile = profile or MockProfile()
+
+    def search(self, query: str, search_depth: str = "basic", max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        start_time = time.monotonic()
+        time.sleep(self.profile.sample_search_latency())
+        try:
+            self.profile.maybe_fail()
+        except MockBackendError as e:
+            self.profile.record_call("search", time.monotonic() - start_time, error=str(e))
+            raise
+        self.profile.record_call("search", time.monotonic() - start_time, prompt_tokens=_estimate_tokens(query))
+        return canned_search_payload(query, max_results, self.profile)
+
+
+def install_fakes(agents: List[Any], profile: MockProfile = None) -> MockProfile:
+    """
+    将智能体的同步客户端替换为进程内假客户端（异步接口请使用HTTP模拟服务）
+
+    Args:
+        agents: BaseAgent实例列表，如 [coordinator.education_analyst, coordinator.industry_analyst, coordinator.critic_analyst]
+    """
+    profile = profile or MockProfile()
+    openai_client = FakeOpenAIClient(profile)
+    tavily_client = FakeTavilyClient(profile)
+    for agent in agents:
+        agent.openai_client = openai_client
+        if agent.tavily_client is not None:
+            agent.tavily_client = tavily_client
+    return profile
+
+
+# --- HTTP模拟服务 ---
+class _MockRequestHandler(BaseHTTPRequestHandler):
+    server_version = "MockBackend/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def profile(self) -> MockProfile:
+        return self.server.profile
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+
+        start_time = time.monotonic()
+        kind = "search"
+        try:
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                kind = classify_messages(body.get("messages", []))
+                self._handle_chat(body, kind, start_time)
+            elif self.path.rstrip("/").endswith("/search"):
+                time.sleep(self.profile.sample_search_latency())
+                self.profile.maybe_fail()
+                self._send_json(200, canned_search_payload(body.get("query", ""), body.get("max_results") or 5, self.profile))
+                self.profile.record_call(kind, time.monotonic() - start_time, prompt_tokens=_estimate_tokens(body.get("query", "")))
+            else:
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+        except MockBackendError as e:
+            self.profile.record_call(kind, time.monotonic() - start_time, error=str(e))
+            self._send_json(e.status_code, {"error": {"message": str(e), "type": "mock_error"}})
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端取消请求后断开连接
+            pass
+
+    def _handle_chat(self, body: Dict[str, Any], kind: str, start_time: float):
+        latency = self.profile.sample_llm_latency()
+        self.profile.maybe_fail()
+        completion = build_chat_completion(body.get("model", "mock-model"), body.get("messages", []), self.profile)
+        if not body.get("stream"):
+            time.sleep(latency)
+            self._send_json(200, completion)
+            _record_completion(self.profile, kind, start_time, completion)
+            return
+
+        chunks = list(iter_chat_chunks(completion, self.profile))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        _record_completion(self.profile, kind, start_time, completion)
+
+
+class MockBackendServer:
+    """本地HTTP模拟服务，同时提供 /v1/chat/completions 与 /search"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, profile: MockProfile = None, verbose: bool = False):
+        self.profile = profile or MockProfile()
+        self._server = ThreadingHTTPServer((host, port), _MockRequestHandler)
+        self._server.daemon_threads = True
+        self._server.profile = self.profile
+        self._server.verbose = verbose
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def llm_base_url(self) -> str:
+        """作为 LLM_BASE_URL 使用"""
+        return f"{self.address}/v1"
+
+    @property
+    def search_base_url(self) -> str:
+        """作为 TAVILY_API_BASE_URL 使用"""
+        return self.address
+
+    def start(self) -> "MockBackendServer":
+        """在后台线程中启动服务"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-backend", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockBackendServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="启动本地OpenAI/Tavily模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", default="fixed:0", help='LLM延迟分布，如 "lognormal:2:0.5"')
+    parser.add_argument("--search-latency", default="fixed:0", help='搜索延迟分布，如 "uniform:0.2:0.8"')
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入错误的概率")
+    parser.add_argument("--question-rate", type=float, default=0.5, help="批判者提出问题的概率")
+    parser.add_argument("--payloads", help="覆盖预置响应的JSON文件，键为 education/industry/critique/scoring/search")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    payloads = None
+    if args.payloads:
+        with open(args.payloads, "r", encoding="utf-8") as f:
+            payloads = json.load(f)
+    profile = MockProfile(
+        llm_latency=LatencyModel.parse(args.llm_latency),
+        search_latency=LatencyModel.parse(args.search_latency),
+        error_rate=args.error_rate,
+        question_rate=args.question_rate,
+        payloads=payloads,
+        seed=args.seed,
+    )
+    server = MockBackendServer(args.host, args.port, profile, verbose=args.verbose)
+    print(f"模拟后端已启动: LLM_BASE_URL={server.llm_base_url} TAVILY_API_BASE_URL={server.search_base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
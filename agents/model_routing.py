@@ -0,0 +1,115 @@
+"""
+模型分级路由 (ModelRouter)
+
+职责:
+1.  按调用用途选择模型：信息提取（extraction）与报告优化（optimization）属于结构化JSON整理，
+    默认交给快速的非推理模型；批判（critique）与最终评分复核（scoring）保留推理模型DeepSeek-R1。
+2.  快速模型的输出未通过JSON校验（无法解析、不是对象或缺少必要的列表字段）时，
+    自动用推理模型重试一次（升级），保证结果质量不因分级而下降。
+3.  统计各用途、各模型的调用次数与升级次数，便于评估分级带来的延迟与成本收益。
+
+环境变量:
+    LLM_FAST_MODEL (默认 deepseek-ai/DeepSeek-V3)、LLM_REASONING_MODEL (默认 deepseek-ai/DeepSeek-R1)、
+    LLM_MODEL_EXTRACTION / LLM_MODEL_OPTIMIZATION / LLM_MODEL_CRITIQUE / LLM_MODEL_SCORING (单独指定某一用途的模型)、
+    MODEL_ROUTING_ENABLED (默认开启；关闭后所有调用使用推理模型)
+"""
+from typing import Any, Dict, Iterable, Optional
+import json
+import os
+import threading
+
+from .logging_utils import get_logger
+from .transport import DEFAULT_MODEL
+
+logger = get_logger(__name__)
+
+PURPOSE_EXTRACTION = "extraction"
+PURPOSE_OPTIMIZATION = "optimization"
+PURPOSE_CRITIQUE = "critique"
+PURPOSE_SCORING = "scoring"
+
+FAST_MODEL = "deepseek-ai/DeepSeek-V3"
+REASONING_MODEL = DEFAULT_MODEL
+
+# 默认路由：用途 -> 模型档位
+DEFAULT_TIERS = {
+    PURPOSE_EXTRACTION: "fast",
+    PURPOSE_OPTIMIZATION: "fast",
+    PURPOSE_CRITIQUE: "reasoning",
+    PURPOSE_SCORING: "reasoning",
+}
+
+
+def validate_json_fields(content: Optional[str], fields: Iterable[str]) -> bool:
+    """检查LLM输出是否为JSON对象，且给定字段都存在并且是列表"""
+    if not content:
+        return False
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return isinstance(data, dict) and all(isinstance(data.get(field), list) for field in fields)
+
+
+class ModelRouter:
+    def __init__(self, routes: Dict[str, str] = None, escalation_model: str = REASONING_MODEL):
+        """
+        Args:
+            routes: 用途 -> 模型名；未配置的用途由调用方使用自己的默认模型
+            escalation_model: 校验失败时升级使用的模型
+        """
+        self.routes = dict(routes or {})
+        self.escalation_model = escalation_model
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Dict[str, int]] = {}
+        self._escalations: Dict[str, int] = {}
+
+    def model_for(self, purpose: str, default: str) -> str:
+        return self.routes.get(purpose) or default
+
+    def escalation_for(self, model: str) -> Optional[str]:
+        """model的输出校验失败时应升级到的模型；已是升级模型时返回None"""
+        if not self.escalation_model or model == self.escalation_model:
+            return None
+        return self.escalation_model
+
+    def record_call(self, purpose: str, model: str):
+        with self._lock:
+            by_model = self._calls.setdefault(purpose or "other", {})
+            by_model[model] = by_model.get(model, 0) + 1
+
+    def record_escalation(self, purpose: str, model: str, escalated_to: str):
+        logger.info("--> %s 使用 %s 的输出未通过校验，升级到 %s 重试", purpose, model, escalated_to)
+        with self._lock:
+            self._escalations[purpose or "other"] = self._escalations.get(purpose or "other", 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "routes": dict(self.routes),
+                "calls": {purpose: dict(by_model) for purpose, by_model in self._calls.items()},
+                "escalations": dict(self._escalations),
+            }
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """获取进程级共享的模型路由，配置从环境变量读取"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            fast_model = os.getenv("LLM_FAST_MODEL", FAST_MODEL)
+            reasoning_model = os.getenv("LLM_REASONING_MODEL", REASONING_MODEL)
+            routes = {}
+            if os.getenv("MODEL_ROUTING_ENABLED", "true").lower() not in ("0", "false", "no"):
+                tiers = {"fast": fast_model, "reasoning": reasoning_model}
+                routes = {purpose: tiers[tier] for purpose, tier in DEFAULT_TIERS.items()}
+            for purpose in DEFAULT_TIERS:
+                override = os.getenv(f"LLM_MODEL_{purpose.upper()}")
+                if override:
+                    routes[purpose] = override
+            _router = ModelRouter(routes, escalation_model=reasoning_model)
+        return _router
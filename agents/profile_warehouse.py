@@ -0,0 +1,265 @@
+"""
+画像库 (ProfileWarehouse)
+
+职责:
+1.  跨会话保存讨论收敛后的教育画像（专业）与行业画像（岗位），存放在本地SQLite中，
+    以 (画像类型, 规范化名称) 为键，记录更新时间、是否收敛与讨论轮数。
+2.  分析师在基础模式下先查询画像库，按新鲜度策略决定是否复用：
+    - 新鲜（fresh）：直接返回，不再搜索与调用LLM；
+    - 陈旧（stale）：先返回已有画像；未收敛的画像同时在后台重新执行基础分析刷新，
+      已收敛的画像保持原样，由使用它的讨论重新走完整流程后再覆盖；
+    - 过期（expired）或不存在：返回None，由分析师重新分析。
+3.  新鲜度策略按画像类型分别配置：专业课程变化较慢，岗位需求变化较快。
+4.  后台刷新在独立线程池中以批处理优先级执行，同一画像同时只刷新一次；刷新结果不标记为已收敛。
+5.  带 degraded 标记（占位、错误恢复）或 error 字段的报告不保存；已收敛的画像不会被未收敛的内容覆盖。
+
+环境变量:
+    PROFILE_WAREHOUSE_ENABLED (默认开启)、PROFILE_WAREHOUSE_PATH (默认 .cache/profile_warehouse.sqlite)、
+    PROFILE_FRESH_DAYS_EDUCATION / PROFILE_MAX_AGE_DAYS_EDUCATION (默认30 / 180天)、
+    PROFILE_FRESH_DAYS_INDUSTRY / PROFILE_MAX_AGE_DAYS_INDUSTRY (默认7 / 60天)、
+    PROFILE_REFRESH_WORKERS (后台刷新线程数，默认2)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import normalize_query
+from .llm_scheduler import PRIORITY_BATCH, use_priority
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_WAREHOUSE_PATH = os.path.join(".cache", "profile_warehouse.sqlite")
+DAY_SECONDS = 24 * 3600
+
+PROFILE_EDUCATION = "education"
+PROFILE_INDUSTRY = "industry"
+
+STATUS_FRESH = "fresh"
+STATUS_STALE = "stale"
+STATUS_EXPIRED = "expired"
+
+# 报告中由画像库添加的元信息字段，保存时去除
+META_FIELD = "warehouse"
+
+
+def normalize_profile_name(name: str) -> str:
+    """画像键：统一全角/半角、大小写并压缩空白"""
+    return normalize_query(name or "")
+
+
+class StalenessPolicy:
+    """按画像年龄划分新鲜、陈旧与过期"""
+
+    def __init__(self, fresh_days: float, max_age_days: float):
+        self.fresh_seconds = fresh_days * DAY_SECONDS
+        self.max_age_seconds = max(max_age_days, fresh_days) * DAY_SECONDS
+
+    def classify(self, age_seconds: float) -> str:
+        if age_seconds <= self.fresh_seconds:
+            return STATUS_FRESH
+        if age_seconds <= self.max_age_seconds:
+            return STATUS_STALE
+        return STATUS_EXPIRED
+
+
+DEFAULT_POLICIES: Dict[str, StalenessPolicy] = {
+    PROFILE_EDUCATION: StalenessPolicy(fresh_days=30, max_age_days=180),
+    PROFILE_INDUSTRY: StalenessPolicy(fresh_days=7, max_age_days=60),
+}
+
+
+class ProfileWarehouse:
+    def __init__(self, path: str = DEFAULT_WAREHOUSE_PATH, policies: Dict[str, StalenessPolicy] = None,
+                 refresh_workers: int = 2):
+        """
+        Args:
+            path: SQLite文件路径
+            policies: 画像类型 -> 新鲜度策略，默认DEFAULT_POLICIES
+            refresh_workers: 后台刷新的线程数
+        """
+        self.path = path
+        self.policies = dict(DEFAULT_POLICIES, **(policies or {}))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    report TEXT NOT NULL,
+                    converged INTEGER NOT NULL,
+                    rounds INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+                """
+            )
+            self._conn.commit()
+
+        self._refresh_pool = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="profile-refresh")
+        self._refreshing = set()
+        self.counts = {STATUS_FRESH: 0, STATUS_STALE: 0, STATUS_EXPIRED: 0, "miss": 0, "refreshed": 0, "saved": 0}
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    # --- 读取 ---
+    def lookup(self, kind: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        查询画像，不区分新鲜度
+
+        Returns:
+            dict: {"report", "name", "converged", "rounds", "updated_at", "age_seconds", "status"}，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, report, converged, rounds, updated_at FROM profiles WHERE kind = ? AND key = ?",
+                (kind, normalize_profile_name(name))
+            ).fetchone()
+        if row is None:
+            return None
+        stored_name, report, converged, rounds, updated_at = row
+        age_seconds = max(time.time() - updated_at, 0.0)
+        return {
+            "report": json.loads(report),
+            "name": stored_name,
+            "converged": bool(converged),
+            "rounds": rounds,
+            "updated_at": updated_at,
+            "age_seconds": round(age_seconds, 1),
+            "status": self.policies[kind].classify(age_seconds),
+        }
+
+    def get(self, kind: str, name: str, refresh: Optional[Callable[[], Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        按新鲜度策略查询画像：新鲜或陈旧时返回记录（陈旧的未收敛画像提交后台刷新），过期或不存在时返回None
+
+        Args:
+            refresh: 重新生成画像的函数，返回新的报告；为None时陈旧画像不刷新
+        """
+        record = self.lookup(kind, name)
+        if record is None:
+            self._count("miss")
+            return None
+        self._count(record["status"])
+        if record["status"] == STATUS_EXPIRED:
+            logger.info("--> %s画像 %s 已过期（%.1f 天），重新分析", kind, name, record["age_seconds"] / DAY_SECONDS)
+            return None
+        if record["status"] == STATUS_STALE and refresh is not None:
+            if record["converged"]:
+                # 基础分析只能得到未收敛的初稿，不能替代讨论收敛后的画像
+                logger.info("--> %s画像 %s 已陈旧，需要完整讨论后刷新", kind, name)
+            else:
+                self.refresh(kind, name, refresh)
+        return record
+
+    # --- 写入 ---
+    def put(self, kind: str, name: str, report: Dict[str, Any], converged: bool = False, rounds: int = 0):
+        """
+        保存（覆盖）画像
+
+        Returns:
+            bool: 是否已保存；含error字段或degraded标记的报告不保存，已收敛的画像不会被未收敛的内容覆盖
+        """
+        if not isinstance(report, dict) or report.get("error") or report.get("degraded"):
+            return False
+        key = normalize_profile_name(name)
+        report = {field: value for field, value in report.items() if field != META_FIELD}
+        payload = json.dumps(report, ensure_ascii=False, default=str)
+        with self._lock:
+            if not converged:
+                row = self._conn.execute(
+                    "SELECT converged FROM profiles WHERE kind = ? AND key = ?", (kind, key)
+                ).fetchone()
+                if row is not None and row[0]:
+                    logger.debug("--> %s画像 %s 已收敛，不以未收敛的内容覆盖", kind, name)
+                    return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (kind, key, name, report, converged, rounds, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, key, name, payload, int(converged), rounds, time.time())
+            )
+            self._conn.commit()
+            self.counts["saved"] += 1
+        logger.debug("--> 已保存%s画像: %s（收敛: %s，轮数: %s）", kind, name, converged, rounds)
+        return True
+
+    def invalidate(self, kind: str, name: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM profiles WHERE kind = ? AND key = ?", (kind, normalize_profile_name(name)))
+            self._conn.commit()
+
+    # --- 后台刷新 ---
+    def refresh(self, kind: str, name: str, func: Callable[[], Dict[str, Any]]) -> bool:
+        """提交后台刷新；同一画像已在刷新中时返回False"""
+        key = (kind, normalize_profile_name(name))
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+        logger.info("--> %s画像 %s 已陈旧，后台刷新中", kind, name)
+        self._refresh_pool.submit(self._refresh, key, kind, name, func)
+        return True
+
+    def _refresh(self, key, kind: str, name: str, func: Callable[[], Dict[str, Any]]):
+        try:
+            # 后台刷新让位于交互式分析
+            with use_priority(PRIORITY_BATCH):
+                report = func()
+            if self.put(kind, name, report):
+                self._count("refreshed")
+            else:
+                logger.warning("--> %s画像 %s 刷新结果未保存: %s", kind, name,
+                               (report or {}).get("error") or (report or {}).get("analysis_source"))
+        except Exception as e:
+            logger.warning("--> %s画像 %s 刷新出错: %s", kind, name, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """各类型画像数量与查询、刷新统计"""
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, COUNT(*) FROM profiles GROUP BY kind").fetchall()
+            return {
+                "profiles": dict(rows),
+                "refreshing": len(self._refreshing),
+                **self.counts,
+            }
+
+
+_warehouse: Optional[ProfileWarehouse] = None
+_warehouse_lock = threading.Lock()
+
+
+def get_profile_warehouse() -> Optional[ProfileWarehouse]:
+    """获取进程级共享的画像库，配置从环境变量读取；关闭时返回None"""
+    global _warehouse
+    if os.getenv("PROFILE_WAREHOUSE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    with _warehouse_lock:
+        if _warehouse is None:
+            policies = {}
+            for kind, policy in DEFAULT_POLICIES.items():
+                fresh_days = float(os.getenv(f"PROFILE_FRESH_DAYS_{kind.upper()}", policy.fresh_seconds / DAY_SECONDS))
+                max_age_days = float(os.getenv(f"PROFILE_MAX_AGE_DAYS_{kind.upper()}", policy.max_age_seconds / DAY_SECONDS))
+                policies[kind] = StalenessPolicy(fresh_days, max_age_days)
+            _warehouse = ProfileWarehouse(
+                path=os.getenv("PROFILE_WAREHOUSE_PATH", DEFAULT_WAREHOUSE_PATH),
+                policies=policies,
+                refresh_workers=int(os.getenv("PROFILE_REFRESH_WORKERS", "2")),
+            )
+        return _warehouse
@@ -8,143 +8,151 @@
 4.  实现"发言-批判-修正"的协作范式，通过迭代循环提升分析质量。
 5.  整合最终达成共识的分析结果，并移交给报告生成官。
 """
-from typing import TypedDict, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any
+import time
 
 from .education_analyst import EducationAnalyst
 from .industry_analyst import IndustryAnalyst
 from .data_insight_analyst import DataInsightAnalyst
-from .report_generator import ReportGenerator
-import json
-
-# --- 共享状态定义 ---
-class DiscussionState(TypedDict):
-    """
-    定义"虚拟圆桌会议"的共享讨论区状态
-    """
-    topic: str
-    discussion_log: List[Dict[str, Any]]
-    education_report: Dict[str, Any]
-    industry_report: Dict[str, Any]
-    data_insight_report: Dict[str, Any]
-    critique_and_questions: List[str]  # 保持向后兼容
-    education_questions: List[str]  # 新增：专门针对教育的问题
-    industry_questions: List[str]   # 新增：专门针对行业的问题
-    is_consensus_reached: bool
+from .round_executor import RoundExecutor
+from .jsonl_sink import JsonlSink
+from .discussion_engine import DiscussionConfig, DiscussionEngine, DiscussionState
+from .logging_utils import get_logger
 
+logger = get_logger(__name__)
 
 class ProjectCoordinator:
-    def __init__(self, openai_api_key: str):
+    def __init__(self, openai_api_key: str, round_timeout: float = None):
         """
         初始化协调官以及其管理的智能体团队
+
+        Args:
+            openai_api_key: OpenAI兼容接口的API Key
+            round_timeout: 每轮分析师并发执行的超时时间（秒），None表示不限制
         """
         self.education_analyst = EducationAnalyst(openai_api_key=openai_api_key, composio_api_key=None)
         self.industry_analyst = IndustryAnalyst(openai_api_key=openai_api_key, composio_api_key=None)
         # 注意: 数据洞察师在这里被赋予了"批判者"的新角色
         self.critic_analyst = DataInsightAnalyst(openai_api_key=openai_api_key) 
-        print("项目协调官已就位，并召集了教育、行业及批判分析师团队。")
+        # 教育与行业分析师互不依赖，每轮并发执行
+        self.round_executor = RoundExecutor(max_workers=2)
+        self.round_timeout = round_timeout
+        # "发言-批判-修正"循环统一由讨论引擎执行
+        self.engine = DiscussionEngine(
+            self.education_analyst, self.industry_analyst, self.critic_analyst, executor=self.round_executor
+        )
+        logger.info("项目协调官已就位，并召集了教育、行业及批判分析师团队。")
+
+    def set_stream_callback(self, callback):
+        """为团队中所有智能体设置流式输出回调，None表示关闭流式输出"""
+        for agent in (self.education_analyst, self.industry_analyst, self.critic_analyst):
+            agent.stream_callback = callback
 
-    def _log_discussion(self, state: DiscussionState, speaker: str, content: Any):
-        """记录一条讨论到日志中"""
-        state["discussion_log"].append({"speaker": speaker, "content": content})
+    def critique_reports(self, state: DiscussionState, previous_reports: Dict[str, Any] = None,
+                         previous_critique: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        调用批判者审查当前报告；后续轮次只发送与上次批判时相比的变化
+
+        Args:
+            state: 讨论区状态
+            previous_reports: 上次批判时的报告（各报告的 ReportVersion，或 snapshot_reports() 的结果），None表示首次批判
+            previous_critique: 上次的批判结果
+        """
+        return self.engine.critique(state, previous_reports, previous_critique)
 
     def run_analysis_discussion(self, major: str, job_title: str, max_rounds: int = 5) -> Dict[str, Any]:
         """
         主持并执行"虚拟圆桌会议"的完整流程
         """
-        # 1. 初始化会议状态
-        state: DiscussionState = {
-            "topic": f"专业[{major}] vs 岗位[{job_title}]",
-            "discussion_log": [],
-            "education_report": {},
-            "industry_report": {},
-            "data_insight_report": {},
-            "critique_and_questions": [],
-            "education_questions": [],
-            "industry_questions": [],
-            "is_consensus_reached": False
-        }
-        self._log_discussion(state, "Coordinator", f"会议开始，议题: {state['topic']}")
-
-        for round_num in range(1, max_rounds + 1):
-            print(f"\n--- 开始第 {round_num}/{max_rounds} 轮讨论 ---")
-            self._log_discussion(state, "Coordinator", f"第 {round_num} 轮讨论开始")
-
-            # 2. 开场陈述 (或根据上一轮问题进行深化分析)
-            if round_num == 1:
-                # 第一轮，进行基础分析
-                print("第一轮：进行基础专业和岗位分析")
-                state["education_report"] = self.education_analyst.run(major)
-                state["industry_report"] = self.industry_analyst.run(job_title)
-            else:
-                # 后续轮次，基于批判问题优化现有报告
-                print(f"第 {round_num} 轮：基于分类批判问题优化分析报告")
-                
-                # 教育分析师使用教育相关问题进行优化
-                if state["education_questions"]:
-                    print(f"教育分析师正基于 {len(state['education_questions'])} 个教育专项问题优化报告")
-                    state["education_report"] = self.education_analyst.run(
-                        major, 
-                        questions=state["education_questions"],
-                        previous_report=state["education_report"]
-                    )
-                else:
-                    print("无教育专项问题，教育分析师保持当前报告")
-                
-                # 行业分析师使用行业相关问题进行优化
-                if state["industry_questions"]:
-                    print(f"行业分析师正基于 {len(state['industry_questions'])} 个行业专项问题优化报告")
-                    state["industry_report"] = self.industry_analyst.run(
-                        job_title, 
-                        questions=state["industry_questions"],
-                        previous_report=state["industry_report"]
-                    )
-                else:
-                    print("无行业专项问题，行业分析师保持当前报告")
-            
-            self._log_discussion(state, "EducationAnalyst", state["education_report"])
-            self._log_discussion(state, "IndustryAnalyst", state["industry_report"])
-
-            # 3. 自由辩论 (调用批判者提出问题)
-            critique_result = self.critic_analyst.run_critique(
-                state["education_report"],
-                state["industry_report"]
-            )
-            self._log_discussion(state, "CriticAnalyst", critique_result)
-            
-            # 提取分类的问题
-            state["education_questions"] = critique_result.get("education_questions", [])
-            state["industry_questions"] = critique_result.get("industry_questions", [])
-            state["critique_and_questions"] = critique_result.get("questions_for_next_round", [])  # 保持向后兼容
-
-            # 4. 判断是否达成共识
-            has_education_questions = bool(state["education_questions"])
-            has_industry_questions = bool(state["industry_questions"])
-            
-            if not has_education_questions and not has_industry_questions:
-                print("批判者未提出进一步问题，会议达成共识。")
-                self._log_discussion(state, "Coordinator", "无更多分类问题，达成共识。")
-                state["is_consensus_reached"] = True
-                break
-            
-            # 准备下一轮的分类问题
-            education_count = len(state["education_questions"])
-            industry_count = len(state["industry_questions"])
-            print(f"批判者提出分类问题 - 教育: {education_count}个, 行业: {industry_count}个")
-            self._log_discussion(state, "Coordinator", 
-                f"发现分类问题 - 教育: {education_count}个, 行业: {industry_count}个。准备下一轮讨论。")
-
-        if not state["is_consensus_reached"]:
-            print("\n会议达到最大轮次，结束讨论。")
-            self._log_discussion(state, "Coordinator", "达到最大讨论轮次，结束。")
-
-        # 5. 最终总结陈词：无论如何，都在最后进行一次量化分析
-        print("正在进行最终的量化匹配分析...")
-        final_analysis = self.critic_analyst.run(
-            state["education_report"], 
-            state["industry_report"]
+        config = DiscussionConfig(
+            max_rounds=max_rounds,
+            analyze_timeout=self.round_timeout,
+            optimize_timeout=self.round_timeout
         )
-        state["data_insight_report"] = final_analysis
-        self._log_discussion(state, "Coordinator", {"consensus_summary": final_analysis})
+        return self.engine.run(major, job_title, config)
+
+    def run_batch_matrix(self, majors: List[str], jobs: List[str], output_path: str, max_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        批量矩阵模式：分析 N 个专业 × M 个岗位的全部组合
 
-        # 6. 返回最终的、经过多轮讨论的状态
-        return state
+        每个专业画像和岗位画像只计算一次，随后按组合并发执行批判与最终量化分析，
+        每完成一个组合就立即追加写入输出JSONL文件。
+
+        Args:
+            majors: 专业名称列表
+            jobs: 岗位名称列表
+            output_path: 结果输出的JSONL文件路径
+            max_workers: 最大并发数
+
+        Returns:
+            list: 每个组合的得分摘要
+        """
+        majors = list(dict.fromkeys(majors))
+        jobs = list(dict.fromkeys(jobs))
+        logger.info("批量矩阵模式：%s 个专业 × %s 个岗位，共 %s 个组合", len(majors), len(jobs), len(majors) * len(jobs))
+
+        # 1. 每个实体只做一次基础分析
+        education_profiles: Dict[str, Dict[str, Any]] = {}
+        industry_profiles: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="profile") as pool:
+            futures = {}
+            for major in majors:
+                futures[pool.submit(self.education_analyst.run, major)] = ("education", major)
+            for job in jobs:
+                futures[pool.submit(self.industry_analyst.run, job)] = ("industry", job)
+
+            for future in as_completed(futures):
+                kind, name = futures[future]
+                try:
+                    report = future.result()
+                except Exception as e:
+                    logger.warning("--> %s 画像分析失败: %s", name, e)
+                    name_field = "major_name" if kind == "education" else "job_title"
+                    report = {name_field: name, "error": str(e)}
+                if kind == "education":
+                    education_profiles[name] = report
+                else:
+                    industry_profiles[name] = report
+
+        # 2. 按组合并发执行批判与量化分析，完成一个写入一个
+        sink = JsonlSink(output_path)
+        summaries = []
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pair") as pool:
+            futures = {
+                pool.submit(self._analyze_pair, education_profiles[major], industry_profiles[job]): (major, job)
+                for major in majors
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                major, job = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:
+                    logger.warning("--> 组合 %s × %s 分析失败: %s", major, job, e)
+                    record = {"major": major, "job_title": job, "error": str(e)}
+                sink.append(record)
+                summaries.append({
+                    "major": major,
+                    "job_title": job,
+                    "match_score_percent": record.get("data_insight_report", {}).get("match_score_percent"),
+                    "error": record.get("error"),
+                })
+                logger.info("--> 已完成 %s/%s 个组合: %s × %s", len(summaries), len(futures), major, job)
+
+        return summaries
+
+    def _analyze_pair(self, education_report: Dict[str, Any], industry_report: Dict[str, Any]) -> Dict[str, Any]:
+        """对单个专业-岗位组合执行批判和最终量化分析"""
+        start_time = time.monotonic()
+        critique_result = self.critic_analyst.run_critique(education_report, industry_report)
+        final_analysis = self.critic_analyst.run(education_report, industry_report)
+        return {
+            "major": education_report.get("major_name"),
+            "job_title": industry_report.get("job_title"),
+            "education_report": education_report,
+            "industry_report": industry_report,
+            "critique": critique_result,
+            "data_insight_report": final_analysis,
+            "elapsed_seconds": round(time.monotonic() - start_time, 2),
+        }
@@ -0,0 +1,151 @@
+"""
+Prompt组装 (PromptBuilder)
+
+职责:
+1.  按阶段只选取需要的报告字段（STAGE_FIELDS），不再把整份报告或Python列表的repr直接插入Prompt。
+2.  列表字段规范化去重（忽略大小写、全角/半角与多余空白），以紧凑的 "; " 分隔文本输出。
+3.  按本地Token估算把所有片段压缩到预算以内：先按字段条目上限截断，再从占用最多的片段开始逐步裁剪，
+    被省略的条目以 "(+N more)" 标出。无论讨论进行多少轮，每次LLM调用的输入规模都有上界。
+
+环境变量:
+    PROMPT_TOKEN_BUDGET (每次调用中可变内容的Token预算，默认3000)
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import os
+
+from .logging_utils import get_logger
+from .skill_matcher import normalize_skill
+from .telemetry import estimate_tokens
+
+logger = get_logger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+
+# 各阶段需要的报告字段 -> 条目上限
+STAGE_FIELDS: Dict[str, Dict[str, int]] = {
+    "education_optimization": {"core_courses": 30, "required_skills": 40},
+    "industry_optimization": {"required_skills": 40, "responsibilities": 20, "market_trends": 10, "career_growth": 10},
+    "critique_education": {"required_skills": 40, "core_courses": 30},
+    "critique_industry": {"required_skills": 40, "responsibilities": 20, "market_trends": 10, "career_growth": 10},
+}
+
+# 每次裁剪保留的比例
+_SHRINK_RATIO = 0.75
+_TRUNCATED_MARK = " …(truncated)"
+
+
+def _item_text(item: Any) -> str:
+    """列表元素可能是字符串或字典，字典输出为紧凑JSON"""
+    if isinstance(item, str):
+        return " ".join(item.split())
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+
+
+def dedupe_items(items: Iterable[Any]) -> List[str]:
+    """规范化后去重，保留首次出现的写法与顺序，丢弃空条目"""
+    seen = set()
+    result = []
+    for item in items or []:
+        text = _item_text(item)
+        key = normalize_skill(text)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(text)
+    return result
+
+
+def format_items(items: List[str], omitted: int = 0) -> str:
+    """列表输出为 "a; b; c (+N more)"，空列表输出 "(none)" """
+    if not items:
+        return f"(+{omitted} more)" if omitted else "(none)"
+    text = "; ".join(items)
+    return f"{text} (+{omitted} more)" if omitted else text
+
+
+class _Section:
+    __slots__ = ("name", "items", "text", "total", "keep", "minimum")
+
+    def __init__(self, name: str, items: Optional[List[str]] = None, text: Optional[str] = None,
+                 keep: int = 0, minimum: int = 0):
+        self.name = name
+        self.items = items
+        self.text = text
+        # 列表：原始条目数与当前保留条目数；文本：原始字符数与当前保留字符数
+        self.total = len(items) if items is not None else len(text)
+        self.keep = min(keep, self.total)
+        self.minimum = minimum
+
+    def render(self) -> str:
+        if self.items is not None:
+            return format_items(self.items[:self.keep], len(self.items) - self.keep)
+        if self.keep < self.total:
+            return self.text[:self.keep] + _TRUNCATED_MARK
+        return self.text
+
+    def shrink(self) -> bool:
+        """按比例裁剪，已到下限时返回False"""
+        if self.keep <= self.minimum:
+            return False
+        self.keep = max(self.minimum, int(self.keep * _SHRINK_RATIO))
+        return True
+
+
+class PromptBuilder:
+    def __init__(self, token_budget: Optional[int] = None):
+        """
+        Args:
+            token_budget: 所有片段合计的Token上限，默认读取 PROMPT_TOKEN_BUDGET
+
+        用法:
+            fields = (PromptBuilder()
+                      .add_report(previous_report, "education_optimization")
+                      .add_text("context", additional_context)
+                      .build())
+            f"Core Courses: {fields['core_courses']}"
+        """
+        self.token_budget = token_budget or PROMPT_TOKEN_BUDGET
+        self._sections: List[_Section] = []
+
+    def add_list(self, name: str, items: Iterable[Any], max_items: Optional[int] = None,
+                 min_items: int = 3) -> "PromptBuilder":
+        """添加去重后的列表片段，最多保留max_items条，预算不足时最少保留min_items条"""
+        items = dedupe_items(items)
+        self._sections.append(_Section(name, items=items, keep=max_items or len(items), minimum=min_items))
+        return self
+
+    def add_text(self, name: str, text: str, min_chars: int = 200) -> "PromptBuilder":
+        """添加自由文本片段（如搜索结果），预算不足时从末尾截断，最少保留min_chars个字符"""
+        text = (text or "").strip()
+        self._sections.append(_Section(name, text=text, keep=len(text), minimum=min_chars))
+        return self
+
+    def add_report(self, report: Optional[Dict[str, Any]], stage: str, prefix: str = "") -> "PromptBuilder":
+        """按STAGE_FIELDS添加报告中该阶段需要的字段，片段名为 prefix + 字段名"""
+        report = report or {}
+        for field, max_items in STAGE_FIELDS[stage].items():
+            value = report.get(field)
+            self.add_list(prefix + field, value if isinstance(value, list) else [], max_items)
+        return self
+
+    def estimate(self) -> int:
+        """当前所有片段的Token估算"""
+        return sum(estimate_tokens(section.render()) for section in self._sections)
+
+    def build(self) -> Dict[str, str]:
+        """压缩到预算以内并返回 {片段名: 文本}"""
+        sizes = {section.name: estimate_tokens(section.render()) for section in self._sections}
+        original = sum(sizes.values())
+        total = original
+        while total > self.token_budget:
+            # 从占用最多且还能裁剪的片段开始
+            candidates = sorted(self._sections, key=lambda section: sizes[section.name], reverse=True)
+            section = next((section for section in candidates if section.shrink()), None)
+            if section is None:
+                break
+            total -= sizes[section.name]
+            sizes[section.name] = estimate_tokens(section.render())
+            total += sizes[section.name]
+        if total < original:
+            logger.debug("--> Prompt内容由约 %s Token压缩至 %s Token（预算 %s）", original, total, self.token_budget)
+        return {section.name: section.render() for section in self._sections}
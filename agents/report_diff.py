@@ -0,0 +1,88 @@
+"""
+报告差异比较 (report_diff)
+
+职责:
+1.  比较同一份分析报告在相邻两轮之间的变化，只输出真正发生变化的字段。
+2.  列表字段按元素给出新增/删除项，其余字段给出前后取值，供批判者做增量审查。
+3.  压缩上一轮的批判结果，作为增量批判的上下文。
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import copy
+
+from .prompt_builder import dedupe_items, format_items
+
+# 批判者关注的报告字段，只有这些字段的变化才需要重新审查
+CRITIQUE_FIELDS = {
+    "education_report": ("required_skills", "core_courses"),
+    "industry_report": ("required_skills", "responsibilities", "market_trends", "career_growth"),
+}
+
+
+def _as_key(item: Any) -> str:
+    """列表元素可能是字符串或字典，统一转换为可比较的键"""
+    return item if isinstance(item, str) else repr(item)
+
+
+def diff_report(previous: Optional[Dict[str, Any]], current: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    比较两版报告的指定字段
+
+    Returns:
+        dict: {字段名: {"added": [...], "removed": [...]}} 或 {字段名: {"before": ..., "after": ...}}，
+              没有变化时返回空字典
+    """
+    previous = previous or {}
+    delta = {}
+    for field in fields:
+        before = previous.get(field)
+        after = current.get(field)
+        if before == after:
+            continue
+        if isinstance(before, list) and isinstance(after, list):
+            before_keys = {_as_key(item) for item in before}
+            after_keys = {_as_key(item) for item in after}
+            added = [item for item in after if _as_key(item) not in before_keys]
+            removed = [item for item in before if _as_key(item) not in after_keys]
+            if added or removed:
+                delta[field] = {"added": added, "removed": removed}
+            # 只有顺序变化时不视为内容变化
+        else:
+            delta[field] = {"before": before, "after": after}
+    return delta
+
+
+def diff_critiqued_reports(previous_state: Optional[Dict[str, Any]], state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """按CRITIQUE_FIELDS比较上次批判时的报告与当前报告，返回 {"education_report": 差异, "industry_report": 差异}"""
+    previous_state = previous_state or {}
+    return {
+        report_key: diff_report(previous_state.get(report_key), state.get(report_key) or {}, fields)
+        for report_key, fields in CRITIQUE_FIELDS.items()
+    }
+
+
+def snapshot_reports(state: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """保存批判时的报告快照，供下一轮比较"""
+    return {report_key: copy.deepcopy(state.get(report_key) or {}) for report_key in CRITIQUE_FIELDS}
+
+
+def summarize_critique(critique: Dict[str, Any], max_questions: int = 3) -> Dict[str, Any]:
+    """压缩批判结果，只保留总结和每类前几个问题"""
+    return {
+        "critique_summary": critique.get("critique_summary", ""),
+        "education_questions": list(critique.get("education_questions", []))[:max_questions],
+        "industry_questions": list(critique.get("industry_questions", []))[:max_questions],
+    }
+
+
+def format_delta(delta: Dict[str, Any]) -> List[str]:
+    """将差异转换为Prompt中可读的逐行描述"""
+    lines = []
+    for field, change in delta.items():
+        if "added" in change:
+            if change["added"]:
+                lines.append(f"- {field} added: {format_items(dedupe_items(change['added']))}")
+            if change["removed"]:
+                lines.append(f"- {field} removed: {format_items(dedupe_items(change['removed']))}")
+        else:
+            lines.append(f"- {field} changed from {change['before']} to {change['after']}")
+    return lines
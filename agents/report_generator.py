@@ -1,15 +1,20 @@
 import json
 import textwrap
 
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
 class ReportGenerator:
     def __init__(self):
-        print("报告生成官已初始化。")
+        logger.info("报告生成官已初始化。")
 
     def run(self, analysis_result: dict) -> str:
         """
         将最终的分析结果整合成一份专业的报告
         """
-        print("正在生成最终分析报告...")
+        logger.info("正在生成最终分析报告...")
 
         if "error" in analysis_result:
             error_report = f"""
@@ -98,5 +103,5 @@ class ReportGenerator:
                 report_lines.append(f"- {highlight}")
             
         final_report = "\n".join(report_lines)
-        print("最终报告生成完毕。")
+        logger.info("最终报告生成完毕。")
         return final_report
@@ -0,0 +1,155 @@
+"""
+报告版本库 (ReportStore)
+
+职责:
+1.  为一次讨论中的教育、行业报告保存不可变的版本序列：每次提交生成只读的 ReportVersion，
+    列表字段冻结为tuple、字典冻结为只读映射，任何一方都无法修改已提交的版本。
+2.  按字段结构共享：与上一版本内容相同的字段直接复用上一版本的冻结对象，不再复制；
+    所有字段都未变化时不产生新版本。多轮讨论中保存全部版本的内存开销只与实际变化量相关。
+3.  提供低成本的版本差异：共享的字段按对象身份直接跳过，只对真正变化的字段计算新增/删除项，
+    输出格式与 report_diff.diff_report 一致，供增量批判与界面的变更展示使用。
+"""
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Union
+import threading
+
+from .logging_utils import get_logger
+from .report_diff import diff_report
+
+logger = get_logger(__name__)
+
+
+def freeze(value: Any) -> Any:
+    """递归冻结：list → tuple，dict → 只读映射，其余值原样返回"""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """freeze() 的逆操作，得到可修改、可JSON序列化的普通对象"""
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    return value
+
+
+class ReportVersion:
+    """一份报告的不可变版本"""
+    __slots__ = ("name", "number", "fields", "changed")
+
+    def __init__(self, name: str, number: int, fields: Mapping[str, Any], changed: FrozenSet[str]):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "number", number)
+        object.__setattr__(self, "fields", MappingProxyType(dict(fields)))
+        # 相对上一版本发生变化（含新增、删除）的字段
+        object.__setattr__(self, "changed", changed)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ReportVersion 不可修改")
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return self.fields.get(field, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为普通字典（会复制全部字段）"""
+        return thaw(self.fields)
+
+    def __repr__(self) -> str:
+        return f"ReportVersion({self.name!r}, v{self.number}, changed={sorted(self.changed)})"
+
+
+ReportLike = Union[ReportVersion, Mapping[str, Any], None]
+
+
+class ReportStore:
+    def __init__(self):
+        self._versions: Dict[str, List[ReportVersion]] = {}
+        self._lock = threading.Lock()
+        self.shared_fields = 0
+        self.copied_fields = 0
+
+    def commit(self, name: str, report: Mapping[str, Any]) -> ReportVersion:
+        """
+        提交报告的新内容
+
+        Returns:
+            ReportVersion: 新版本；内容与最新版本完全相同时返回最新版本本身
+        """
+        with self._lock:
+            history = self._versions.setdefault(name, [])
+            previous = history[-1].fields if history else {}
+            fields = {}
+            changed = set(previous) - set(report)
+            for key, value in report.items():
+                frozen = freeze(value)
+                if key in previous and previous[key] == frozen:
+                    # 内容相同，复用上一版本的冻结对象
+                    fields[key] = previous[key]
+                    self.shared_fields += 1
+                else:
+                    fields[key] = frozen
+                    changed.add(key)
+                    self.copied_fields += 1
+            if history and not changed:
+                return history[-1]
+            version = ReportVersion(name, len(history) + 1, fields, frozenset(changed))
+            history.append(version)
+        logger.debug("--> %s 报告提交第 %s 版，变化字段: %s", name, version.number, sorted(changed))
+        return version
+
+    def latest(self, name: str) -> Optional[ReportVersion]:
+        with self._lock:
+            history = self._versions.get(name)
+            return history[-1] if history else None
+
+    def get(self, name: str, number: int) -> Optional[ReportVersion]:
+        with self._lock:
+            history = self._versions.get(name, [])
+            return history[number - 1] if 0 < number <= len(history) else None
+
+    def history(self, name: str) -> List[ReportVersion]:
+        with self._lock:
+            return list(self._versions.get(name, []))
+
+    def snapshot(self) -> Dict[str, Optional[ReportVersion]]:
+        """所有报告的最新版本，保存快照无需复制任何内容"""
+        with self._lock:
+            return {name: history[-1] for name, history in self._versions.items()}
+
+    @staticmethod
+    def diff(old: ReportLike, new: ReportLike, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        比较两个版本（也接受普通字典）的指定字段，默认比较全部字段
+
+        Returns:
+            dict: 与 report_diff.diff_report 相同格式的差异，无变化时为空字典
+        """
+        if old is new:
+            return {}
+        old_fields = old.fields if isinstance(old, ReportVersion) else freeze(old or {})
+        new_fields = new.fields if isinstance(new, ReportVersion) else freeze(new or {})
+        if fields is None:
+            fields = list(dict.fromkeys([*old_fields, *new_fields]))
+        # 同一版本链中未变化的字段是同一个对象，无需逐项比较
+        changed = [field for field in fields
+                   if old_fields.get(field) is not new_fields.get(field) and old_fields.get(field) != new_fields.get(field)]
+        if not changed:
+            return {}
+        return diff_report(
+            {field: thaw(old_fields[field]) for field in changed if field in old_fields},
+            {field: thaw(new_fields[field]) for field in changed if field in new_fields},
+            changed,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """各报告的版本数与字段共享情况"""
+        with self._lock:
+            return {
+                "versions": {name: len(history) for name, history in self._versions.items()},
+                "shared_fields": self.shared_fields,
+                "copied_fields": self.copied_fields,
+            }
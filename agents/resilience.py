@@ -0,0 +1,389 @@
+"""
+弹性调用层 (Resilience)
+
+职责:
+1.  对OpenAI与Tavily调用中的瞬时错误（连接失败、超时、429、5xx）按带抖动的指数退避重试，
+    重试等待不会超过当前取消令牌的剩余时间。
+2.  为每个接入点维护熔断器：连续失败达到阈值后进入"打开"状态，后续调用立即失败（CircuitOpenError），
+    不再等待完整超时；冷却后放行少量探测请求，成功即恢复。
+3.  提供并发感知的自适应限流器（AIMD）：成功时缓慢提高并发上限，限流或超时时减半；
+    等待空位超过上限时直接拒绝（EndpointOverloaded），让过载时的调用快速降级而不是无限排队。
+
+环境变量:
+    RETRY_MAX_ATTEMPTS (默认3)、RETRY_BASE_DELAY_SECONDS (默认0.5)、RETRY_MAX_DELAY_SECONDS (默认8)、
+    CIRCUIT_FAILURE_THRESHOLD (默认5)、CIRCUIT_RECOVERY_SECONDS (默认30)、
+    LLM_MAX_CONCURRENCY (默认16)、SEARCH_MAX_CONCURRENCY (默认16)、LIMITER_MAX_WAIT_SECONDS (默认30)
+"""
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+
+import httpx
+import openai
+import requests
+import tavily.errors
+
+from .cancellation import OperationCancelled, current_token
+from .logging_utils import get_logger
+from .telemetry import current_span
+
+logger = get_logger(__name__)
+
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+# 表示服务端过载、需要降低并发的状态码
+OVERLOAD_STATUS_CODES = {429, 503}
+TRANSIENT_ERRORS = (
+    openai.APIConnectionError,      # 包含 APITimeoutError
+    httpx.TransportError,
+    requests.ConnectionError,
+    requests.Timeout,
+    tavily.errors.TimeoutError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被立即拒绝"""
+
+
+class EndpointOverloaded(Exception):
+    """等待并发空位超时，调用被拒绝"""
+
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """从异常中取出HTTP状态码（openai、requests、模拟后端的异常均适用）"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """是否为值得重试的瞬时错误"""
+    if isinstance(error, (OperationCancelled, CircuitOpenError, EndpointOverloaded)):
+        return False
+    status = status_code_of(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def is_overload(error: BaseException) -> bool:
+    status = status_code_of(error)
+    if status is not None:
+        return status in OVERLOAD_STATUS_CODES
+    return isinstance(error, (openai.APITimeoutError, httpx.TimeoutException, requests.Timeout,
+                              tavily.errors.TimeoutError, TimeoutError))
+
+
+def _check_cancelled():
+    token = current_token()
+    if token is not None:
+        token.check()
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        """
+        Args:
+            max_attempts: 最多尝试次数（含第一次）
+            base_delay: 第一次重试的基准等待（秒），之后每次翻倍
+            max_delay: 单次等待上限（秒）
+        """
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """第attempt次失败后的等待时间：full jitter，即 [0, min(上限, 基准×2^(attempt-1))] 内均匀分布"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        Args:
+            failure_threshold: 连续瞬时失败多少次后打开
+            recovery_timeout: 打开后多久放行探测请求（秒）
+            half_open_max_calls: 半开状态下同时放行的探测请求数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def allow(self):
+        """检查是否放行本次调用，拒绝时抛出CircuitOpenError"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} 熔断中，{self.recovery_timeout:.0f}秒冷却期内直接失败")
+                self.state = self.HALF_OPEN
+                self._half_open_calls = 0
+                logger.info("--> 熔断器 %s 进入半开状态，放行探测请求", self.name)
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"{self.name} 正在探测恢复，暂不放行")
+                self._half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("--> 熔断器 %s 已恢复", self.name)
+            self.state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_ignored(self):
+        """调用因取消而中止，结果不能说明服务状态：只归还半开探测名额"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("--> 熔断器 %s 打开：连续失败 %s 次", self.name, self._failures)
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self._failures, "rejected": self.rejected}
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, name: str, max_limit: int = 16, min_limit: int = 1, initial_limit: Optional[int] = None,
+                 max_wait: float = 30.0):
+        """
+        Args:
+            max_limit / min_limit: 并发上限的调整范围
+            initial_limit: 初始并发上限，默认为max_limit
+            max_wait: 等待空位的最长时间（秒），超过后拒绝
+        """
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit or max_limit)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def _wait_time(self) -> float:
+        """等待时间不超过取消令牌的剩余时间"""
+        token = current_token()
+        remaining = token.remaining() if token is not None else None
+        return self.max_wait if remaining is None else min(self.max_wait, remaining)
+
+    def try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < math.floor(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self._wait_time()
+        with self._condition:
+            while self.in_flight >= math.floor(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise EndpointOverloaded(f"{self.name} 并发已满（上限 {math.floor(self.limit)}），请求被拒绝")
+                self._condition.wait(remaining)
+            self.in_flight += 1
+
+    async def aacquire(self):
+        deadline = time.monotonic() + self._wait_time()
+        while not self.try_acquire():
+            if time.monotonic() >= deadline:
+                with self._condition:
+                    self.rejected += 1
+                raise EndpointOverloaded(f"{self.name} 并发已满（上限 {math.floor(self.limit)}），请求被拒绝")
+            await asyncio.sleep(0.05)
+
+    def release(self, error: Optional[BaseException] = None):
+        """归还空位并按结果调整并发上限：成功加性增加，过载乘性减少"""
+        with self._condition:
+            self.in_flight -= 1
+            if error is None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif is_overload(error):
+                previous = math.floor(self.limit)
+                self.limit = max(self.min_limit, self.limit / 2)
+                if math.floor(self.limit) < previous:
+                    logger.warning("--> %s 出现过载信号，并发上限降至 %s", self.name, math.floor(self.limit))
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {"limit": math.floor(self.limit), "in_flight": self.in_flight, "rejected": self.rejected}
+
+
+class ResilientEndpoint:
+    """组合重试、熔断与限流，包装对同一接入点的所有调用"""
+
+    def __init__(self, name: str, retry: RetryPolicy = None, breaker: CircuitBreaker = None,
+                 limiter: AdaptiveConcurrencyLimiter = None):
+        self.name = name
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker(name)
+        self.limiter = limiter or AdaptiveConcurrencyLimiter(name)
+        self.retries = 0
+
+    def _record_outcome(self, error: Optional[BaseException]):
+        token = current_token()
+        if error is not None and (isinstance(error, OperationCancelled) or (token is not None and token.cancelled)):
+            self.breaker.record_ignored()
+        # 非瞬时错误（如400）说明服务端仍在正常响应，不计入熔断
+        elif error is None or not is_transient(error):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _next_delay(self, attempt: int, error: BaseException, retryable: Optional[Callable[[BaseException], bool]]) -> Optional[float]:
+        """返回重试前的等待时间；不应重试时返回None"""
+        if attempt >= self.retry.max_attempts or not is_transient(error):
+            return None
+        if retryable is not None and not retryable(error):
+            return None
+        delay = self.retry.delay(attempt)
+        token = current_token()
+        if token is not None:
+            remaining = token.remaining()
+            if token.cancelled or (remaining is not None and remaining <= delay):
+                return None
+        self.retries += 1
+        current_span().increment("retries")
+        logger.info("--> %s 调用失败（%s），%.2f 秒后进行第 %s 次重试", self.name, error, delay, attempt + 1)
+        return delay
+
+    def call(self, func: Callable[..., Any], *args, retryable: Optional[Callable[[BaseException], bool]] = None,
+             before_attempt: Optional[Callable[[], Any]] = None, **kwargs) -> Any:
+        """
+        同步执行调用
+
+        Args:
+            retryable: 额外的重试条件，如流式调用已输出内容时不再重试
+            before_attempt: 每次尝试在占用并发名额之前执行的回调（如向LLM调度器申请配额），
+                            其中的排队等待不会占住限流器的名额
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if before_attempt is not None:
+                before_attempt()
+            self.breaker.allow()
+            try:
+                self.limiter.acquire()
+            except BaseException:
+                # 未真正发起调用（限流拒绝或取消），归还半开探测名额
+                self.breaker.record_ignored()
+                raise
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.limiter.release(e)
+                self._record_outcome(e)
+                delay = self._next_delay(attempt, e, retryable)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                _check_cancelled()
+                continue
+            self.limiter.release()
+            self._record_outcome(None)
+            return result
+
+    async def acall(self, func: Callable[..., Any], *args, retryable: Optional[Callable[[BaseException], bool]] = None,
+                    before_attempt: Optional[Callable[[], Any]] = None, **kwargs) -> Any:
+        """call() 的协程版本，func 与 before_attempt 为协程函数"""
+        attempt = 0
+        while True:
+            attempt += 1
+            if before_attempt is not None:
+                await before_attempt()
+            self.breaker.allow()
+            try:
+                await self.limiter.aacquire()
+            except BaseException:
+                # 未真正发起调用（限流拒绝或取消），归还半开探测名额
+                self.breaker.record_ignored()
+                raise
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                self.limiter.release(e)
+                self._record_outcome(e)
+                delay = self._next_delay(attempt, e, retryable)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                _check_cancelled()
+                continue
+            self.limiter.release()
+            self._record_outcome(None)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"retries": self.retries, "breaker": self.breaker.stats(), "limiter": self.limiter.stats()}
+
+
+_endpoints: Dict[str, ResilientEndpoint] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(kind: str) -> ResilientEndpoint:
+    """获取进程级共享的接入点包装（"llm" 或 "search"），参数从环境变量读取"""
+    with _endpoints_lock:
+        endpoint = _endpoints.get(kind)
+        if endpoint is None:
+            endpoint = ResilientEndpoint(
+                kind,
+                retry=RetryPolicy(
+                    max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+                    base_delay=float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.5")),
+                    max_delay=float(os.getenv("RETRY_MAX_DELAY_SECONDS", "8")),
+                ),
+                breaker=CircuitBreaker(
+                    kind,
+                    failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+                    recovery_timeout=float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30")),
+                ),
+                limiter=AdaptiveConcurrencyLimiter(
+                    kind,
+                    max_limit=int(os.getenv(f"{kind.upper()}_MAX_CONCURRENCY", "16")),
+                    max_wait=float(os.getenv("LIMITER_MAX_WAIT_SECONDS", "30")),
+                ),
+            )
+            _endpoints[kind] = endpoint
+        return endpoint
+
+
+def endpoint_stats() -> Dict[str, Dict[str, Any]]:
+    """所有接入点的重试、熔断与限流统计"""
+    with _endpoints_lock:
+        endpoints = dict(_endpoints)
+    return {name: endpoint.stats() for name, endpoint in endpoints.items()}
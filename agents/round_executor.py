@@ -0,0 +1,77 @@
+"""
+轮次并发执行器 (RoundExecutor)
+
+职责:
+1.  在同一轮讨论中同时启动多个互不依赖的智能体任务（如教育分析师与行业分析师）。
+2.  等待所有任务完成或整体超时，并以统一格式返回每个任务的结果或错误信息。
+3.  超时的任务不会阻塞本轮的结果合并，调用方可以继续使用之前的报告。
+4.  等待期间可定期回调调用方（如刷新界面上的流式输出）。
+5.  超时的任务通过取消令牌通知智能体停止，不再继续占用连接和线程。
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+import time
+
+from .cancellation import CancellableExecutor, CancellationToken
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+
+class RoundTask:
+    """描述一轮中需要执行的单个智能体调用"""
+
+    def __init__(self, func: Callable[..., Any], *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+class RoundExecutor:
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        # 有界线程池在各轮之间复用，超时任务会在截止时间前后协作退出
+        self.executor = CancellableExecutor(max_workers=max_workers, name="round")
+
+    def run_round(self, tasks: Dict[str, RoundTask], timeout: Optional[float] = None,
+                  poll: Optional[Callable[[], None]] = None, poll_interval: float = 0.5) -> Dict[str, Tuple[Any, Optional[str]]]:
+        """
+        并发执行一轮中的所有任务
+
+        Args:
+            tasks: 任务名称到RoundTask的映射
+            timeout: 整轮的超时时间（秒），None表示一直等待
+            poll: 等待期间在调用线程中定期执行的回调
+            poll_interval: 回调间隔（秒）
+
+        Returns:
+            dict: 任务名称到 (结果, 错误信息) 的映射，成功时错误信息为None
+        """
+        if not tasks:
+            return {}
+
+        results: Dict[str, Tuple[Any, Optional[str]]] = {}
+        start_time = time.monotonic()
+
+        submitted = {}
+        for name, task in tasks.items():
+            future, token = self.executor.submit(
+                task.func, *task.args, token=CancellationToken(timeout, deferred=True), **task.kwargs
+            )
+            submitted[future] = (name, token)
+        done, not_done = self.executor.wait_all(submitted, timeout=timeout, poll=poll, poll_interval=poll_interval)
+
+        for future in done:
+            name, _ = submitted[future]
+            error = future.exception()
+            if error is not None:
+                results[name] = (None, f"执行出错: {str(error)}")
+            else:
+                results[name] = (future.result(), None)
+
+        for future in not_done:
+            name, token = submitted[future]
+            self.executor.cancel(future, token)
+            results[name] = (None, f"操作超时 ({timeout}秒)")
+
+        logger.debug("--> 本轮并发任务完成，耗时 %.1f 秒", time.monotonic() - start_time)
+        return results
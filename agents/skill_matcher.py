@@ -0,0 +1,190 @@
+"""
+本地技能匹配器 (SkillMatcher)
+
+职责:
+1.  使用字符n-gram哈希向量对技能名称进行本地嵌入，无需网络和模型下载。
+2.  用NumPy一次性计算行业技能 × 教育技能的余弦相似度矩阵，按阈值划分核心匹配、相关匹配和技能差距。
+3.  标记落在阈值附近的"临界"技能，只有这部分才需要交给LLM做语义判断。
+4.  n-gram相似度无法判断的情况同样标记为临界，而不是直接判为差距：
+    - 与所有教育技能都几乎没有共同n-gram，或存在书写系统不同的教育技能（如 "Machine Learning" 与 "机器学习"）；
+    - 与某个教育技能在技能词表中识别出相同或相关的概念（如 "算法设计" 与 "数据结构与算法"）。
+    识别出相同概念时，本地结果至少记为相关匹配。
+"""
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+import unicodedata
+import zlib
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .skill_vocabulary import SkillVocabulary
+
+
+def normalize_skill(text: str) -> str:
+    """规范化技能名称：统一全角/半角、大小写并压缩空白"""
+    normalized = unicodedata.normalize("NFKC", str(text)).lower()
+    return " ".join(normalized.split())
+
+
+def _has_cjk(text: str) -> bool:
+    return any("\u4e00" <= ch <= "\u9fff" for ch in text)
+
+
+class SkillMatcher:
+    def __init__(self, dim: int = 1024, ngram_range: tuple = (1, 3), core_threshold: float = 0.6,
+                 related_threshold: float = 0.3, borderline_margin: float = 0.05,
+                 vocabulary: Optional["SkillVocabulary"] = None, use_vocabulary: bool = True):
+        """
+        Args:
+            dim: 哈希向量维度
+            ngram_range: 字符n-gram的长度范围
+            core_threshold: 相似度不低于该值视为核心匹配
+            related_threshold: 相似度不低于该值视为相关匹配
+            borderline_margin: 与任一阈值相差不超过该值的技能视为临界技能；
+                               最高相似度不超过该值时视为没有n-gram证据，同样作为临界技能
+            vocabulary: 用于识别概念的技能词表，默认使用进程级共享词表
+            use_vocabulary: 是否结合词表概念判断匹配，关闭后只使用n-gram相似度
+        """
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.core_threshold = core_threshold
+        self.related_threshold = related_threshold
+        self.borderline_margin = borderline_margin
+        self.vocabulary = vocabulary
+        self.use_vocabulary = use_vocabulary
+
+    def _get_vocabulary(self) -> Optional["SkillVocabulary"]:
+        if not self.use_vocabulary:
+            return None
+        if self.vocabulary is None:
+            # skill_vocabulary 依赖本模块的 normalize_skill，这里延迟导入
+            from .skill_vocabulary import get_skill_vocabulary
+            self.vocabulary = get_skill_vocabulary()
+        return self.vocabulary
+
+    def _ngrams(self, text: str) -> List[str]:
+        padded = f" {normalize_skill(text)} "
+        grams = []
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            for i in range(len(padded) - n + 1):
+                gram = padded[i:i + n]
+                if gram.strip():
+                    grams.append(gram)
+        return grams
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """将文本列表嵌入为L2归一化的哈希向量矩阵"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram in self._ngrams(text):
+                # 使用crc32保证跨进程稳定的哈希，符号位降低哈希冲突的影响
+                h = zlib.crc32(gram.encode("utf-8"))
+                sign = 1.0 if (h >> 31) & 1 else -1.0
+                matrix[row, h % self.dim] += sign
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def similarity(self, industry_skills: List[str], education_skills: List[str]) -> np.ndarray:
+        """计算行业技能 × 教育技能的余弦相似度矩阵"""
+        if not industry_skills or not education_skills:
+            return np.zeros((len(industry_skills), len(education_skills)), dtype=np.float32)
+        return self.embed(industry_skills) @ self.embed(education_skills).T
+
+    def match(self, education_skills: List[str], industry_skills: List[str]) -> Dict[str, Any]:
+        """
+        对技能列表进行匹配分类
+
+        Returns:
+            dict: 与LLM输出格式一致的 core_skills_matched / related_skills_matched / skill_gaps，
+                  以及 borderline_skills（需要LLM复核的行业技能）和每个行业技能的匹配明细 details
+        """
+        core_matches = []
+        related_matches = []
+        skill_gaps = []
+        borderline_skills = []
+        details = []
+
+        sim = self.similarity(industry_skills, education_skills)
+        vocabulary = self._get_vocabulary()
+        education_concepts = [vocabulary.concepts_in(skill) for skill in education_skills] if vocabulary else []
+        education_scripts = {_has_cjk(normalize_skill(skill)) for skill in education_skills}
+        for i, industry_skill in enumerate(industry_skills):
+            if sim.shape[1] == 0:
+                best_index, best_score = None, 0.0
+            else:
+                best_index = int(np.argmax(sim[i]))
+                best_score = float(sim[i, best_index])
+            education_skill = education_skills[best_index] if best_index is not None else None
+            shared_index, related_concept = self._concept_match(vocabulary, industry_skill, education_concepts)
+            via = "ngram"
+
+            if best_score >= self.core_threshold:
+                label = "core"
+                core_matches.append(f"{education_skill} → {industry_skill}")
+            elif best_score >= self.related_threshold:
+                label = "related"
+                related_matches.append(f"{education_skill} ≈ {industry_skill}")
+            elif shared_index is not None:
+                # n-gram相似度低但包含相同的词表概念，至少视为相关匹配
+                label, via = "related", "vocabulary"
+                education_skill = education_skills[shared_index]
+                related_matches.append(f"{education_skill} ≈ {industry_skill}")
+            else:
+                label = "gap"
+                skill_gaps.append(industry_skill)
+
+            # n-gram无法判断的差距：没有共同n-gram证据，或没有任何同一书写系统的教育技能可供比较
+            unjudgeable = label == "gap" and (
+                best_score <= self.borderline_margin
+                or _has_cjk(normalize_skill(industry_skill)) not in education_scripts
+            )
+            is_borderline = (
+                abs(best_score - self.core_threshold) <= self.borderline_margin
+                or abs(best_score - self.related_threshold) <= self.borderline_margin
+                or (label != "core" and (shared_index is not None or related_concept))
+                or unjudgeable
+            )
+            if is_borderline:
+                borderline_skills.append(industry_skill)
+
+            details.append({
+                "industry_skill": industry_skill,
+                "education_skill": education_skill,
+                "score": round(best_score, 3),
+                "label": label,
+                "via": via,
+                "borderline": is_borderline,
+            })
+
+        return {
+            "core_skills_matched": core_matches,
+            "related_skills_matched": related_matches,
+            "skill_gaps": skill_gaps,
+            "borderline_skills": borderline_skills,
+            "details": details,
+        }
+
+    @staticmethod
+    def _concept_match(vocabulary: Optional["SkillVocabulary"], industry_skill: str,
+                       education_concepts: List[Set[str]]):
+        """
+        在词表中查找与行业技能共享概念的教育技能
+
+        Returns:
+            (共享相同概念的教育技能下标或None, 是否存在包含相关概念的教育技能)
+        """
+        if vocabulary is None:
+            return None, False
+        concepts = vocabulary.concepts_in(industry_skill)
+        if not concepts:
+            return None, False
+        related = set().union(*(vocabulary.related(concept_id) for concept_id in concepts))
+        has_related = False
+        for index, candidates in enumerate(education_concepts):
+            if concepts & candidates:
+                return index, True
+            if related & candidates:
+                has_related = True
+        return None, has_related
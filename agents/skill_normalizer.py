@@ -0,0 +1,135 @@
+"""
+技能列表规范化 (SkillNormalizer)
+
+职责:
+1.  在每次智能体调用之后整理报告中的列表字段（技能、课程、职责、趋势等），使其规模在多轮优化中保持平稳。
+2.  规范化：整段文本恰好是词表中的同义别名时替换为规范名称（如 "python" → "Python"、"编程" ↔ "programming"），
+    并去除空白与空条目。概念的成员（如 "MySQL"、"Spring"）保持原样，不会被改写为类别名称。
+3.  聚类近似重复项，每组只保留最先出现的写法：
+    - 两项识别出的词表概念完全相同，且除概念外没有其他内容（如 "Python编程" 与 "Python programming"）；
+      成员按自身名称区分，"MySQL" 与 "SQL"、"MySQL" 与 "PostgreSQL" 互不视为重复；
+    - 或两项的字符n-gram向量余弦相似度不低于阈值（如 "机器学习算法" 与 "机器学习 算法"）。
+4.  按字段限制条目数量（FIELD_LIMITS），超出部分截断。
+"""
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import json
+import re
+
+import numpy as np
+
+from .logging_utils import get_logger
+from .skill_matcher import SkillMatcher, normalize_skill
+from .skill_vocabulary import SkillVocabulary, get_skill_vocabulary
+
+logger = get_logger(__name__)
+
+# 报告类型 -> {列表字段: 条目上限}
+FIELD_LIMITS: Dict[str, Dict[str, int]] = {
+    "education": {"core_courses": 25, "required_skills": 30},
+    "industry": {"required_skills": 30, "responsibilities": 15, "market_trends": 10, "career_growth": 10},
+}
+
+# 去掉概念后剩余部分只包含这些字符时，认为该项完全由概念组成
+_FILLER = re.compile(r"[\W_]+")
+
+
+class SkillNormalizer:
+    def __init__(self, vocabulary: Optional[SkillVocabulary] = None, matcher: Optional[SkillMatcher] = None,
+                 similarity_threshold: float = 0.85, field_limits: Dict[str, Dict[str, int]] = None):
+        """
+        Args:
+            vocabulary: 技能词表，默认使用进程级共享词表
+            matcher: 提供字符n-gram嵌入的本地匹配器
+            similarity_threshold: 余弦相似度不低于该值的两项视为近似重复
+            field_limits: 各报告类型的字段条目上限，默认FIELD_LIMITS
+        """
+        self.vocabulary = vocabulary or get_skill_vocabulary()
+        self.matcher = matcher or SkillMatcher()
+        self.similarity_threshold = similarity_threshold
+        self.field_limits = field_limits or FIELD_LIMITS
+
+    def _canonicalize(self, item: str) -> str:
+        text = " ".join(item.split())
+        concept_id = self.vocabulary.lookup(text)
+        return self.vocabulary.canonical_name(concept_id) if concept_id else text
+
+    def _signature(self, text: str) -> Optional[FrozenSet[str]]:
+        """文本完全由词表概念组成时返回概念集合（成员以 概念ID:成员名称 区分），否则返回None"""
+        normalized = normalize_skill(text)
+        matches = self.vocabulary.concept_spans(text)
+        if not matches:
+            return None
+        covered = [False] * len(normalized)
+        for start, end, _ in matches:
+            for index in range(start, end):
+                covered[index] = True
+        residual = "".join(ch for ch, hit in zip(normalized, covered) if not hit)
+        if _FILLER.sub("", residual):
+            return None
+        return frozenset(
+            f"{value}:{normalized[start:end]}" if self.vocabulary.is_member(normalized[start:end]) else value
+            for start, end, value in matches
+        )
+
+    def normalize_list(self, items: List[Any], limit: Optional[int] = None) -> List[Any]:
+        """规范化、聚类去重并截断一个列表；非字符串条目按JSON内容精确去重"""
+        entries: List[Any] = []
+        seen = set()
+        for item in items or []:
+            if isinstance(item, str):
+                entry = self._canonicalize(item)
+                key = normalize_skill(entry)
+            else:
+                entry = item
+                key = json.dumps(item, ensure_ascii=False, sort_keys=True, default=str)
+            if key and key not in seen:
+                seen.add(key)
+                entries.append(entry)
+
+        # 保持原有顺序：LLM通常把最重要的条目放在前面
+        positions = [index for index, entry in enumerate(entries) if isinstance(entry, str)]
+        absorbed = {positions[i] for i in self._near_duplicates([entries[index] for index in positions])}
+        kept = [entry for index, entry in enumerate(entries) if index not in absorbed]
+        return kept[:limit] if limit is not None else kept
+
+    def _near_duplicates(self, texts: List[str]) -> List[int]:
+        """贪心聚类：按出现顺序，每项吸收其后与之近似重复的项，返回被吸收项的下标"""
+        if len(texts) < 2:
+            return []
+        vectors = self.matcher.embed(texts)
+        similarity = vectors @ vectors.T
+        signatures = [self._signature(text) for text in texts]
+        absorbed = np.zeros(len(texts), dtype=bool)
+        for i in range(len(texts)):
+            if absorbed[i]:
+                continue
+            for j in range(i + 1, len(texts)):
+                if absorbed[j]:
+                    continue
+                same_concepts = signatures[i] is not None and signatures[i] == signatures[j]
+                if same_concepts or similarity[i, j] >= self.similarity_threshold:
+                    absorbed[j] = True
+        return [int(index) for index in np.flatnonzero(absorbed)]
+
+    def normalize_report(self, kind: str, report: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Tuple[int, int]]]:
+        """
+        规范化一份报告的列表字段
+
+        Args:
+            kind: 报告类型，"education" 或 "industry"
+
+        Returns:
+            (新报告, {字段: (整理前条目数, 整理后条目数)})；原报告不会被修改
+        """
+        normalized = dict(report)
+        changes = {}
+        for field, limit in self.field_limits.get(kind, {}).items():
+            items = report.get(field)
+            if not isinstance(items, list):
+                continue
+            normalized[field] = self.normalize_list(items, limit)
+            if len(normalized[field]) != len(items):
+                changes[field] = (len(items), len(normalized[field]))
+        if changes:
+            logger.debug("--> 规范化%s报告: %s", kind, changes)
+        return normalized, changes
@@ -0,0 +1,172 @@
+"""
+技能词表索引 (SkillVocabulary)
+
+职责:
+1.  从数据文件加载规范化的中英文技能词表：每个概念包含规范名称、别名（同义词，如 编程 ↔ programming）、
+    成员（属于该概念的具体技术或子领域，如 SQL 下的 MySQL、后端开发下的 Spring）以及相关概念。
+    识别概念时别名与成员都会命中；只有别名可以被替换为规范名称。
+2.  将全部别名编译成Aho–Corasick自动机，对任意技能文本只需一次线性扫描即可识别其中出现的所有概念，
+    词表扩展到数千个词条也不会拖慢匹配。
+3.  为关键词匹配、技能列表规范化等环节提供统一的概念识别能力。
+"""
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from collections import deque
+import json
+import os
+import threading
+
+from .skill_matcher import normalize_skill
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(__file__), "data", "skill_vocabulary.json")
+
+
+def _is_word_char(ch: str) -> bool:
+    """ASCII字母数字视为单词字符，中文等字符之间不需要单词边界"""
+    return ch.isascii() and ch.isalnum()
+
+
+class AhoCorasick:
+    """多模式字符串匹配自动机"""
+
+    def __init__(self, whole_words: bool = True):
+        """
+        Args:
+            whole_words: 是否要求ASCII字母数字模式按完整单词匹配，避免 "ai" 命中 "maintain" 之类的误判
+        """
+        self.whole_words = whole_words
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, Any]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: Any):
+        """添加一个模式串及其关联值（需在build之前调用）"""
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((pattern, value))
+        self._built = False
+
+    def build(self):
+        """使用BFS构建失败指针"""
+        queue = deque()
+        for next_node in self._goto[0].values():
+            self._fail[next_node] = 0
+            queue.append(next_node)
+        while queue:
+            node = queue.popleft()
+            for ch, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(ch, 0)
+                self._output[next_node] = self._output[next_node] + self._output[self._fail[next_node]]
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """扫描文本，产出 (起始位置, 结束位置, 关联值)"""
+        if not self._built:
+            self.build()
+        node = 0
+        for index, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern, value in self._output[node]:
+                start = index - len(pattern) + 1
+                end = index + 1
+                if not self.whole_words:
+                    yield start, end, value
+                    continue
+                if _is_word_char(pattern[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(pattern[-1]) and end < len(text) and _is_word_char(text[end]):
+                    continue
+                yield start, end, value
+
+
+class SkillVocabulary:
+    def __init__(self, concepts: List[Dict[str, Any]]):
+        self.concepts: Dict[str, Dict[str, Any]] = {}
+        self.alias_index: Dict[str, str] = {}  # 规范化别名 -> 概念ID（倒排索引）
+        self.member_index: Dict[str, str] = {}  # 规范化成员名称 -> 概念ID
+        self._related: Dict[str, Set[str]] = {}
+        self._automaton = AhoCorasick()
+
+        for concept in concepts:
+            concept_id = concept["id"]
+            self.concepts[concept_id] = concept
+            self._related.setdefault(concept_id, set())
+            for alias in [concept.get("name", concept_id)] + list(concept.get("aliases", [])):
+                normalized = normalize_skill(alias)
+                if normalized and normalized not in self.alias_index:
+                    self.alias_index[normalized] = concept_id
+                    self._automaton.add(normalized, concept_id)
+            for member in concept.get("members", []):
+                normalized = normalize_skill(member)
+                if normalized and normalized not in self.alias_index and normalized not in self.member_index:
+                    self.member_index[normalized] = concept_id
+                    self._automaton.add(normalized, concept_id)
+
+        # 相关关系视为对称关系
+        for concept_id, concept in self.concepts.items():
+            for related_id in concept.get("related", []):
+                if related_id in self.concepts:
+                    self._related[concept_id].add(related_id)
+                    self._related[related_id].add(concept_id)
+
+        self._automaton.build()
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "SkillVocabulary":
+        """从JSON数据文件加载词表"""
+        path = path or DEFAULT_VOCABULARY_PATH
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("concepts", []))
+
+    def concepts_in(self, text: str) -> Set[str]:
+        """一次线性扫描，返回文本中出现的全部概念ID"""
+        return {value for _, _, value in self._automaton.iter_matches(normalize_skill(text))}
+
+    def concept_spans(self, text: str) -> List[Tuple[int, int, str]]:
+        """返回规范化后的文本中每个概念出现的位置 (起始, 结束, 概念ID)"""
+        return list(self._automaton.iter_matches(normalize_skill(text)))
+
+    def related(self, concept_id: str) -> Set[str]:
+        return self._related.get(concept_id, set())
+
+    def is_member(self, text: str) -> bool:
+        """文本是否为某个概念的成员（而非同义别名）"""
+        return normalize_skill(text) in self.member_index
+
+    def lookup(self, text: str) -> Optional[str]:
+        """整段文本恰好是某个别名（同义词）时返回对应的概念ID；成员名称不视为同义词"""
+        return self.alias_index.get(normalize_skill(text))
+
+    def canonical_name(self, concept_id: str) -> str:
+        concept = self.concepts[concept_id]
+        return concept.get("name", concept_id)
+
+
+_vocabulary: Optional[SkillVocabulary] = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_skill_vocabulary() -> SkillVocabulary:
+    """获取进程级共享的技能词表，路径可通过环境变量 SKILL_VOCABULARY_PATH 覆盖"""
+    global _vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is None:
+            _vocabulary = SkillVocabulary.load(os.getenv("SKILL_VOCABULARY_PATH"))
+        return _vocabulary
@@ -0,0 +1,70 @@
+"""
+流式输出事件 (StreamEvent / StreamBuffer)
+
+职责:
+1.  定义智能体在流式调用LLM时产生的进度事件（开始、推理片段、输出片段、完成、出错）。
+2.  提供线程安全的事件缓冲区：智能体在工作线程中写入，界面在主线程中定期取出并实时渲染。
+3.  记录每个智能体最近一次收到事件的时间，便于界面尽早发现卡住的请求，而不必等到整体超时。
+"""
+from typing import Dict, List, Optional
+import queue
+import threading
+import time
+
+# 事件类型
+STREAM_START = "start"          # 开始调用模型
+STREAM_REASONING = "reasoning"  # 推理模型的思考片段（如DeepSeek-R1的reasoning_content）
+STREAM_TOKEN = "token"          # 正式输出片段
+STREAM_CACHED = "cached"        # 命中响应缓存，未调用模型
+STREAM_DONE = "done"            # 流式输出结束
+STREAM_ERROR = "error"          # 调用出错
+
+
+class StreamEvent:
+    """智能体流式调用过程中的单个事件"""
+
+    def __init__(self, agent: str, kind: str, text: str = ""):
+        self.agent = agent
+        self.kind = kind
+        self.text = text
+        self.timestamp = time.monotonic()
+
+    def __repr__(self):
+        return f"StreamEvent({self.agent!r}, {self.kind!r}, {self.text[:20]!r})"
+
+
+class StreamBuffer:
+    """
+    线程安全的流式事件缓冲区，可直接作为智能体的 stream_callback 使用
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[StreamEvent]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._last_event: Dict[str, float] = {}
+        self._active: Dict[str, bool] = {}
+
+    def __call__(self, event: StreamEvent):
+        with self._lock:
+            self._last_event[event.agent] = event.timestamp
+            self._active[event.agent] = event.kind not in (STREAM_DONE, STREAM_ERROR, STREAM_CACHED)
+        self._queue.put(event)
+
+    def drain(self) -> List[StreamEvent]:
+        """取出当前缓冲的全部事件（不阻塞）"""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def stalled_agents(self, stall_seconds: float, now: Optional[float] = None) -> Dict[str, float]:
+        """返回仍在调用中、但超过stall_seconds没有新事件的智能体及其静默时长"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return {
+                agent: now - last
+                for agent, last in self._last_event.items()
+                if self._active.get(agent) and now - last >= stall_seconds
+            }
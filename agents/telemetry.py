@@ -0,0 +1,384 @@
+"""
+链路追踪与指标 (Telemetry)
+
+职责:
+1.  以Span记录每次Tavily搜索、LLM调用、JSON解析、评分步骤以及讨论的每一轮/每个阶段，
+    包含耗时、Token数、缓存命中、重试次数与请求/响应大小。
+2.  通过contextvars维护父子关系：讨论阶段内的所有调用自动成为该阶段Span的子Span，
+    并继承 round/stage 属性，从而能定位到底是哪个智能体、哪一轮占用了时间。
+3.  将已结束的Span汇总为指标，可导出为OpenTelemetry兼容的JSON（OTLP/JSON）或Prometheus文本格式，
+    并可通过本地HTTP端点（/metrics、/traces）提供给采集系统；其他模块可注册瞬时指标（如队列深度）一并导出。
+
+环境变量:
+    TELEMETRY_ENABLED (默认开启)、TELEMETRY_MAX_SPANS (保留的最近Span数量，默认5000)、
+    TELEMETRY_PORT (设置后由应用启动本地导出端点)
+"""
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+
+from .logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+SERVICE_NAME = "major-job-matcher"
+
+# 子Span自动继承的属性
+INHERITED_ATTRIBUTES = ("round", "stage")
+# 作为Prometheus标签的属性，取值范围有限，不会造成标签基数爆炸
+METRIC_LABELS = ("agent", "stage", "round")
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# 访问外部服务的Span，在OTel中标记为CLIENT类型
+CLIENT_SPANS = ("tavily.search", "llm.chat")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns",
+                 "_start_perf", "duration", "status", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = {}
+        if parent:
+            for key in INHERITED_ATTRIBUTES:
+                if key in parent.attributes:
+                    self.attributes[key] = parent.attributes[key]
+        self.attributes.update(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._start_perf = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "OK"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        """设置属性，值为None时忽略"""
+        if value is not None:
+            self.attributes[key] = value
+
+    def increment(self, key: str, amount: int = 1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, error: BaseException):
+        self.status = "ERROR"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start_perf
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+    def to_otel(self) -> Dict[str, Any]:
+        """转换为OTLP/JSON格式的Span"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 3 if self.name in CLIENT_SPANS else 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otel_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.status == "ERROR" else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """关闭追踪时使用的空Span"""
+    attributes: Dict[str, Any] = {}
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def increment(self, key: str, amount: int = 1):
+        pass
+
+    def fail(self, error: BaseException):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otel_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算Token数：中日韩字符约1个Token，其余字符约4个字符1个Token"""
+    cjk = sum(1 for char in text if "\u3000" <= char <= "\u9fff" or "\uff00" <= char <= "\uffef")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def payload_size(value: Any) -> int:
+    """JSON序列化后的字节数"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels) + "}"
+
+
+class Telemetry:
+    def __init__(self, enabled: bool = True, max_spans: int = 5000):
+        self.enabled = enabled
+        self._spans: deque = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # 指标：{(指标名, 标签): 值}；直方图单独保存桶计数
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple, Dict[str, Any]] = {}
+        # 瞬时指标：{指标名: (说明, 回调)}，导出时调用回调取当前值
+        self._gauges: Dict[str, Tuple[str, Callable[[], Dict[Tuple, float]]]] = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        记录一个Span；异常会标记在Span上并继续抛出
+
+        用法:
+            with telemetry.span("llm.chat", agent="EducationAnalyst") as span:
+                span.set_attribute("tokens.prompt", 120)
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = Span(name, parent=_current_span.get(), attributes=attributes)
+        reset = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current_span.reset(reset)
+            span.finish()
+            self._record(span)
+
+    def _record(self, span: Span):
+        attributes = span.attributes
+        labels = tuple(sorted(
+            [("span", span.name), ("status", span.status)]
+            + [(key, str(attributes[key])) for key in METRIC_LABELS if key in attributes]
+        ))
+        base_labels = tuple(item for item in labels if item[0] != "status")
+        with self._lock:
+            self._spans.append(span)
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = {"buckets": [0] * len(DURATION_BUCKETS), "sum": 0.0, "count": 0}
+                self._histograms[labels] = histogram
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += span.duration
+            histogram["count"] += 1
+
+            def add(metric: str, value: float, extra: Tuple = ()):
+                key = (metric, tuple(sorted(base_labels + extra)))
+                self._counters[key] = self._counters.get(key, 0) + value
+
+            if "tokens.prompt" in attributes:
+                add("agent_llm_tokens_total", attributes["tokens.prompt"], (("direction", "sent"),))
+            if "tokens.completion" in attributes:
+                add("agent_llm_tokens_total", attributes["tokens.completion"], (("direction", "received"),))
+            if "cache.hit" in attributes:
+                add("agent_cache_lookups_total", 1, (("result", "hit" if attributes["cache.hit"] else "miss"),))
+            if attributes.get("retries"):
+                add("agent_retries_total", attributes["retries"])
+            if "payload.request_bytes" in attributes:
+                add("agent_payload_bytes_total", attributes["payload.request_bytes"], (("direction", "request"),))
+            if "payload.response_bytes" in attributes:
+                add("agent_payload_bytes_total", attributes["payload.response_bytes"], (("direction", "response"),))
+
+    def register_gauge(self, metric: str, description: str, callback: Callable[[], Dict[Tuple, float]]):
+        """注册瞬时指标（如队列深度），callback返回 {标签元组: 当前值}，同名指标重复注册时以最后一次为准"""
+        with self._lock:
+            self._gauges[metric] = (description, callback)
+
+    # --- 查询与导出 ---
+    def spans(self, name: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        return [span for span in spans if name is None or span.name == name]
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+    def export_otel_json(self) -> Dict[str, Any]:
+        """导出为OTLP/JSON（ExportTraceServiceRequest）结构"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otel_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "agents.telemetry"},
+                    "spans": [span.to_otel() for span in self.spans()],
+                }],
+            }]
+        }
+
+    def export_prometheus(self) -> str:
+        """导出为Prometheus文本格式"""
+        with self._lock:
+            histograms = {labels: dict(value, buckets=list(value["buckets"])) for labels, value in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = [
+            "# HELP agent_span_duration_seconds Duration of agent operations (search, LLM, parse, scoring, stages).",
+            "# TYPE agent_span_duration_seconds histogram",
+        ]
+        for labels, histogram in sorted(histograms.items()):
+            for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                lines.append(f"agent_span_duration_seconds_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+            lines.append(f"agent_span_duration_seconds_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"agent_span_duration_seconds_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"agent_span_duration_seconds_count{_format_labels(labels)} {histogram['count']}")
+
+        help_text = {
+            "agent_llm_tokens_total": "LLM tokens sent and received.",
+            "agent_cache_lookups_total": "Search/LLM cache lookups by result.",
+            "agent_retries_total": "Retried backend calls.",
+            "agent_payload_bytes_total": "Request and response payload sizes in bytes.",
+        }
+        for metric, description in help_text.items():
+            series = sorted((labels, value) for (name, labels), value in counters.items() if name == metric)
+            if not series:
+                continue
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in series:
+                lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        for metric, (description, callback) in sorted(gauges.items()):
+            try:
+                series = sorted(callback().items())
+            except Exception as e:
+                logger.warning("--> 读取指标 %s 失败: %s", metric, e)
+                continue
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} gauge")
+            for labels, value in series:
+                lines.append(f"{metric}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, group_by: Tuple[str, ...] = ("name", "agent", "round")) -> List[Dict[str, Any]]:
+        """按Span名称与属性汇总耗时，按总耗时降序排列，用于快速定位瓶颈"""
+        groups: Dict[Tuple, Dict[str, Any]] = {}
+        for span in self.spans():
+            key = tuple(span.name if field == "name" else span.attributes.get(field) for field in group_by)
+            item = groups.setdefault(key, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            item["count"] += 1
+            item["total_seconds"] += span.duration
+            item["max_seconds"] = max(item["max_seconds"], span.duration)
+        rows = [dict(zip(group_by, key), **value) for key, value in groups.items()]
+        return sorted(rows, key=lambda row: row["total_seconds"], reverse=True)
+
+
+def current_span():
+    """当前上下文中的Span，不在任何Span内时返回空Span"""
+    return _current_span.get() or _NOOP_SPAN
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """获取进程级共享的Telemetry实例"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry(
+                enabled=os.getenv("TELEMETRY_ENABLED", "true").lower() not in ("0", "false", "no"),
+                max_spans=int(os.getenv("TELEMETRY_MAX_SPANS", "5000")),
+            )
+        return _telemetry
+
+
+# --- 本地导出端点 ---
+class _TelemetryRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        telemetry = self.server.telemetry
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/metrics":
+            body = telemetry.export_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/traces":
+            body = json.dumps(telemetry.export_otel_json(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TelemetryServer:
+    """在后台线程中提供 GET /metrics（Prometheus）与 GET /traces（OTLP/JSON）"""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", telemetry: Telemetry = None):
+        self._server = ThreadingHTTPServer((host, port), _TelemetryRequestHandler)
+        self._server.daemon_threads = True
+        self._server.telemetry = telemetry or get_telemetry()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="telemetry", daemon=True)
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "TelemetryServer":
+        self._thread.start()
+        logger.info("--> 指标端点已启动: %s/metrics, %s/traces", self.address, self.address)
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_telemetry_server_from_env() -> Optional[TelemetryServer]:
+    """设置了环境变量 TELEMETRY_PORT 时启动本地导出端点"""
+    port = os.getenv("TELEMETRY_PORT")
+    if not port:
+        return None
+    return TelemetryServer(int(port)).start()
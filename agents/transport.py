@@ -0,0 +1,152 @@
+"""
+共享网络传输层 (Transport)
+
+职责:
+1.  统一管理OpenAI兼容接口(SiliconFlow)与Tavily的接入点配置。
+2.  为所有智能体提供进程级共享的异步客户端，底层使用带连接池和keep-alive的HTTP传输，
+    使单个进程可以并发驱动大量分析任务，而不是每个智能体各自建立连接。
+3.  异步连接与事件循环绑定，因此按事件循环缓存客户端，循环结束后自动释放。
+4.  统一配置HTTP超时，所有请求都有明确的耗时上限。
+5.  同步客户端按API Key在进程内共享，新建智能体不再重复创建客户端和连接池。
+"""
+from typing import Dict, Optional
+import asyncio
+import os
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from tavily import AsyncTavilyClient, TavilyClient
+
+# --- 接入点与模型配置 ---
+# 可通过环境变量指向本地模拟服务（见 agents/mock_backend.py），实现离线运行与压测
+SILICONFLOW_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.siliconflow.cn/v1")
+TAVILY_API_BASE_URL = os.getenv("TAVILY_API_BASE_URL") or None
+DEFAULT_MODEL = "deepseek-ai/DeepSeek-R1"
+
+# --- 连接池配置 ---
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 60.0
+
+# --- 超时配置（秒） ---
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "30"))
+CONNECT_TIMEOUT_SECONDS = 10.0
+
+_lock = threading.Lock()
+# {缓存键: 同步客户端}，线程安全的客户端在所有线程间共享
+_sync_clients: Dict[tuple, object] = {}
+# 事件循环 -> {缓存键: 客户端}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, object]]" = weakref.WeakKeyDictionary()
+
+
+def _connection_limits() -> httpx.Limits:
+    """连接池大小与keep-alive设置"""
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def http_timeout(seconds: Optional[float] = None) -> httpx.Timeout:
+    """构建HTTP超时：总读写时间为seconds，建立连接不超过CONNECT_TIMEOUT_SECONDS"""
+    seconds = LLM_TIMEOUT_SECONDS if seconds is None else seconds
+    return httpx.Timeout(seconds, connect=min(CONNECT_TIMEOUT_SECONDS, seconds))
+
+
+def get_openai_client(api_key: str) -> OpenAI:
+    """获取进程级共享的同步OpenAI客户端，同一API Key的所有智能体复用同一个连接池"""
+    key = ("openai", api_key)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = OpenAI(
+                base_url=SILICONFLOW_BASE_URL,
+                api_key=api_key,
+                timeout=http_timeout(LLM_TIMEOUT_SECONDS),
+                # 重试由 resilience 统一处理，关闭SDK自带重试以免重复
+                max_retries=0,
+                http_client=DefaultHttpxClient(limits=_connection_limits(), timeout=http_timeout(LLM_TIMEOUT_SECONDS)),
+            )
+            _sync_clients[key] = client
+        return client
+
+
+def get_tavily_client(api_key: str) -> TavilyClient:
+    """获取进程级共享的同步TavilyClient客户端"""
+    key = ("tavily", api_key)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None:
+            client = TavilyClient(api_key=api_key, api_base_url=TAVILY_API_BASE_URL)
+            _sync_clients[key] = client
+        return client
+
+
+def _loop_clients() -> Dict[tuple, object]:
+    """获取当前事件循环对应的客户端缓存"""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.get(loop)
+        if clients is None:
+            clients = {}
+            _async_clients[loop] = clients
+        return clients
+
+
+def get_async_openai_client(api_key: str) -> AsyncOpenAI:
+    """
+    获取当前事件循环共享的AsyncOpenAI客户端
+
+    必须在协程中调用。同一事件循环、同一API Key的所有智能体复用同一个连接池。
+    """
+    clients = _loop_clients()
+    key = ("openai", api_key)
+    with _lock:
+        client = clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=SILICONFLOW_BASE_URL,
+                api_key=api_key,
+                timeout=http_timeout(LLM_TIMEOUT_SECONDS),
+                # 重试由 resilience 统一处理，关闭SDK自带重试以免重复
+                max_retries=0,
+                http_client=DefaultAsyncHttpxClient(limits=_connection_limits(), timeout=http_timeout(LLM_TIMEOUT_SECONDS)),
+            )
+            clients[key] = client
+        return client
+
+
+def get_async_tavily_client(api_key: str) -> AsyncTavilyClient:
+    """
+    获取当前事件循环共享的AsyncTavilyClient客户端
+
+    必须在协程中调用。Tavily使用独立的连接池，避免与OpenAI的认证头互相干扰。
+    """
+    clients = _loop_clients()
+    key = ("tavily", api_key)
+    with _lock:
+        client = clients.get(key)
+        if client is None:
+            http_client = httpx.AsyncClient(limits=_connection_limits(), timeout=http_timeout(SEARCH_TIMEOUT_SECONDS))
+            client = AsyncTavilyClient(api_key=api_key, api_base_url=TAVILY_API_BASE_URL, client=http_client)
+            clients[key] = client
+            # 外部传入的连接池需要由我们自己关闭
+            clients[("tavily-http", api_key)] = http_client
+        return client
+
+
+async def aclose_async_clients():
+    """关闭当前事件循环中的所有共享客户端（用于优雅退出）"""
+    clients = _loop_clients()
+    with _lock:
+        items = list(clients.values())
+        clients.clear()
+    for client in items:
+        if isinstance(client, httpx.AsyncClient):
+            await client.aclose()
+        else:
+            await client.close()
@@ -3,15 +3,19 @@ from dotenv import load_dotenv
 import os
 import time
 from typing import Dict, Any, List
-import traceback
-import threading
 
 from agents.report_generator import ReportGenerator
-from agents.project_coordinator import ProjectCoordinator
+from agents.agent_pool import AgentPool, get_agent_pool
+from agents.discussion_engine import (DiscussionConfig, StopDecision, no_questions_rule,
+                                     STAGE_ANALYZE, STAGE_CRITIQUE, STAGE_OPTIMIZE, STAGE_SCORE)
+from agents.logging_utils import configure_logging, get_logger
+from agents.telemetry import start_telemetry_server_from_env
+from agents.streaming import StreamBuffer, STREAM_REASONING, STREAM_TOKEN, STREAM_CACHED, STREAM_ERROR
 
 # 加载环境变量
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+logger = get_logger("app")
 
 # 设置页面配置
 st.set_page_config(
@@ -26,8 +30,6 @@ if 'analysis_state' not in st.session_state:
     st.session_state.analysis_state = 'idle'  # idle, running, completed, error
 if 'analysis_results' not in st.session_state:
     st.session_state.analysis_results = None
-if 'coordinator' not in st.session_state:
-    st.session_state.coordinator = None
 if 'current_round' not in st.session_state:
     st.session_state.current_round = 0
 if 'analysis_progress' not in st.session_state:
@@ -104,36 +106,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def safe_execute_with_timeout(func, timeout=60, *args, **kwargs):
-    """安全执行函数，包含超时和错误处理"""
-    try:
-        result = [None]
-        error = [None]
-        
-        def target():
-            try:
-                result[0] = func(*args, **kwargs)
-            except Exception as e:
-                error[0] = e
-        
-        thread = threading.Thread(target=target)
-        thread.start()
-        thread.join(timeout)
-        
-        if thread.is_alive():
-            return None, f"操作超时 ({timeout}秒)"
-        
-        if error[0]:
-            return None, f"执行出错: {str(error[0])}"
-        
-        return result[0], None
-        
-    except Exception as e:
-        error_msg = f"执行出错: {str(e)}"
-        st.error(error_msg)
-        print(f"Error in {func.__name__}: {traceback.format_exc()}")
-        return None, error_msg
-
 def display_skills_analysis(analysis: Dict[str, Any]):
     """显示技能分析结果"""
     try:
@@ -204,13 +176,156 @@ def display_skills_analysis(analysis: Dict[str, Any]):
                 """, unsafe_allow_html=True)
     except Exception as e:
         st.error(f"显示技能分析时出错: {str(e)}")
-        print(f"Error in display_skills_analysis: {e}")
+        logger.warning("Error in display_skills_analysis: %s", e)
+
+# 流式输出中智能体类名与界面显示名称的对应关系
+AGENT_DISPLAY_NAMES = {
+    "EducationAnalyst": "📚 教育分析师",
+    "IndustryAnalyst": "🏢 行业分析师",
+    "DataInsightAnalyst": "🤔 批判分析师",
+}
+STREAM_STALL_SECONDS = 20  # 超过该时长没有收到新片段，提示请求可能卡住
+STREAM_PREVIEW_CHARS = 600  # 实时预览中每个智能体显示的最新字符数
 
 class StableAnalysisUI:
     def __init__(self):
         self.progress_container = st.empty()
         self.status_container = st.empty()
         self.results_container = st.container()
+        # 流式输出：智能体在工作线程中写入缓冲区，界面在等待期间定期取出并渲染
+        self.stream_buffer = StreamBuffer()
+        self.stream_container = st.empty()
+        self.stream_texts: Dict[str, Dict[str, str]] = {}
+        self.gauge_container = st.empty()
+        self.watched_executors = []
+    
+    def poll(self):
+        """等待智能体执行期间定期调用：刷新流式输出与进行中调用数"""
+        self.render_stream()
+        self.render_gauge()
+    
+    def handle_event(self, event: str, payload: Dict[str, Any]):
+        """订阅讨论引擎的事件并更新界面"""
+        agent_names = {"education": "教育", "industry": "行业"}
+        if event == "round_start":
+            self.display_round_header(payload["round"], payload["max_rounds"])
+            self.update_progress(payload["round"], payload["max_rounds"], f"进行第 {payload['round']} 轮分析...")
+        elif event == "stage_start":
+            stage = payload["stage"]
+            if stage == STAGE_ANALYZE:
+                self.display_status("📚🏢 教育分析师与行业分析师正在同时分析专业信息和岗位需求...")
+            elif stage == STAGE_OPTIMIZE:
+                counts = payload.get("question_counts", {})
+                self.display_status(f"🔄 进入定向优化模式：教育问题 {counts.get('education', 0)} 个，行业问题 {counts.get('industry', 0)} 个")
+                if "education" in counts:
+                    self.display_status(f"📚 教育分析师正在基于 {counts['education']} 个教育专项问题优化...（预计需要60-90秒）")
+                if "industry" in counts:
+                    self.display_status(f"🏢 行业分析师正在基于 {counts['industry']} 个行业专项问题优化...（预计需要60-90秒）")
+            elif stage == STAGE_CRITIQUE:
+                self.display_status("🤔 批判分析师正在进行质疑和审查...")
+            elif stage == STAGE_SCORE:
+                self.display_status("📊 正在进行最终量化匹配分析...")
+        elif event == "stage_end":
+            self.clear_stream()
+        elif event == "agent_skipped":
+            if payload["agent"] == "education":
+                self.display_status("📚 教育分析师：无专项问题，保持当前分析结果", "info")
+            else:
+                self.display_status("🏢 行业分析师：无专项问题，保持当前分析结果", "info")
+        elif event == "agent_report":
+            agent = payload["agent"]
+            report = payload["report"]
+            if agent in agent_names and report.get("warehouse"):
+                reused = report["warehouse"]
+                self.display_status(f"♻️ {agent_names[agent]}画像来自画像库（{'已收敛' if reused['converged'] else '基础分析'}，"
+                                    f"{reused['status']}），未重新搜索", "info")
+            if agent in agent_names and payload.get("version", 1) > 1:
+                changes = "、".join(payload.get("changes", [])) or "无"
+                self.display_status(f"{agent_names[agent]}报告更新为第 {payload['version']} 版，变化字段: {changes}", "info")
+            if agent == "education":
+                self.display_agent_analysis("教育分析师", report)
+            elif agent == "industry":
+                self.display_agent_analysis("行业分析师", report)
+            elif agent == "critic":
+                # 记录分析进度
+                st.session_state.analysis_progress.append({
+                    "round": payload["round"],
+                    "questions": len(report.get("questions_for_next_round", []))
+                })
+                if report.get("skipped"):
+                    self.display_status("⏭️ 两份报告与上一轮相比均无变化，跳过本轮批判", "info")
+                self.display_agent_analysis("批判分析师", report)
+        elif event == "agent_error":
+            agent, stage, error = payload["agent"], payload["stage"], payload["error"]
+            if stage == STAGE_ANALYZE:
+                self.display_status(f"{agent_names[agent]}分析失败: {error}", "error")
+            elif stage == STAGE_OPTIMIZE:
+                self.display_status(f"{agent_names[agent]}分析优化失败: {error}", "error")
+                if payload["timed_out"]:
+                    self.display_status(f"🔄 {agent_names[agent]}分析优化超时，将使用现有报告继续分析", "warning")
+                elif agent == "industry":
+                    self.display_status("使用之前的行业分析结果继续", "warning")
+            elif stage == STAGE_CRITIQUE:
+                self.display_status(f"批判分析失败: {error}", "error")
+            elif stage == STAGE_SCORE:
+                self.display_status(f"最终分析失败: {error}", "error")
+        elif event == "stopped":
+            if payload["consensus"]:
+                self.display_status(f"第 {payload['round']} 轮: {payload['reason']}", "success")
+            else:
+                self.display_status(payload["reason"], "warning")
+    
+    def render_gauge(self):
+        """显示正在进行中的智能体调用数量"""
+        try:
+            in_flight = queued = 0
+            for executor in self.watched_executors:
+                stats = executor.stats()
+                in_flight += stats["in_flight"]
+                queued += stats["queued"]
+            self.gauge_container.caption(f"🔌 进行中的调用: {in_flight}　排队中: {queued}")
+        except Exception as e:
+            logger.warning("Gauge render error: %s", e)
+    
+    def render_stream(self):
+        """取出新的流式事件并实时渲染各智能体的输出片段"""
+        try:
+            events = self.stream_buffer.drain()
+            for event in events:
+                texts = self.stream_texts.setdefault(event.agent, {"reasoning": "", "output": "", "note": ""})
+                if event.kind == STREAM_REASONING:
+                    texts["reasoning"] += event.text
+                elif event.kind == STREAM_TOKEN:
+                    texts["output"] += event.text
+                elif event.kind == STREAM_CACHED:
+                    texts["note"] = "命中缓存，已直接返回结果"
+                elif event.kind == STREAM_ERROR:
+                    texts["note"] = f"调用出错: {event.text}"
+            stalled = self.stream_buffer.stalled_agents(STREAM_STALL_SECONDS)
+            if not events and not stalled:
+                return
+            
+            with self.stream_container.container():
+                for agent, texts in self.stream_texts.items():
+                    name = AGENT_DISPLAY_NAMES.get(agent, agent)
+                    st.markdown(f"**{name}** 实时输出（已接收 {len(texts['output'])} 字符）")
+                    if texts["note"]:
+                        st.caption(texts["note"])
+                    if texts["reasoning"] and not texts["output"]:
+                        st.caption(f"思考中… {texts['reasoning'][-STREAM_PREVIEW_CHARS:]}")
+                    if texts["output"]:
+                        st.code(texts["output"][-STREAM_PREVIEW_CHARS:], language="json")
+                for agent, silent_seconds in stalled.items():
+                    name = AGENT_DISPLAY_NAMES.get(agent, agent)
+                    st.warning(f"⚠️ {name} 已 {silent_seconds:.0f} 秒没有新的输出，请求可能已卡住")
+        except Exception as e:
+            logger.warning("Stream render error: %s", e)
+    
+    def clear_stream(self):
+        """一个步骤结束后清空实时输出区域"""
+        self.render_stream()
+        self.stream_texts = {}
+        self.stream_container.empty()
         
     def update_progress(self, current_round: int, max_rounds: int, status: str):
         """更新进度条和状态"""
@@ -222,7 +337,7 @@ class StableAnalysisUI:
                 # 更新会话状态
                 st.session_state.current_round = current_round
         except Exception as e:
-            print(f"Progress update error: {e}")
+            logger.warning("Progress update error: %s", e)
     
     def display_round_header(self, round_num: int, max_rounds: int):
         """显示轮次标题"""
@@ -234,7 +349,7 @@ class StableAnalysisUI:
                 </div>
                 """, unsafe_allow_html=True)
         except Exception as e:
-            print(f"Round header error: {e}")
+            logger.warning("Round header error: %s", e)
     
     def display_status(self, message: str, message_type: str = "info"):
         """显示状态消息"""
@@ -248,7 +363,7 @@ class StableAnalysisUI:
             elif message_type == "error":
                 st.error(f"❌ {message}")
         except Exception as e:
-            print(f"Status display error: {e}")
+            logger.warning("Status display error: %s", e)
     
     def display_agent_analysis(self, agent_name: str, analysis: Dict[str, Any]):
         """显示智能体分析结果"""
@@ -383,16 +498,20 @@ class StableAnalysisUI:
         except Exception as e:
             st.error(f"显示{agent_name}结果时出错: {str(e)}")
 
-def initialize_coordinator():
-    """初始化协调官（仅一次）"""
-    if st.session_state.coordinator is None:
-        try:
-            st.session_state.coordinator = ProjectCoordinator(openai_api_key=OPENAI_API_KEY)
-            return True
-        except Exception as e:
-            st.error(f"初始化协调官失败: {str(e)}")
-            return False
-    return True
+@st.cache_resource
+def load_agent_pool() -> AgentPool:
+    """获取进程级共享的智能体池（所有会话共用，会话启动时不再构建任何客户端）"""
+    return get_agent_pool(OPENAI_API_KEY)
+
+@st.cache_resource
+def load_logging():
+    """进程内只配置一次日志输出（级别与格式见 AGENT_LOG_LEVEL / AGENT_LOG_FORMAT）"""
+    return configure_logging()
+
+@st.cache_resource
+def load_telemetry_server():
+    """设置了 TELEMETRY_PORT 时启动进程级唯一的指标导出端点（/metrics、/traces）"""
+    return start_telemetry_server_from_env()
 
 def should_continue_analysis(critique_result: Dict[str, Any], round_num: int, max_rounds: int) -> bool:
     """智能判断是否应该继续分析（适配分类问题模式）"""
@@ -431,162 +550,54 @@ def should_continue_analysis(critique_result: Dict[str, Any], round_num: int, ma
     
     return True
 
+def quality_stop_rule(state: Dict[str, Any], critique_result: Dict[str, Any], round_num: int, max_rounds: int):
+    """基于分析质量评估的停止规则"""
+    if not should_continue_analysis(critique_result, round_num, max_rounds):
+        return StopDecision("📋 基于分析质量评估，将结束讨论")
+    return None
+
+def api_call_guard_rule(state: Dict[str, Any], critique_result: Dict[str, Any], round_num: int, max_rounds: int):
+    """检测到过多API调用时强制结束讨论（防止无限循环）"""
+    if round_num >= 3 and len(st.session_state.analysis_progress) > 10:
+        return StopDecision("检测到过多API调用，为保护系统资源，将结束分析", consensus=False)
+    return None
+
 def run_stable_analysis(coordinator, major: str, job_title: str, max_rounds: int, ui: StableAnalysisUI):
-    """稳定运行分析流程"""
+    """稳定运行分析流程：讨论由协调官的讨论引擎执行，界面只订阅事件"""
+    engine = coordinator.engine
     try:
-        # 初始化分析状态
-        state = {
-            "topic": f"专业[{major}] vs 岗位[{job_title}]",
-            "education_report": {},
-            "industry_report": {},
-            "data_insight_report": {},
-            "critique_and_questions": [],  # 保持向后兼容
-            "education_questions": [],     # 新增：教育专项问题
-            "industry_questions": [],      # 新增：行业专项问题
-            "is_consensus_reached": False
-        }
-        
         ui.display_status("🎯 项目协调官已就位，正在召集专家团队...")
-        
-        # 限制最大轮数，避免无限循环
-        effective_max_rounds = min(max_rounds, 6)  # 硬限制最多6轮
-        
-        for round_num in range(1, effective_max_rounds + 1):
-            ui.display_round_header(round_num, effective_max_rounds)
-            ui.update_progress(round_num, effective_max_rounds, f"进行第 {round_num} 轮分析...")
-            
-            # 检查是否应该强制停止（防止无限循环）
-            if round_num > 3 and len(st.session_state.analysis_progress) > 10:
-                ui.display_status("⚠️ 检测到过多API调用，为保护系统资源，将结束分析", "warning")
-                break
-            
-            # 第一轮：基础分析
-            if round_num == 1:
-                # 教育分析师分析
-                ui.display_status("📚 教育分析师正在分析专业信息...")
-                education_result, error = safe_execute_with_timeout(
-                    coordinator.education_analyst.run, 90, major  # 增加到90秒
-                )
-                if error:
-                    ui.display_status(f"教育分析失败: {error}", "error")
-                    return None
-                state["education_report"] = education_result
-                ui.display_agent_analysis("教育分析师", state["education_report"])
-                
-                # 行业分析师分析
-                ui.display_status("🏢 行业分析师正在分析岗位需求...")
-                industry_result, error = safe_execute_with_timeout(
-                    coordinator.industry_analyst.run, 90, job_title  # 增加到90秒
-                )
-                if error:
-                    ui.display_status(f"行业分析失败: {error}", "error")
-                    return None
-                state["industry_report"] = industry_result
-                ui.display_agent_analysis("行业分析师", state["industry_report"])
-            else:
-                # 后续轮次：深化分析
-                education_question_count = len(state.get('education_questions', []))
-                industry_question_count = len(state.get('industry_questions', []))
-                ui.display_status(f"🔄 进入定向优化模式：教育问题 {education_question_count} 个，行业问题 {industry_question_count} 个")
-                
-                # 教育分析师定向优化
-                if state.get('education_questions'):
-                    limited_education_questions = state['education_questions'][:3]  # 最多处理3个问题
-                    ui.display_status(f"📚 教育分析师正在基于 {len(limited_education_questions)} 个教育专项问题优化...（预计需要60-90秒）")
-                    education_result, error = safe_execute_with_timeout(
-                        coordinator.education_analyst.run, 120, major,  # 优化模式增加到120秒
-                        questions=limited_education_questions,
-                        previous_report=state["education_report"]
-                    )
-                    if error:
-                        ui.display_status(f"教育分析优化失败: {error}", "error")
-                        if "超时" in str(error):
-                            ui.display_status("🔄 教育分析优化超时，将使用现有报告继续分析", "warning")  
-                            # 不break，继续使用之前的报告
-                        else:
-                            break
-                    state["education_report"] = education_result
-                    ui.display_agent_analysis("教育分析师", state["education_report"])
-                else:
-                    ui.display_status("📚 教育分析师：无专项问题，保持当前分析结果", "info")
-                
-                # 行业分析师定向优化
-                if state.get('industry_questions'):
-                    limited_industry_questions = state['industry_questions'][:3]  # 最多处理3个问题
-                    ui.display_status(f"🏢 行业分析师正在基于 {len(limited_industry_questions)} 个行业专项问题优化...（预计需要60-90秒）")
-                    industry_result, error = safe_execute_with_timeout(
-                        coordinator.industry_analyst.run, 120, job_title,  # 优化模式增加到120秒
-                        questions=limited_industry_questions,
-                        previous_report=state["industry_report"]
-                    )
-                    if error:
-                        ui.display_status(f"行业分析优化失败: {error}", "error")
-                        if "超时" in str(error):
-                            ui.display_status("🔄 行业分析优化超时，将使用现有报告继续分析", "warning")
-                        else:
-                            ui.display_status("使用之前的行业分析结果继续", "warning")
-                    else:
-                        state["industry_report"] = industry_result
-                        ui.display_agent_analysis("行业分析师", state["industry_report"])
-                else:
-                    ui.display_status("🏢 行业分析师：无专项问题，保持当前分析结果", "info")
-            
-            # 批判分析
-            ui.display_status("🤔 批判分析师正在进行质疑和审查...")
-            critique_result, error = safe_execute_with_timeout(
-                coordinator.critic_analyst.run_critique, 90,  # 从60秒增加到90秒
-                state["education_report"],
-                state["industry_report"]
-            )
-            if error:
-                ui.display_status(f"批判分析失败: {error}", "error")
-                break
-            
-            # 记录分析进度
-            st.session_state.analysis_progress.append({
-                "round": round_num,
-                "questions": len(critique_result.get("questions_for_next_round", []))
-            })
-            
-            # 提取分类问题并更新状态
-            state["education_questions"] = critique_result.get("education_questions", [])
-            state["industry_questions"] = critique_result.get("industry_questions", [])
-            state["critique_and_questions"] = critique_result.get("questions_for_next_round", [])
-            ui.display_agent_analysis("批判分析师", critique_result)
-            
-            # 智能判断是否继续（基于分类问题）
-            has_education_questions = bool(state["education_questions"])
-            has_industry_questions = bool(state["industry_questions"])
-            
-            if not has_education_questions and not has_industry_questions:
-                ui.display_status(f"🎉 第 {round_num} 轮达成共识！批判分析师未发现进一步问题。", "success")
-                state["is_consensus_reached"] = True
-                break
-            elif not should_continue_analysis(critique_result, round_num, effective_max_rounds):
-                ui.display_status(f"📋 第 {round_num} 轮完成，基于分析质量评估，将结束讨论", "info")
-                state["is_consensus_reached"] = True
-                break
-        
-        # 最终量化分析
-        ui.display_status("📊 正在进行最终量化匹配分析...")
-        final_analysis, error = safe_execute_with_timeout(
-            coordinator.critic_analyst.run, 120,  # 从90秒增加到120秒，因为涉及复杂的技能匹配分析
-            state["education_report"], 
-            state["industry_report"]
+        # 开启流式输出，模型生成的片段实时显示在界面上
+        coordinator.set_stream_callback(ui.stream_buffer)
+        ui.watched_executors.append(coordinator.round_executor.executor)
+        engine.subscribe(ui.handle_event)
+        
+        config = DiscussionConfig(
+            max_rounds=min(max_rounds, 6),  # 硬限制最多6轮
+            analyze_timeout=90,    # 两位分析师共享90秒
+            optimize_timeout=120,  # 优化模式共享120秒
+            critique_timeout=90,
+            score_timeout=120,     # 涉及复杂的技能匹配分析
+            max_questions=3,       # 每位分析师每轮最多处理3个问题
+            stop_rules=[no_questions_rule, quality_stop_rule, api_call_guard_rule],
+            abort_on_analyze_error=True,
+            stop_on_optimize_error=("education",)
         )
-        if error:
-            ui.display_status(f"最终分析失败: {error}", "error")
+        state = engine.run(major, job_title, config, poll=ui.poll)
+        if state["aborted"]:
             return None
-        
-        state["data_insight_report"] = final_analysis
         return state
         
     except Exception as e:
         ui.display_status(f"分析过程出现异常: {str(e)}", "error")
-        print(f"Analysis error: {traceback.format_exc()}")
+        logger.exception("Analysis error")
         return None
+    finally:
+        engine.unsubscribe(ui.handle_event)
+        coordinator.set_stream_callback(None)
 
 def main():
+    load_logging()
     # 主标题
     st.markdown('<h1 class="main-header">🎯 智岗匹配分析平台</h1>', unsafe_allow_html=True)
     
@@ -648,8 +659,8 @@ def main():
         
         st.info("""
         **⏱️ 超时设置：**
-        - 基础分析：90秒/轮
-        - 优化分析：120秒/轮  
+        - 基础分析：90秒/轮（教育与行业并发）
+        - 优化分析：120秒/轮（教育与行业并发）  
         - 批判分析：90秒/轮
         - 最终分析：120秒/轮
         
@@ -657,8 +668,14 @@ def main():
         - 单个领域问题超过6个将限制轮数
         - 总问题数超过10个将提前结束
         - 超时自动使用现有结果继续
+        - 超时的调用会被立即取消，释放连接
         """)
         
+        if OPENAI_API_KEY:
+            load_telemetry_server()
+            pool_stats = load_agent_pool().stats()
+            st.metric("🔌 进行中的分析", pool_stats["in_use"], help=f"智能体池上限 {pool_stats['max_size']} 个并发分析，已创建 {pool_stats['created']} 个")
+        
         # 显示当前状态
         if st.session_state.analysis_state != 'idle':
             st.subheader("📊 分析状态")
@@ -670,7 +687,6 @@ def main():
         if st.button("🔄 重置分析", type="secondary"):
             st.session_state.analysis_state = 'idle'
             st.session_state.analysis_results = None
-            st.session_state.coordinator = None
             st.session_state.current_round = 0
             st.session_state.analysis_progress = []
             st.rerun()
@@ -713,15 +729,30 @@ def main():
         
         ui = StableAnalysisUI()
         
-        # 初始化协调官
-        if not initialize_coordinator():
+        # 从进程级智能体池借出协调官，分析结束后归还
+        pool = load_agent_pool()
+        try:
+            coordinator = pool.acquire(timeout=60)
+        except TimeoutError as e:
+            st.error(f"获取协调官失败: {str(e)}")
             st.session_state.analysis_state = 'error'
             st.stop()
-        
-        # 运行分析
-        final_state = run_stable_analysis(
-            st.session_state.coordinator, major_input, job_title_input, max_rounds, ui
-        )
+        except Exception as e:
+            # 池中没有空闲实例时会现场创建协调官，API Key缺失或无效等初始化错误在此报告
+            logger.exception("Coordinator initialization error")
+            st.error(f"初始化协调官失败: {str(e)}")
+            st.session_state.analysis_state = 'error'
+            st.stop()
+        try:
+            final_state = run_stable_analysis(
+                coordinator, major_input, job_title_input, max_rounds, ui
+            )
+        except Exception as e:
+            logger.exception("Analysis error")
+            st.error(f"分析过程出错: {str(e)}")
+            final_state = None
+        finally:
+            pool.release(coordinator)
         
         if final_state:
             st.session_state.analysis_results = final_state
@@ -775,13 +806,17 @@ def main():
         # 详细日志
         if show_detailed_log:
             with st.expander("📝 查看详细讨论日志"):
-                st.json(final_state.get("discussion_log", []))
+                discussion_log = final_state.get("discussion_log", [])
+                # 按原顺序还原完整发言（含每轮的完整报告），而非内存中的紧凑事件记录
+                replay = getattr(discussion_log, "replay", None)
+                st.json(list(replay()) if replay else list(discussion_log))
+                if getattr(discussion_log, "path", None):
+                    st.caption(f"完整讨论日志已保存至 {discussion_log.path}")
         
         # 重新分析按钮
         if st.button("🔄 重新分析", type="secondary", use_container_width=True):
             st.session_state.analysis_state = 'idle'
             st.session_state.analysis_results = None
-            st.session_state.coordinator = None
             st.session_state.current_round = 0
             st.session_state.analysis_progress = []
             st.rerun()
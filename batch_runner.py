@@ -0,0 +1,167 @@
+"""
+命令行批量分析 (batch_runner)
+
+职责:
+1.  从JSONL或CSV文件读取 (专业, 岗位) 组合，无需打开Streamlit界面即可批量运行完整的多轮讨论分析。
+2.  按可配置的并发度运行，每个组合完成后立即把最终讨论状态与报告Markdown追加写入输出JSONL。
+3.  支持断点续跑：重新运行时跳过输出文件中已成功完成的组合，只重跑未完成或失败的组合。
+
+用法:
+    python batch_runner.py pairs.jsonl results.jsonl --parallelism 4 --max-rounds 3
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Set, Tuple
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from agents.agent_pool import AgentPool, get_agent_pool
+from agents.jsonl_sink import JsonlSink
+from agents.llm_scheduler import PRIORITY_BATCH, use_priority
+from agents.logging_utils import configure_logging, get_logger, shutdown_logging
+from agents.report_generator import ReportGenerator
+from agents.telemetry import start_telemetry_server_from_env
+
+logger = get_logger("batch_runner")
+
+
+def read_pairs(path: str) -> List[Tuple[str, str]]:
+    """
+    读取 (专业, 岗位) 组合：.csv 文件需包含 major 与 job_title 列，其余按JSONL解析
+
+    JSONL每行形如 {"major": "计算机科学", "job_title": "软件工程师"}，岗位字段也可写作 "job"。
+    """
+    pairs = []
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        rows = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("--> 跳过第 %s 行无法解析的输入: %.80s", line_num, line)
+
+    for row in rows:
+        major = (row.get("major") or "").strip()
+        job_title = (row.get("job_title") or row.get("job") or "").strip()
+        if major and job_title:
+            pairs.append((major, job_title))
+        else:
+            logger.warning("--> 跳过缺少专业或岗位的输入: %s", row)
+    # 去重并保持原有顺序
+    return list(dict.fromkeys(pairs))
+
+
+def completed_pairs(sink: JsonlSink) -> Set[Tuple[str, str]]:
+    """从已有输出中找出已成功完成的组合"""
+    return {
+        (record.get("major"), record.get("job_title"))
+        for record in sink.read_records()
+        if record.get("status") == "completed"
+    }
+
+
+def analyze_pair(pool: AgentPool, report_generator: ReportGenerator, major: str, job_title: str,
+                 max_rounds: int) -> Dict[str, Any]:
+    """借出一个协调官完成单个组合的完整讨论，并生成报告"""
+    start_time = time.monotonic()
+    # 批处理请求让位于界面上的交互式分析
+    with use_priority(PRIORITY_BATCH), pool.checkout() as coordinator:
+        state = coordinator.run_analysis_discussion(major, job_title, max_rounds=max_rounds)
+    report_markdown = report_generator.run(state["data_insight_report"]) if state.get("data_insight_report") else ""
+    return {
+        "major": major,
+        "job_title": job_title,
+        "status": "failed" if state.get("aborted") else "completed",
+        "error": state.get("aborted"),
+        "elapsed_seconds": round(time.monotonic() - start_time, 2),
+        # 报告版本库只输出各报告的版本数与字段共享统计，最终报告已包含在状态中
+        "state": {**state, "report_versions": state["report_versions"].stats()} if "report_versions" in state else state,
+        "report_markdown": report_markdown,
+    }
+
+
+def run_batch(input_path: str, output_path: str, parallelism: int = 4, max_rounds: int = 3,
+              resume: bool = True) -> Dict[str, int]:
+    """
+    批量运行所有组合
+
+    Returns:
+        dict: 本次运行的统计（总数、跳过、成功、失败）
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY not found in environment variables.")
+
+    pairs = read_pairs(input_path)
+    sink = JsonlSink(output_path)
+    done = completed_pairs(sink) if resume else set()
+    pending = [pair for pair in pairs if pair not in done]
+    logger.info("共 %s 个组合，已完成 %s 个，待运行 %s 个", len(pairs), len(pairs) - len(pending), len(pending))
+
+    stats = {"total": len(pairs), "skipped": len(pairs) - len(pending), "completed": 0, "failed": 0}
+    if not pending:
+        return stats
+
+    pool = get_agent_pool(openai_api_key, max_size=parallelism)
+    report_generator = ReportGenerator()
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="batch") as executor:
+        futures = {
+            executor.submit(analyze_pair, pool, report_generator, major, job_title, max_rounds): (major, job_title)
+            for major, job_title in pending
+        }
+        for future in as_completed(futures):
+            major, job_title = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                logger.exception("--> 组合 %s × %s 分析失败", major, job_title)
+                record = {"major": major, "job_title": job_title, "status": "failed", "error": str(e)}
+            sink.append(record)
+            stats[record["status"]] += 1
+            finished = stats["completed"] + stats["failed"]
+            logger.info("--> 已完成 %s/%s 个组合: %s × %s (%s)", finished, len(pending), major, job_title, record["status"])
+
+    return stats
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量运行专业-岗位匹配度分析")
+    parser.add_argument("input", help="输入文件（.jsonl 或 .csv），每条包含 major 与 job_title")
+    parser.add_argument("output", help="输出JSONL文件，每个组合完成后立即追加一行")
+    parser.add_argument("--parallelism", type=int, default=4, help="同时进行的分析数量（默认4）")
+    parser.add_argument("--max-rounds", type=int, default=3, help="每个组合的最大讨论轮数（默认3）")
+    parser.add_argument("--no-resume", action="store_true", help="忽略输出文件中已完成的组合，全部重新运行")
+    parser.add_argument("--log-level", help="日志级别（默认读取 AGENT_LOG_LEVEL，未设置时为INFO；高并发时建议WARNING）")
+    parser.add_argument("--log-json", action="store_true", help="以JSON格式输出日志")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    configure_logging(level=args.log_level, json_format=True if args.log_json else None)
+    start_telemetry_server_from_env()
+    stats = run_batch(
+        args.input, args.output,
+        parallelism=max(args.parallelism, 1),
+        max_rounds=args.max_rounds,
+        resume=not args.no_resume
+    )
+    # 先写出队列中剩余的日志，再输出汇总
+    shutdown_logging()
+    print(f"批量分析结束: 共 {stats['total']} 个，跳过 {stats['skipped']} 个，"
+          f"成功 {stats['completed']} 个，失败 {stats['failed']} 个")
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
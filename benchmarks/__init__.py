@@ -0,0 +1,6 @@
+"""
+基准测试 (benchmarks)
+
+在本地模拟后端（agents/mock_backend.py）上驱动完整的讨论流水线，测量各阶段耗时、Token用量、
+达成共识所需轮数与不同并发度下的吞吐量，并与 benchmarks/baselines/ 中保存的基线比较。
+"""
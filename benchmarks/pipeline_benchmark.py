@@ -0,0 +1,268 @@
+"""
+讨论流水线基准测试 (pipeline_benchmark)
+
+职责:
+1.  通过进程内模拟后端驱动 ProjectCoordinator.run_analysis_discussion，不访问网络、不使用缓存。
+2.  按阶段（搜索、信息提取、批判、优化、最终评分）统计 p50/p95/p99 耗时，统计发送与接收的Token总量、
+    达成共识所需轮数，以及 1/8/32 个并发分析时的吞吐量。
+3.  结果以JSON保存为基线；再次运行时与基线比较，超出容差即视为性能回退并以非零状态码退出。
+
+用法:
+    python -m benchmarks.pipeline_benchmark --save-baseline benchmarks/baselines/default.json
+    python -m benchmarks.pipeline_benchmark --baseline benchmarks/baselines/default.json --tolerance 0.25
+"""
+import os
+
+# 基准测试必须绕过响应缓存，否则测到的是缓存命中耗时；需在导入agents之前设置
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["SEARCH_CACHE_ENABLED"] = "false"
+# 画像库会让重复的组合直接复用上一次的结果，同样需要关闭
+os.environ["PROFILE_WAREHOUSE_ENABLED"] = "false"
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+# 模拟后端没有容量上限，放开自适应并发限流，否则测到的是限流器本身的排队时间
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "256")
+os.environ.setdefault("SEARCH_MAX_CONCURRENCY", "256")
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+from agents.agent_pool import AgentPool
+from agents.discussion_engine import STAGE_ANALYZE, STAGE_CRITIQUE, STAGE_OPTIMIZE, STAGE_SCORE
+from agents.logging_utils import configure_logging
+from agents.mock_backend import LatencyModel, MockProfile, install_fakes
+from agents.project_coordinator import ProjectCoordinator
+
+BASELINE_VERSION = 1
+DEFAULT_CONCURRENCY = (1, 8, 32)
+
+# 报告中的阶段 -> (来源, 匹配值)；"call" 为单次后端调用耗时，"stage" 为讨论引擎记录的阶段耗时
+STAGES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "search": ("call", ("search",)),
+    "extraction": ("call", ("education", "industry")),
+    "analysis": ("stage", (STAGE_ANALYZE,)),
+    "critique": ("stage", (STAGE_CRITIQUE,)),
+    "optimization": ("stage", (STAGE_OPTIMIZE,)),
+    "final_scoring": ("stage", (STAGE_SCORE,)),
+}
+
+BENCHMARK_PAIRS: List[Tuple[str, str]] = [
+    ("计算机科学与技术", "算法工程师"),
+    ("软件工程", "后端开发工程师"),
+    ("数据科学与大数据技术", "数据分析师"),
+    ("电子信息工程", "嵌入式软件工程师"),
+    ("金融学", "量化研究员"),
+    ("市场营销", "产品经理"),
+    ("自动化", "机器人算法工程师"),
+    ("统计学", "风控建模工程师"),
+]
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """线性插值的分位数，q取值0-100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else 0.0,
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+    }
+
+
+def make_profile(args: argparse.Namespace) -> MockProfile:
+    return MockProfile(
+        llm_latency=LatencyModel.parse(args.llm_latency),
+        search_latency=LatencyModel.parse(args.search_latency),
+        error_rate=args.error_rate,
+        question_rate=args.question_rate,
+        seed=args.seed,
+    )
+
+
+def _make_coordinator(profile: MockProfile) -> ProjectCoordinator:
+    coordinator = ProjectCoordinator(openai_api_key="sk-benchmark")
+    install_fakes([coordinator.education_analyst, coordinator.industry_analyst, coordinator.critic_analyst], profile)
+    return coordinator
+
+
+def _run_one(pool: AgentPool, major: str, job_title: str, max_rounds: int) -> Dict[str, Any]:
+    start_time = time.monotonic()
+    with pool.checkout() as coordinator:
+        state = coordinator.run_analysis_discussion(major, job_title, max_rounds=max_rounds)
+    return {"seconds": time.monotonic() - start_time, "state": state}
+
+
+def run_level(concurrency: int, analyses: int, max_rounds: int, profile: MockProfile) -> Dict[str, Any]:
+    """以给定并发度运行若干次完整分析并汇总指标"""
+    pool = AgentPool(lambda: _make_coordinator(profile), max_size=concurrency)
+    # 预先创建协调官，使构建智能体的开销不计入测量
+    warm = [pool.acquire() for _ in range(concurrency)]
+    for coordinator in warm:
+        pool.release(coordinator)
+    profile.reset_calls()
+
+    pairs = [BENCHMARK_PAIRS[i % len(BENCHMARK_PAIRS)] for i in range(analyses)]
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+        runs = list(executor.map(lambda pair: _run_one(pool, pair[0], pair[1], max_rounds), pairs))
+    wall_seconds = time.monotonic() - start_time
+    calls = profile.reset_calls()
+
+    stages = {}
+    for name, (source, keys) in STAGES.items():
+        if source == "call":
+            values = [call["seconds"] for call in calls if call["kind"] in keys and not call["error"]]
+        else:
+            values = [timing["seconds"] for run in runs for timing in run["state"]["stage_timings"]
+                      if timing["stage"] in keys]
+        stages[name] = summarize(values)
+
+    rounds = [run["state"]["rounds_completed"] for run in runs]
+    prompt_tokens = sum(call["prompt_tokens"] for call in calls if call["kind"] != "search")
+    completion_tokens = sum(call["completion_tokens"] for call in calls)
+    return {
+        "concurrency": concurrency,
+        "analyses": analyses,
+        "failed": sum(1 for run in runs if run["state"].get("aborted")),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_minute": round(analyses / wall_seconds * 60, 2),
+        "analysis_latency": summarize([run["seconds"] for run in runs]),
+        "rounds_to_consensus": summarize(rounds),
+        "tokens": {
+            "sent": prompt_tokens,
+            "received": completion_tokens,
+            "per_analysis": round((prompt_tokens + completion_tokens) / analyses, 1),
+        },
+        "backend_calls": {
+            "llm": sum(1 for call in calls if call["kind"] != "search"),
+            "search": sum(1 for call in calls if call["kind"] == "search"),
+            "errors": sum(1 for call in calls if call["error"]),
+        },
+        "stages": stages,
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    levels = []
+    for concurrency in args.concurrency:
+        analyses = args.analyses or max(concurrency * 2, 8)
+        print(f"--> 并发 {concurrency}: 运行 {analyses} 次分析...")
+        level = run_level(concurrency, analyses, args.max_rounds, make_profile(args))
+        print(f"    吞吐量 {level['throughput_per_minute']} 次/分钟，"
+              f"单次分析 p95 {level['analysis_latency']['p95']} 秒，失败 {level['failed']} 次")
+        levels.append(level)
+    return {
+        "version": BASELINE_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {
+            "llm_latency": args.llm_latency,
+            "search_latency": args.search_latency,
+            "error_rate": args.error_rate,
+            "question_rate": args.question_rate,
+            "max_rounds": args.max_rounds,
+            "seed": args.seed,
+        },
+        "levels": levels,
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+            min_delta_seconds: float = 0.05) -> List[str]:
+    """
+    与基线比较，返回性能回退描述列表（为空表示无回退）
+
+    比较项：各阶段p95耗时、单次分析p95耗时、吞吐量、每次分析的Token数与平均轮数。
+    耗时的绝对增量不超过min_delta_seconds时不视为回退，避免毫秒级阶段的抖动误报。
+    """
+    if result["config"] != baseline.get("config"):
+        print("--> 警告：本次运行配置与基线不一致，比较结果仅供参考")
+
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in result["levels"]:
+        base = baseline_levels.get(level["concurrency"])
+        if base is None:
+            continue
+        prefix = f"并发 {level['concurrency']}"
+
+        def check_higher(label: str, current: float, reference: float, min_delta: float = 0.0):
+            if reference and current > reference * (1 + tolerance) and current - reference > min_delta:
+                regressions.append(f"{prefix} {label}: {current} > 基线 {reference}")
+
+        for name, stats in level["stages"].items():
+            base_stats = base["stages"].get(name)
+            if base_stats:
+                check_higher(f"{name} p95", stats["p95"], base_stats["p95"], min_delta_seconds)
+        check_higher("单次分析 p95", level["analysis_latency"]["p95"], base["analysis_latency"]["p95"], min_delta_seconds)
+        check_higher("每次分析Token数", level["tokens"]["per_analysis"], base["tokens"]["per_analysis"])
+        check_higher("平均讨论轮数", level["rounds_to_consensus"]["mean"], base["rounds_to_consensus"]["mean"])
+        if level["throughput_per_minute"] < base["throughput_per_minute"] * (1 - tolerance):
+            regressions.append(f"{prefix} 吞吐量: {level['throughput_per_minute']} < 基线 {base['throughput_per_minute']}")
+    return regressions
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="讨论流水线端到端基准测试（使用本地模拟后端）")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY),
+                        help="并发分析数量，可指定多个（默认 1 8 32）")
+    parser.add_argument("--analyses", type=int, help="每个并发度运行的分析次数（默认 max(2×并发, 8)）")
+    parser.add_argument("--max-rounds", type=int, default=3)
+    parser.add_argument("--llm-latency", default="lognormal:0.2:0.3", help="模拟LLM延迟分布")
+    parser.add_argument("--search-latency", default="uniform:0.02:0.08", help="模拟搜索延迟分布")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--question-rate", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="保存本次结果的JSON文件")
+    parser.add_argument("--save-baseline", help="将本次结果保存为基线")
+    parser.add_argument("--baseline", help="与之比较的基线JSON文件")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化比例（默认0.25）")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="耗时回退的最小绝对增量（秒，默认0.05）")
+    parser.add_argument("--verbose", action="store_true", help="输出智能体的进度日志")
+    args = parser.parse_args(argv)
+
+    # 智能体的进度日志量很大，基准测试时默认只输出警告
+    configure_logging(level="INFO" if args.verbose else "WARNING")
+    result = run_benchmark(args)
+    if args.output:
+        _write_json(args.output, result)
+    if args.save_baseline:
+        _write_json(args.save_baseline, result)
+        print(f"--> 基线已保存: {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print("检测到性能回退:")
+            for regression in regressions:
+                print(f"    {regression}")
+            return 1
+        print("未检测到性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+测试公共配置
+
+所有测试都在进程内模拟后端上运行，不访问网络：关闭磁盘缓存，画像库与讨论日志写入临时目录。
+环境变量需在导入 agents 之前设置。
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="agents-tests-")
+
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["SEARCH_CACHE_ENABLED"] = "false"
+os.environ["PROFILE_WAREHOUSE_ENABLED"] = "false"
+os.environ["PROFILE_WAREHOUSE_PATH"] = os.path.join(_TMP_DIR, "profile_warehouse.sqlite")
+os.environ["DISCUSSION_LOG_DIR"] = os.path.join(_TMP_DIR, "discussion_logs")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-test")
+os.environ.setdefault("LLM_MAX_CONCURRENCY", "64")
+os.environ.setdefault("SEARCH_MAX_CONCURRENCY", "64")
+
+import pytest
+
+from agents.mock_backend import MockProfile, install_fakes
+from agents.project_coordinator import ProjectCoordinator
+
+
+@pytest.fixture
+def mock_profile() -> MockProfile:
+    # 批判者不提问，讨论在第一轮收敛，结果可复现
+    return MockProfile(seed=7, question_rate=0.0)
+
+
+@pytest.fixture
+def coordinator_factory(mock_profile):
+    """创建使用进程内假客户端的协调官"""
+    def factory() -> ProjectCoordinator:
+        coordinator = ProjectCoordinator(openai_api_key="sk-test")
+        install_fakes([coordinator.education_analyst, coordinator.industry_analyst, coordinator.critic_analyst],
+                      mock_profile)
+        return coordinator
+    return factory
@@ -0,0 +1,50 @@
+"""智能体池：借出归还、等待超时与构建失败"""
+import threading
+
+import pytest
+
+from agents.agent_pool import AgentPool
+
+
+def test_released_coordinator_is_reused(coordinator_factory):
+    pool = AgentPool(coordinator_factory, max_size=2)
+    first = pool.acquire(timeout=1)
+    pool.release(first)
+    with pool.checkout(timeout=1) as second:
+        assert second is first
+        assert pool.stats() == {"max_size": 2, "created": 1, "in_use": 1, "idle": 0}
+    assert pool.stats()["in_use"] == 0
+
+
+def test_release_clears_stream_callback(coordinator_factory):
+    pool = AgentPool(coordinator_factory, max_size=1)
+    coordinator = pool.acquire(timeout=1)
+    coordinator.set_stream_callback(lambda event: None)
+    pool.release(coordinator)
+    assert coordinator.education_analyst.stream_callback is None
+
+
+def test_full_pool_times_out_and_wakes_on_release(coordinator_factory):
+    pool = AgentPool(coordinator_factory, max_size=1)
+    coordinator = pool.acquire(timeout=1)
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+    threading.Timer(0.05, pool.release, args=(coordinator,)).start()
+    assert pool.acquire(timeout=2) is coordinator
+
+
+def test_factory_error_frees_the_slot(coordinator_factory):
+    calls = []
+
+    def flaky_factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("OPENAI_API_KEY not found in environment variables.")
+        return coordinator_factory()
+
+    pool = AgentPool(flaky_factory, max_size=1)
+    with pytest.raises(ValueError):
+        pool.acquire(timeout=1)
+    assert pool.stats() == {"max_size": 1, "created": 0, "in_use": 0, "idle": 0}
+    assert pool.acquire(timeout=1) is not None
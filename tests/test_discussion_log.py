@@ -0,0 +1,66 @@
+"""讨论日志：环形缓冲、溢出落盘与回放"""
+import os
+import time
+
+from agents.discussion_log import DiscussionLog, prune_logs, replay_file
+
+
+def test_short_discussion_stays_in_memory(tmp_path):
+    log = DiscussionLog(log_dir=str(tmp_path), max_records=10)
+    log.record("EducationAnalyst", {"required_skills": ["Python"]}, 1)
+    log.record("Coordinator", "第一轮结束", 1)
+
+    assert log.path is None
+    assert os.listdir(tmp_path) == []
+    replayed = list(log.replay())
+    assert [entry["content"] for entry in replayed] == [{"required_skills": ["Python"]}, "第一轮结束"]
+
+
+def test_overflow_spills_full_history_and_replays_in_order(tmp_path):
+    log = DiscussionLog(log_dir=str(tmp_path), max_records=3)
+    for round_num in range(1, 6):
+        log.record("EducationAnalyst", {"required_skills": [f"skill-{round_num}"]}, round_num)
+        log.record("Coordinator", "x" * 500, round_num)
+
+    assert len(log) == 3
+    assert log.dropped == 7
+    assert log.path is not None and os.path.exists(log.path)
+
+    replayed = list(log.replay())
+    assert [entry["seq"] for entry in replayed] == list(range(1, 11))
+    assert replayed[0]["content"] == {"required_skills": ["skill-1"]}
+    assert replayed[-1]["content"] == "x" * 500  # 文本完整保留，内存中只有截断的预览
+
+    log.close()
+    assert list(replay_file(log.path)) == replayed
+
+
+def test_unchanged_report_reuses_version(tmp_path):
+    log = DiscussionLog(log_dir=str(tmp_path), max_records=10)
+    first = log.record("IndustryAnalyst", {"required_skills": ["SQL"]}, 1)
+    second = log.record("IndustryAnalyst", {"required_skills": ["SQL"]}, 2)
+    third = log.record("IndustryAnalyst", {"required_skills": ["SQL", "Go"]}, 3)
+    assert first["ref"]["version"] == second["ref"]["version"] == 1
+    assert third["ref"]["version"] == 2
+
+
+def test_overflow_without_log_dir_keeps_only_recent_records():
+    log = DiscussionLog(log_dir="", max_records=2)
+    for round_num in range(1, 5):
+        log.record("Coordinator", f"第{round_num}轮", round_num)
+    assert log.path is None
+    assert [entry["content"] for entry in log.replay()] == ["第3轮", "第4轮"]
+
+
+def test_prune_logs_removes_old_and_excess_files(tmp_path):
+    now = time.time()
+    for index in range(4):
+        path = tmp_path / f"session-{index}.jsonl"
+        path.write_text("{}\n", encoding="utf-8")
+        os.utime(path, (now - index * 60, now - index * 60))
+    old = tmp_path / "old.jsonl"
+    old.write_text("{}\n", encoding="utf-8")
+    os.utime(old, (now - 30 * 86400, now - 30 * 86400))
+
+    assert prune_logs(str(tmp_path), retention_days=7, max_files=2) == 3
+    assert sorted(os.listdir(tmp_path)) == ["session-0.jsonl", "session-1.jsonl"]
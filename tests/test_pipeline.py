@@ -0,0 +1,26 @@
+"""完整讨论流程：在进程内模拟后端上运行"""
+from agents.mock_backend import MockProfile, install_fakes
+from agents.project_coordinator import ProjectCoordinator
+
+
+def test_discussion_converges_on_mock_backend(coordinator_factory):
+    state = coordinator_factory().run_analysis_discussion("软件工程", "后端开发工程师", max_rounds=3)
+
+    assert state["aborted"] is None
+    assert state["is_consensus_reached"]
+    assert state["education_report"]["required_skills"]
+    assert state["industry_report"]["required_skills"]
+    assert state["data_insight_report"]
+    speakers = [entry["speaker"] for entry in state["discussion_log"].replay()]
+    assert "EducationAnalyst" in speakers and "CriticAnalyst" in speakers
+
+
+def test_multi_round_discussion_respects_max_rounds():
+    coordinator = ProjectCoordinator(openai_api_key="sk-test")
+    install_fakes([coordinator.education_analyst, coordinator.industry_analyst, coordinator.critic_analyst],
+                  MockProfile(seed=1, question_rate=1.0))
+    state = coordinator.run_analysis_discussion("计算机科学与技术", "数据分析师", max_rounds=2)
+
+    assert state["rounds_completed"] <= 2
+    assert state["data_insight_report"]
+    assert state["report_versions"].latest("education") is not None
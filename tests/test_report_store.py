@@ -0,0 +1,42 @@
+"""报告版本库：不可变版本、字段共享与差异"""
+import pytest
+
+from agents.report_store import ReportStore
+
+
+def test_unchanged_fields_are_shared_between_versions():
+    store = ReportStore()
+    first = store.commit("education", {"required_skills": ["Python", "SQL"], "core_courses": ["数据结构"]})
+    second = store.commit("education", {"required_skills": ["Python", "SQL", "Go"], "core_courses": ["数据结构"]})
+
+    assert second.number == 2
+    assert second.changed == frozenset({"required_skills"})
+    assert second.fields["core_courses"] is first.fields["core_courses"]
+    assert store.stats()["shared_fields"] == 1
+
+
+def test_identical_commit_returns_latest_version():
+    store = ReportStore()
+    first = store.commit("industry", {"required_skills": ["SQL"]})
+    assert store.commit("industry", {"required_skills": ["SQL"]}) is first
+    assert store.stats()["versions"] == {"industry": 1}
+
+
+def test_versions_are_immutable():
+    store = ReportStore()
+    version = store.commit("industry", {"required_skills": ["SQL"]})
+    with pytest.raises(AttributeError):
+        version.number = 5
+    with pytest.raises(TypeError):
+        version.fields["required_skills"] = []
+    assert version.to_dict() == {"required_skills": ["SQL"]}
+
+
+def test_diff_only_reports_changed_fields():
+    store = ReportStore()
+    first = store.commit("education", {"required_skills": ["Python"], "core_courses": ["数据结构"]})
+    second = store.commit("education", {"required_skills": ["Python", "Go"], "core_courses": ["数据结构"]})
+
+    assert ReportStore.diff(first, first) == {}
+    delta = ReportStore.diff(first, second)
+    assert set(delta) == {"required_skills"}
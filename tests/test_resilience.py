@@ -0,0 +1,71 @@
+"""弹性接入点：熔断器半开探测与限流拒绝"""
+import asyncio
+import time
+
+import pytest
+
+from agents.resilience import (AdaptiveConcurrencyLimiter, CircuitBreaker, CircuitOpenError, EndpointOverloaded,
+                               ResilientEndpoint, RetryPolicy)
+
+
+class TransientError(Exception):
+    status_code = 503
+
+
+def make_endpoint():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+    limiter = AdaptiveConcurrencyLimiter("test", max_limit=1, max_wait=0.01)
+    endpoint = ResilientEndpoint("test", retry=RetryPolicy(max_attempts=1), breaker=breaker, limiter=limiter)
+    return endpoint, breaker, limiter
+
+
+def open_breaker(endpoint):
+    def fail():
+        raise TransientError("service unavailable")
+
+    with pytest.raises(TransientError):
+        endpoint.call(fail)
+    assert endpoint.breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.02)
+
+
+def test_breaker_rejects_during_cooldown_and_recovers_after_probe():
+    endpoint, breaker, _ = make_endpoint()
+    open_breaker(endpoint)
+    assert endpoint.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.recovery_timeout = 60
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        endpoint.call(lambda: "ok")
+
+
+def test_limiter_rejection_returns_half_open_probe_slot():
+    endpoint, breaker, limiter = make_endpoint()
+    open_breaker(endpoint)
+
+    limiter.acquire()  # 占满并发名额
+    with pytest.raises(EndpointOverloaded):
+        endpoint.call(lambda: "ok")
+    limiter.release()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert endpoint.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_async_limiter_rejection_returns_half_open_probe_slot():
+    endpoint, breaker, limiter = make_endpoint()
+    open_breaker(endpoint)
+
+    async def probe():
+        return "ok"
+
+    limiter.acquire()
+    with pytest.raises(EndpointOverloaded):
+        asyncio.run(endpoint.acall(probe))
+    limiter.release()
+
+    assert asyncio.run(endpoint.acall(probe)) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
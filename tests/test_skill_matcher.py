@@ -0,0 +1,43 @@
+"""本地技能匹配：匹配分类与需要LLM复核的边界技能"""
+from agents.skill_matcher import SkillMatcher
+
+EDUCATION_SKILLS = ["Python编程", "Java", "数据结构与算法", "Linux", "计算机网络",
+                    "操作系统", "MySQL", "软件工程", "Git", "机器学习"]
+
+
+def details_by_skill(result):
+    return {detail["industry_skill"]: detail for detail in result["details"]}
+
+
+def test_exact_matches_are_core_and_not_borderline():
+    result = SkillMatcher().match(EDUCATION_SKILLS, ["Java", "MySQL", "Linux"])
+    details = details_by_skill(result)
+    assert all(details[skill]["label"] == "core" for skill in ("Java", "MySQL", "Linux"))
+    assert result["borderline_skills"] == []
+
+
+def test_mixed_script_education_list_does_not_make_every_gap_borderline():
+    industry_skills = ["Python", "Java", "Spring Boot", "MySQL", "Redis", "Docker", "Kubernetes",
+                       "微服务架构", "分布式系统", "Linux", "消息队列", "Go"]
+    result = SkillMatcher().match(EDUCATION_SKILLS, industry_skills)
+    assert len(result["borderline_skills"]) < len(industry_skills) // 2
+    assert "Java" not in result["borderline_skills"]
+
+
+def test_gap_without_same_script_education_skill_is_borderline():
+    result = SkillMatcher().match(["编程", "数据库原理"], ["Kafka"])
+    assert details_by_skill(result)["Kafka"]["label"] == "gap"
+    assert result["borderline_skills"] == ["Kafka"]
+
+
+def test_shared_concept_is_related_and_sent_for_review():
+    result = SkillMatcher().match(["机器学习"], ["Machine Learning"])
+    detail = details_by_skill(result)["Machine Learning"]
+    assert detail["label"] == "related"
+    assert detail["borderline"]
+
+
+def test_empty_education_list_marks_everything_as_gap():
+    result = SkillMatcher().match([], ["Python", "SQL"])
+    assert result["skill_gaps"] == ["Python", "SQL"]
+    assert result["borderline_skills"] == ["Python", "SQL"]